@@ -0,0 +1,2751 @@
+"""亚马逊数据爬取引擎
+
+不依赖Tk界面的爬取引擎和命令行入口，GUI（main.py）和命令行都通过AmazonScraperEngine运行任务。
+
+命令行用法:
+    python -m amazon_auto run --config config.py --workers 4
+"""
+import argparse
+import importlib.util
+import glob
+import threading
+import queue
+import os
+import sys
+import time
+import json
+import csv
+import math
+import unicodedata
+import base64
+import sqlite3
+from collections import deque
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import pandas as pd
+import openpyxl
+import re
+from urllib.parse import quote_plus, urlparse
+
+# 注入页面的MutationObserver脚本：插件表格数据行或"暂无数据"提示出现时立即返回
+# 返回值为 'data'、'empty' 或 'timeout'
+PLUGIN_READY_SCRIPT = """
+var timeoutMs = arguments[0];
+var callback = arguments[arguments.length - 1];
+function checkPluginState() {
+    if (window.__amazonAutoStale) {
+        return null;
+    }
+    if (document.querySelector('tr.ant-table-row')) {
+        return 'data';
+    }
+    var empties = document.querySelectorAll('.ant-empty-description');
+    for (var i = 0; i < empties.length; i++) {
+        if (empties[i].textContent.indexOf('暂无数据') !== -1) {
+            return 'empty';
+        }
+    }
+    return null;
+}
+var state = checkPluginState();
+if (state) {
+    callback(state);
+    return;
+}
+var finished = false;
+var timer = null;
+var observer = new MutationObserver(function() {
+    if (finished) {
+        return;
+    }
+    var current = checkPluginState();
+    if (current) {
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        callback(current);
+    }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+timer = setTimeout(function() {
+    if (!finished) {
+        finished = true;
+        observer.disconnect();
+        callback('timeout');
+    }
+}, timeoutMs);
+"""
+
+# 一次性读取插件表格的脚本：检查表格和"暂无数据"提示，按表头定位两个转化率列并返回第一行的值
+PLUGIN_TABLE_SCRIPT = """
+var result = {table: false, empty: false, search: null, click: null};
+if (window.__amazonAutoStale || !document.querySelector('div.ant-table-content')) {
+    return result;
+}
+result.table = true;
+var empties = document.querySelectorAll('.ant-empty-description');
+for (var i = 0; i < empties.length; i++) {
+    if (empties[i].textContent.indexOf('暂无数据') !== -1) {
+        result.empty = true;
+        return result;
+    }
+}
+var searchIndex = -1;
+var clickIndex = -1;
+var headers = document.querySelectorAll('th.ant-table-cell');
+for (var j = 0; j < headers.length; j++) {
+    var headerText = (headers[j].innerText || headers[j].textContent || '').trim();
+    if (searchIndex < 0 && headerText.indexOf('搜索转化率') !== -1) {
+        searchIndex = headers[j].cellIndex;
+    } else if (clickIndex < 0 && headerText.indexOf('点击转化率') !== -1) {
+        clickIndex = headers[j].cellIndex;
+    }
+}
+var row = document.querySelector('tr.ant-table-row');
+if (row) {
+    var cells = row.cells;
+    if (searchIndex >= 0 && cells.length > searchIndex) {
+        result.search = (cells[searchIndex].innerText || '').trim() || null;
+    }
+    if (clickIndex >= 0 && cells.length > clickIndex) {
+        result.click = (cells[clickIndex].innerText || '').trim() || null;
+    }
+}
+return result;
+"""
+
+# 自适应等待使用的页面就绪信号
+# 搜索前会在旧页面上设置window.__amazonAutoStale标记，避免把上一个关键词的页面误判为已就绪
+HOMEPAGE_READY_SCRIPT = "return document.readyState === 'complete' && !!document.getElementById('twotabsearchtextbox');"
+DELIVERY_LOCATION_READY_SCRIPT = """
+var glowLocation = document.getElementById('glow-ingress-line2');
+return document.readyState === 'complete' && !!glowLocation && glowLocation.textContent.indexOf(arguments[0]) !== -1;
+"""
+# 导航后立即对页面分类：人机验证 'captcha'、错误页面（5xx、"Sorry! Something went wrong"）'error'、
+# 搜索无结果 'no_results'、正常搜索结果 'results'；页面已加载完但无法判断时返回 'unknown'，仍在加载时返回null
+PAGE_CLASSIFY_SCRIPT = """
+if (window.__amazonAutoStale) {
+    return null;
+}
+if (location.pathname.indexOf('/errors/validateCaptcha') !== -1 || document.querySelector('form[action*="validateCaptcha"]') ||
+        /robot check/i.test(document.title)) {
+    return 'captcha';
+}
+var navigation = performance.getEntriesByType('navigation')[0];
+if ((navigation && navigation.responseStatus >= 500) || /503|service unavailable|something went wrong/i.test(document.title)) {
+    return 'error';
+}
+var resultList = document.querySelector('.s-result-list');
+if (resultList) {
+    var text = resultList.textContent;
+    if (/No results for|did not match any products|Keine Ergebnisse|Aucun résultat|Nessun risultato|No hay resultados|検索に一致する商品はありませんでした/.test(text)) {
+        return 'no_results';
+    }
+    return 'results';
+}
+return document.readyState === 'complete' ? 'unknown' : null;
+"""
+# 新的搜索结果页已开始加载：不是上一个关键词的旧页面（search_product会先给旧页面加标记），且URL或结果列表已出现
+SEARCH_PAGE_STARTED_SCRIPT = "return !window.__amazonAutoStale && (location.href.indexOf('s?k=') !== -1 || !!document.querySelector('.s-result-list'));"
+SEARCH_RESULTS_READY_SCRIPT = "return !window.__amazonAutoStale && document.readyState !== 'loading' && !!document.querySelector('.s-result-list');"
+PLUGIN_TABLE_READY_SCRIPT = "return !window.__amazonAutoStale && !!document.querySelector('tr.ant-table-row, .ant-empty-description');"
+
+# 返回插件表格面板在页面中的位置（文档坐标），用于截图裁剪
+PLUGIN_PANEL_RECT_SCRIPT = """
+var panel = document.querySelector('.ant-table-wrapper') || document.querySelector('div.ant-table-content');
+if (!panel) {
+    return null;
+}
+var rect = panel.getBoundingClientRect();
+if (!rect.width || !rect.height) {
+    return null;
+}
+return {x: rect.left + window.scrollX, y: rect.top + window.scrollY, width: rect.width, height: rect.height};
+"""
+
+# 只读取插件表格容器的HTML，代替获取整个页面源码
+PLUGIN_PANEL_HTML_SCRIPT = """
+var panels = document.querySelectorAll('.ant-table-wrapper');
+if (!panels.length) {
+    var content = document.querySelector('div.ant-table-content');
+    return content ? content.outerHTML : null;
+}
+var html = [];
+for (var i = 0; i < panels.length; i++) {
+    html.push(panels[i].outerHTML);
+}
+return html.join('');
+"""
+
+# 从插件表格HTML中匹配转化率的正则表达式（预编译）
+SEARCH_CONVERSION_PATTERN = re.compile(r'搜索转化率.*?>([\d.]+%)<')
+CLICK_CONVERSION_PATTERN = re.compile(r'点击转化率.*?>([\d.]+%)<')
+
+# 截图策略
+SCREENSHOT_POLICIES = ["always", "failure", "every_n", "never"]
+SCREENSHOT_FORMATS = ["jpeg", "webp", "png"]
+
+# 每个关键词统计用时的阶段，以及运行报告的格式
+TIMING_PHASES = ["navigate", "results_ready", "plugin_ready", "extract", "record", "screenshot", "wait"]
+METRICS_REPORT_FORMATS = ["csv", "jsonl", "none"]
+
+# selenium: 每个工作线程一个浏览器；cdp: 一个浏览器中多个标签页，由asyncio通过CDP websocket并发控制（见cdp_engine.py）
+BROWSER_ENGINES = ["selenium", "cdp"]
+
+def normalize_keyword(keyword):
+    """关键词标准化：Unicode NFKC（全角字母数字和空格转换为半角）、合并连续空白并去掉首尾空白、忽略大小写
+    标准化后相同的关键词只搜索一次，结果写回所有对应的行"""
+    if not isinstance(keyword, str):
+        keyword = str(keyword)
+    return " ".join(unicodedata.normalize("NFKC", keyword).split()).casefold()
+
+
+def parse_targets(value):
+    """整理多目标配置，返回[[站点, 邮编], ...]
+    value可以是[站点, 邮编]列表，也可以是"站点 邮编; 站点 邮编"格式的文本（邮编可以包含空格）"""
+    if isinstance(value, str):
+        items = [item.split(None, 1) for item in value.split(";") if item.strip()]
+    else:
+        items = [list(item) for item in value or []]
+    
+    targets = []
+    for item in items:
+        if len(item) != 2 or not str(item[0]).strip() or not str(item[1]).strip():
+            raise ValueError(f"无效的目标配置: {item}，应为(站点, 邮编)")
+        target = [str(item[0]).strip(), str(item[1]).strip()]
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def format_targets(targets):
+    """把目标列表转换成parse_targets可以读取的文本"""
+    return "; ".join(f"{site} {zipcode}" for site, zipcode in parse_targets(targets))
+
+
+# 提取结果的分类：complete两项数据都有，partial只有一项，empty插件提示暂无数据，timeout等待超时没有数据
+# 部分数据和等待超时的关键词在主流程结束后重新搜索一次
+RETRY_RESULT_STATUSES = ("partial", "timeout")
+
+
+def count_result_fields(keyword_data):
+    """结果中获取到的数据项数量，用于比较重试前后哪个结果更完整"""
+    if not keyword_data:
+        return 0
+    return sum(1 for key in ("搜索转化率", "点击转化率") if keyword_data.get(key, "无") != "无")
+
+
+def classify_result(keyword_data, missing_status="timeout"):
+    """按获取到的数据项数量分类提取结果，两项都没有时返回missing_status"""
+    field_count = count_result_fields(keyword_data)
+    if field_count == 2:
+        return "complete"
+    if field_count == 1:
+        return "partial"
+    return missing_status
+
+
+class AdaptiveWaitScheduler:
+    """基于页面信号的自适应等待
+    每种信号保留最近的延迟记录，用滚动百分位（乘以余量系数）作为等待上限，
+    样本不足时使用配置的最长等待时间"""
+    
+    def __init__(self, percentile=95, history_size=50, min_samples=5, margin=1.5):
+        self.percentile = percentile
+        self.history_size = history_size
+        self.min_samples = min_samples
+        self.margin = margin
+        self.history = {}
+        self.lock = threading.Lock()
+    
+    def get_cap(self, name, worst_case):
+        """返回某个信号当前的等待上限（秒），不超过配置的最长等待时间"""
+        with self.lock:
+            samples = sorted(self.history.get(name, []))
+        
+        if len(samples) < self.min_samples:
+            return worst_case
+        
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(worst_case, samples[index] * self.margin + 0.5)
+    
+    def record(self, name, latency):
+        """记录一次观测到的延迟"""
+        with self.lock:
+            self.history.setdefault(name, deque(maxlen=self.history_size)).append(latency)
+    
+    def wait_until(self, name, condition, worst_case, is_running=None, poll_interval=0.2):
+        """轮询condition直到返回真值或达到等待上限
+        返回 (是否等到信号, 实际用时)"""
+        cap = self.get_cap(name, worst_case)
+        start_time = time.time()
+        
+        while True:
+            try:
+                if condition():
+                    elapsed = time.time() - start_time
+                    self.record(name, elapsed)
+                    return True, elapsed
+            except Exception:
+                pass
+            
+            elapsed = time.time() - start_time
+            if elapsed >= cap or (is_running is not None and not is_running()):
+                # 超时也记录上限值，让上限在页面变慢时能够逐步回升
+                self.record(name, cap)
+                return False, elapsed
+            
+            time.sleep(poll_interval)
+
+
+class AdaptiveRateLimiter:
+    """所有工作线程共享的搜索速率限制（容量为1的令牌桶）
+    每次搜索前调用acquire预约下一个令牌；页面正常时逐步缩短间隔，
+    出现人机验证、503或连续多个关键词没有数据时将间隔加倍并立即暂停一个间隔"""
+    
+    def __init__(self, initial_interval, min_interval, max_interval, adaptive=True, empty_streak_limit=3,
+                 speedup=0.9, backoff=2.0):
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.interval = min(self.max_interval, max(self.min_interval, initial_interval))
+        self.adaptive = adaptive
+        self.empty_streak_limit = empty_streak_limit
+        self.speedup = speedup
+        self.backoff = backoff
+        self.next_time = time.time()
+        self.empty_streak = 0
+        self.throttle_count = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """预约下一次搜索，返回需要等待的秒数"""
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+            return start - now
+    
+    def record(self, outcome):
+        """记录一次搜索的结果: 'ok'、'empty'（插件没有数据）或 'throttled'（人机验证、503等）
+        返回是否判定为被限流"""
+        with self.lock:
+            if outcome == "empty":
+                self.empty_streak += 1
+                if self.empty_streak < self.empty_streak_limit:
+                    return False
+                outcome = "throttled"
+            
+            if outcome == "throttled":
+                self.empty_streak = 0
+                self.throttle_count += 1
+                if self.adaptive:
+                    self.interval = min(self.max_interval, max(self.interval, 1.0) * self.backoff)
+                    # 立即暂停一个新的间隔，已经预约的搜索也要顺延
+                    self.next_time = max(self.next_time, time.time() + self.interval)
+                return True
+            
+            self.empty_streak = 0
+            if self.adaptive:
+                self.interval = max(self.min_interval, self.interval * self.speedup)
+            return False
+    
+    def rate_per_minute(self):
+        with self.lock:
+            return 60 / self.interval if self.interval > 0 else float("inf")
+
+
+class KeywordResultCache:
+    """关键词提取结果的本地SQLite缓存
+    以 (站点, 邮编, 关键词) 为键保存结果和时间戳，超过有效期（小时）的记录视为过期
+    插件明确提示暂无数据的结果（两项都是"无"）使用较短的有效期empty_ttl_hours，默认与ttl_hours相同"""
+    
+    def __init__(self, db_path, ttl_hours, empty_ttl_hours=None):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        self.ttl_seconds = ttl_hours * 3600
+        self.empty_ttl_seconds = self.ttl_seconds if empty_ttl_hours is None else empty_ttl_hours * 3600
+        self.lock = threading.Lock()
+        # 多个工作线程共享同一个连接，由锁保证串行访问
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS keyword_results ("
+            "site TEXT NOT NULL, zipcode TEXT NOT NULL, keyword TEXT NOT NULL, "
+            "search_conversion_rate TEXT, click_conversion_rate TEXT, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (site, zipcode, keyword))"
+        )
+        self.conn.commit()
+    
+    def get(self, site, zipcode, keyword):
+        """返回有效期内的缓存结果，没有或已过期时返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT search_conversion_rate, click_conversion_rate, updated_at FROM keyword_results "
+                "WHERE site = ? AND zipcode = ? AND keyword = ?",
+                (site, zipcode, keyword)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        data = {"搜索转化率": row[0], "点击转化率": row[1]}
+        ttl_seconds = self.empty_ttl_seconds if count_result_fields(data) == 0 else self.ttl_seconds
+        if row[2] < time.time() - ttl_seconds:
+            return None
+        return data
+    
+    def put(self, site, zipcode, keyword, data):
+        """保存一个关键词的结果，已有记录会被覆盖"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO keyword_results VALUES (?, ?, ?, ?, ?, ?)",
+                (site, zipcode, keyword, data["搜索转化率"], data["点击转化率"], time.time())
+            )
+            self.conn.commit()
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
+
+
+class ScrapeJournal:
+    """爬取结果日志（JSONL）
+    每个关键词提取完成后立即追加一行并写入磁盘，程序崩溃或被停止后可以从日志继续"""
+    
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+    
+    def reset(self):
+        """清空日志，开始新的任务"""
+        with self.lock:
+            open(self.journal_path, 'w', encoding='utf-8').close()
+    
+    def load(self):
+        """读取日志中的所有结果，同一关键词以最后一条为准"""
+        results = {}
+        if not os.path.exists(self.journal_path):
+            return results
+        
+        with self.lock:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        results[record["keyword"]] = record["data"]
+                    except (ValueError, KeyError):
+                        # 崩溃时可能留下不完整的最后一行，直接跳过
+                        continue
+        return results
+    
+    def append(self, keyword, data):
+        """追加一个关键词的结果，并立即刷新到磁盘"""
+        record = {"keyword": keyword, "data": data, "time": time.strftime('%Y-%m-%d %H:%M:%S')}
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class WorkbookBatch:
+    """批量模式中工作簿和关键词的对应关系
+    所有工作簿的关键词合并去重后由同一组浏览器搜索，某个工作簿的关键词全部完成后立即写出该工作簿"""
+    
+    def __init__(self, input_path):
+        self.input_path = input_path
+        self.workbooks = {}  # 工作簿路径 -> 关键词列表
+        self.pending = {}  # 工作簿路径 -> 还没有最终结果的关键词
+        self.written = set()
+        self.failed = []
+        self.lock = threading.Lock()
+        
+        # 后台写出线程，浏览器线程提交已完成的工作簿后立即继续搜索
+        self.write_queue = queue.Queue()
+        self.writer = None
+    
+    @staticmethod
+    def find_workbooks(input_path):
+        """输入为目录时返回其中所有Excel文件，否则按通配符查找
+        跳过之前生成的"_更新_"文件和Excel打开时留下的临时文件"""
+        if os.path.isdir(input_path):
+            paths = [os.path.join(input_path, name) for name in os.listdir(input_path)]
+        else:
+            paths = glob.glob(input_path)
+        return sorted(
+            path for path in paths
+            if path.lower().endswith((".xlsx", ".xlsm", ".xls"))
+            and "_更新_" not in os.path.basename(path)
+            and not os.path.basename(path).startswith("~$")
+        )
+    
+    @property
+    def output_base(self):
+        """批量模式的结果日志和用时报告的路径前缀（保存在输入目录中）"""
+        directory = self.input_path if os.path.isdir(self.input_path) else os.path.dirname(self.input_path)
+        return os.path.join(directory or ".", "batch")
+    
+    def add(self, excel_path, keywords):
+        self.workbooks[excel_path] = list(keywords)
+        self.pending[excel_path] = set(keywords)
+    
+    def finish(self, keyword):
+        """标记关键词已有最终结果（或已放弃），返回因此全部完成、需要写出的工作簿"""
+        completed = []
+        with self.lock:
+            for excel_path, pending in self.pending.items():
+                if keyword not in pending:
+                    continue
+                pending.discard(keyword)
+                if not pending and excel_path not in self.written:
+                    self.written.add(excel_path)
+                    completed.append(excel_path)
+        return completed
+    
+    def start_writer(self, write_workbook):
+        """启动后台线程，依次调用write_workbook(excel_path, workbook_results)写出提交的工作簿"""
+        self.writer = threading.Thread(target=self.write_loop, args=(write_workbook,))
+        self.writer.daemon = True
+        self.writer.start()
+    
+    def submit(self, excel_path, workbook_results):
+        """提交一个已完成的工作簿，立即返回"""
+        self.write_queue.put((excel_path, workbook_results))
+    
+    def write_loop(self, write_workbook):
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            
+            try:
+                write_workbook(*item)
+            except Exception as e:
+                print(f"写出工作簿时出现错误: {e}")
+                self.failed.append(item[0])
+    
+    def close_writer(self):
+        """等待已提交的工作簿全部写完后结束后台线程，可以重复调用"""
+        if self.writer is not None:
+            self.write_queue.put(None)
+            self.writer.join()
+            self.writer = None
+    
+    def take_unwritten(self):
+        """返回还没有写出的工作簿（任务被停止或部分关键词没有最终结果时），之后不会再次返回"""
+        with self.lock:
+            remaining = [excel_path for excel_path in self.workbooks if excel_path not in self.written]
+            self.written.update(remaining)
+        return remaining
+
+
+def percentile(sorted_values, p):
+    """按最近秩法计算已排序列表的百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(len(sorted_values) * p / 100) - 1)
+    return sorted_values[index]
+
+
+class PhaseTimer:
+    """按顺序记录一个关键词各阶段的用时，lap(name)把上次记录以来的时间计入该阶段"""
+    
+    def __init__(self):
+        self.phases = {name: 0.0 for name in TIMING_PHASES}
+        self.start_time = time.time()
+        self.last_time = self.start_time
+    
+    def lap(self, name):
+        now = time.time()
+        self.phases[name] += now - self.last_time
+        self.last_time = now
+    
+    def move(self, source, target, seconds):
+        """把一段已计入source阶段的时间改记到target阶段"""
+        seconds = min(seconds, self.phases[source])
+        self.phases[source] -= seconds
+        self.phases[target] += seconds
+    
+    def total(self):
+        return self.last_time - self.start_time
+
+
+class RunMetrics:
+    """运行报告：每个关键词一行阶段用时、提取方式和WebDriver命令数
+    报告按CSV或JSONL逐行追加写入，运行结束时输出p50/p95汇总，并可写出Prometheus文本文件"""
+    
+    FIELDS = ["keyword", "worker", "method", "commands"] + TIMING_PHASES + ["total"]
+    
+    def __init__(self, report_path=None, report_format="csv"):
+        self.records = []
+        self.lock = threading.Lock()
+        self.report_path = report_path
+        self.report_format = report_format
+        self.report_file = None
+        self.csv_writer = None
+        
+        if report_path:
+            self.report_file = open(report_path, 'w', encoding='utf-8-sig' if report_format == "csv" else 'utf-8', newline='')
+            if report_format == "csv":
+                self.csv_writer = csv.DictWriter(self.report_file, fieldnames=self.FIELDS)
+                self.csv_writer.writeheader()
+                self.report_file.flush()
+    
+    def add(self, keyword, worker, method, commands, timer):
+        """记录一个关键词的阶段用时"""
+        record = {"keyword": keyword, "worker": worker, "method": method or "none", "commands": commands}
+        record.update({name: round(seconds, 3) for name, seconds in timer.phases.items()})
+        record["total"] = round(timer.total(), 3)
+        
+        with self.lock:
+            self.records.append(record)
+            if self.report_file is not None:
+                if self.csv_writer is not None:
+                    self.csv_writer.writerow(record)
+                else:
+                    self.report_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.report_file.flush()
+    
+    def summarize(self):
+        """返回各阶段（以及总用时和命令数）的p50、p95和总和，以及各提取方式的关键词数"""
+        with self.lock:
+            records = list(self.records)
+        
+        summary = {}
+        for name in TIMING_PHASES + ["total", "commands"]:
+            values = sorted(record[name] for record in records)
+            summary[name] = {"p50": percentile(values, 50), "p95": percentile(values, 95), "sum": sum(values), "count": len(values)}
+        
+        methods = {}
+        for record in records:
+            methods[record["method"]] = methods.get(record["method"], 0) + 1
+        return summary, methods
+    
+    def print_summary(self):
+        """输出本次运行的用时汇总"""
+        summary, methods = self.summarize()
+        if not summary["total"]["count"]:
+            return
+        
+        print(f"\n本次共统计{summary['total']['count']}个关键词的用时（秒）:")
+        print(f"{'阶段':<14}{'p50':>8}{'p95':>8}{'合计':>10}")
+        for name in TIMING_PHASES + ["total"]:
+            stats = summary[name]
+            print(f"{name:<16}{stats['p50']:>8.2f}{stats['p95']:>8.2f}{stats['sum']:>10.1f}")
+        print(f"WebDriver命令数: p50 {summary['commands']['p50']}，p95 {summary['commands']['p95']}")
+        print("提取方式: " + ", ".join(f"{method} {count}" for method, count in sorted(methods.items())))
+        if self.report_path:
+            print(f"每个关键词的用时已保存到: {self.report_path}")
+    
+    def write_prometheus(self, path):
+        """以node_exporter textfile格式写出汇总指标，先写临时文件再替换，避免被读到一半"""
+        summary, methods = self.summarize()
+        lines = [
+            "# HELP amazon_auto_phase_seconds Per-keyword time spent in each scraping phase.",
+            "# TYPE amazon_auto_phase_seconds summary"
+        ]
+        for name in TIMING_PHASES + ["total"]:
+            stats = summary[name]
+            lines.append(f'amazon_auto_phase_seconds{{phase="{name}",quantile="0.5"}} {stats["p50"]}')
+            lines.append(f'amazon_auto_phase_seconds{{phase="{name}",quantile="0.95"}} {stats["p95"]}')
+            lines.append(f'amazon_auto_phase_seconds_sum{{phase="{name}"}} {stats["sum"]:.3f}')
+            lines.append(f'amazon_auto_phase_seconds_count{{phase="{name}"}} {stats["count"]}')
+        
+        stats = summary["commands"]
+        lines += [
+            "# HELP amazon_auto_webdriver_commands WebDriver commands sent per keyword.",
+            "# TYPE amazon_auto_webdriver_commands summary",
+            f'amazon_auto_webdriver_commands{{quantile="0.5"}} {stats["p50"]}',
+            f'amazon_auto_webdriver_commands{{quantile="0.95"}} {stats["p95"]}',
+            f'amazon_auto_webdriver_commands_sum {stats["sum"]}',
+            f'amazon_auto_webdriver_commands_count {stats["count"]}',
+            "# HELP amazon_auto_keywords Keywords scraped in the last run by extraction method.",
+            "# TYPE amazon_auto_keywords gauge"
+        ]
+        for method, count in sorted(methods.items()):
+            lines.append(f'amazon_auto_keywords{{method="{method}"}} {count}')
+        
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+        print(f"Prometheus指标已写入: {path}")
+    
+    def close(self):
+        if self.report_file is not None:
+            self.report_file.close()
+            self.report_file = None
+
+# 必须由配置提供的键（与GUI的get_current_config一致）
+REQUIRED_CONFIG_KEYS = [
+    "CHROME_DRIVER_PATH", "EXTENSION_PATH", "BROWSER_OPTIONS",
+    "PAGE_LOAD_TIMEOUT", "ELEMENT_WAIT_TIMEOUT", "QUICK_WAIT_TIMEOUT",
+    "AMAZON_SITE", "DELIVERY_ZIPCODE", "BLOCKED_RESOURCES",
+    "EXCEL_PATH", "SCREENSHOTS_DIR", "MAX_PRODUCTS",
+    "PLUGIN_DATA_WAIT_TIME", "PLUGIN_INITIAL_WAIT", "SEARCH_RESULT_INITIAL_WAIT",
+    "PLUGIN_DATA_PROCESSING_WAIT", "PRODUCT_SEARCH_INTERVAL", "MIN_PRODUCT_SEARCH_INTERVAL",
+    "DEFAULT_BROWSER_CLOSE_WAIT"
+]
+
+# 可选配置项及其默认值（与GUI中的默认值一致）
+CONFIG_DEFAULTS = {
+    "AMAZON_BASE_URL": "",
+    "PERSISTENT_PROFILE": False,
+    "PROFILE_DIR": "chrome_profiles",
+    "AMAZON_HOMEPAGE_WAIT": 10,
+    "DELIVERY_LOCATION_WAIT": 10,
+    "ADAPTIVE_WAIT": True,
+    "DIRECT_SEARCH_URL": True,
+    "RESULT_CACHE_ENABLED": False,
+    "RESULT_CACHE_TTL_HOURS": 168,
+    "RESULT_CACHE_EMPTY_TTL_HOURS": 24,
+    "SCREENSHOT_POLICY": "always",
+    "SCREENSHOT_EVERY_N": 10,
+    "SCREENSHOT_FORMAT": "jpeg",
+    "SCREENSHOT_QUALITY": 60,
+    "SCREENSHOT_CLIP_PLUGIN": False,
+    "WORKER_COUNT": 1,
+    "USE_MUTATION_OBSERVER": True,
+    "NETWORK_CAPTURE_ENABLED": False,
+    "NETWORK_CAPTURE_URL_PATTERN": "",
+    "NETWORK_CAPTURE_TIMEOUT": 10,
+    "NETWORK_CAPTURE_FIELDS": {"搜索转化率": "searchConversionRate", "点击转化率": "clickConversionRate"},
+    "NETWORK_CAPTURE_KEYWORD_FIELD": "keyword",
+    "NETWORK_CAPTURE_MISS_LIMIT": 3,
+    "REQUEST_INTERCEPTION_ENABLED": False,
+    "BLOCK_IMAGES": True,
+    "BLOCKED_RESOURCE_TYPES": ["Font", "Media"],
+    "BLOCKED_DOMAINS": ["amazon-adsystem.com", "doubleclick.net", "googlesyndication.com"],
+    "ALLOWED_DOMAINS": [],
+    "METRICS_REPORT_FORMAT": "csv",
+    "METRICS_PROMETHEUS_PATH": "",
+    "ADAPTIVE_RATE_LIMIT": True,
+    "RATE_LIMIT_MAX_INTERVAL": 120,
+    "RATE_LIMIT_EMPTY_STREAK": 3,
+    "BLOCKED_RETRY_LIMIT": 3,
+    "RETRY_PASS_ENABLED": True,
+    "RETRY_PLUGIN_DATA_WAIT_TIME": 30,
+    "KEYWORD_NORMALIZATION": True,
+    "TARGETS": [],
+    "EXCEL_BATCH_INPUT": "",
+    "BROWSER_ENGINE": "selenium",
+    "CDP_TAB_COUNT": 4
+}
+
+
+def load_config_dict(config_path=None):
+    """读取配置并整理成与GUI的get_current_config相同的字典
+    config_path可以是.py配置文件（与GUI保存的格式相同）或.toml文件，为None时使用默认的config模块"""
+    if config_path is None:
+        import config
+        settings = vars(config)
+    elif config_path.lower().endswith(".toml"):
+        import tomllib
+        with open(config_path, 'rb') as f:
+            settings = tomllib.load(f)
+    else:
+        spec = importlib.util.spec_from_file_location("temp_config", config_path)
+        temp_config = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(temp_config)
+        settings = vars(temp_config)
+    
+    missing_keys = [key for key in REQUIRED_CONFIG_KEYS if key not in settings]
+    if missing_keys:
+        raise KeyError(f"配置中缺少以下项: {', '.join(missing_keys)}")
+    
+    config_dict = {key: settings[key] for key in REQUIRED_CONFIG_KEYS}
+    for key, default in CONFIG_DEFAULTS.items():
+        config_dict[key] = settings.get(key, default)
+    return config_dict
+
+
+class ScreenshotWriter:
+    """后台截图写入
+    浏览器线程只负责通过CDP取得编码好的截图数据，解码和写盘在后台线程完成"""
+    
+    def __init__(self, screenshot_dir):
+        self.screenshot_dir = screenshot_dir
+        os.makedirs(screenshot_dir, exist_ok=True)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def submit(self, screenshot_path, data_base64):
+        """提交一张截图，立即返回"""
+        self.queue.put((screenshot_path, data_base64))
+    
+    def write_loop(self):
+        """后台线程：依次解码并写入截图文件"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            
+            screenshot_path, data_base64 = item
+            try:
+                with open(screenshot_path, 'wb') as f:
+                    f.write(base64.b64decode(data_base64))
+            except Exception as e:
+                print(f"写入截图时出现错误: {e}")
+    
+    def close(self):
+        """等待所有截图写完后结束后台线程"""
+        self.queue.put(None)
+        self.thread.join()
+
+
+class RequestInterceptor:
+    """基于CDP Fetch域的请求拦截
+    在后台线程中通过bidi_connection监听被暂停的请求，按资源类型和域名规则放行或拦截，
+    同时统计实际传输的字节数和被拦截的请求数，供每个关键词输出页面流量"""
+    
+    def __init__(self, driver, blocked_types, blocked_domains, allowed_domains):
+        self.driver = driver
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = [d.strip().lower() for d in blocked_domains if d.strip()]
+        self.allowed_domains = [d.strip().lower() for d in allowed_domains if d.strip()]
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.closed = False
+        self.error = None
+        self.reset_stats()
+        self.thread = threading.Thread(target=self.intercept_loop)
+        self.thread.daemon = True
+    
+    def start(self, timeout=10):
+        """启动后台拦截线程，等待Fetch域启用后返回是否成功"""
+        self.thread.start()
+        if not self.ready.wait(timeout):
+            self.error = self.error or f"{timeout}秒内未能启用请求拦截"
+        return self.error is None
+    
+    def reset_stats(self):
+        """清空流量统计"""
+        with self.lock:
+            self.transferred_bytes = 0
+            self.finished_requests = 0
+            self.blocked_by_type = {}
+    
+    def take_stats(self):
+        """返回自上次调用以来的流量统计并清零"""
+        with self.lock:
+            stats = {
+                "transferred_bytes": self.transferred_bytes,
+                "finished_requests": self.finished_requests,
+                "blocked_by_type": self.blocked_by_type
+            }
+            self.reset_stats()
+        return stats
+    
+    def domain_matches(self, host, domains):
+        return any(host == d or host.endswith("." + d) for d in domains)
+    
+    def should_block(self, url, resource_type):
+        """插件自身的请求和允许列表中的域名始终放行，其余按域名和资源类型判断"""
+        if not url.startswith("http"):
+            return False
+        host = (urlparse(url).hostname or "").lower()
+        if self.domain_matches(host, self.allowed_domains):
+            return False
+        if self.domain_matches(host, self.blocked_domains):
+            return True
+        return resource_type in self.blocked_types
+    
+    def intercept_loop(self):
+        """后台线程入口：trio和CDP相关模块只在启用拦截时才导入"""
+        try:
+            import trio
+            trio.run(self.intercept)
+        except Exception as e:
+            if not self.closed:
+                self.error = str(e)
+                print(f"请求拦截已停止: {e}")
+        finally:
+            self.ready.set()
+    
+    async def intercept(self):
+        import trio
+        
+        async with self.driver.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+            
+            # 只暂停需要判断的请求：被拦截的资源类型和被拦截域名下的所有请求
+            patterns = [devtools.fetch.RequestPattern(url_pattern="*", resource_type=devtools.network.ResourceType(t))
+                        for t in self.blocked_types]
+            patterns += [devtools.fetch.RequestPattern(url_pattern=f"*{d}*") for d in self.blocked_domains]
+            await session.execute(devtools.network.enable())
+            if patterns:
+                await session.execute(devtools.fetch.enable(patterns=patterns))
+            self.ready.set()
+            
+            async def handle_paused(event):
+                resource_type = event.resource_type.value
+                try:
+                    if self.should_block(event.request.url, resource_type):
+                        await session.execute(devtools.fetch.fail_request(
+                            request_id=event.request_id, error_reason=devtools.network.ErrorReason.BLOCKED_BY_CLIENT))
+                        with self.lock:
+                            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+                    else:
+                        await session.execute(devtools.fetch.continue_request(request_id=event.request_id))
+                except Exception:
+                    # 页面跳转后旧请求会失效，忽略即可
+                    pass
+            
+            async def wait_for_close(cancel_scope):
+                while not self.closed:
+                    await trio.sleep(0.2)
+                cancel_scope.cancel()
+            
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(wait_for_close, nursery.cancel_scope)
+                # selenium默认的事件通道只有10个位置，通道满时会直接丢弃事件；
+                # 丢失的requestPaused会让请求一直暂停导致页面卡住，因此不限制通道大小
+                async for event in session.listen(devtools.fetch.RequestPaused, devtools.network.LoadingFinished,
+                                                  buffer_size=math.inf):
+                    if isinstance(event, devtools.fetch.RequestPaused):
+                        nursery.start_soon(handle_paused, event)
+                    else:
+                        with self.lock:
+                            self.transferred_bytes += int(event.encoded_data_length)
+                            self.finished_requests += 1
+    
+    def close(self):
+        """结束后台拦截线程"""
+        self.closed = True
+        if self.thread.is_alive():
+            self.thread.join(2)
+
+
+class AmazonScraperEngine:
+    """不依赖界面的爬取引擎
+    config_dict的键与GUI的get_current_config相同；进度和状态通过回调函数通知调用方：
+    on_progress(current, total, status) 和 on_status(text)，日志通过print输出"""
+    
+    def __init__(self, config_dict, on_progress=None, on_status=None, wait_scheduler=None, rate_limiter=None):
+        self.config_dict = config_dict
+        self.on_progress = on_progress
+        self.on_status = on_status
+        
+        # 每个并行工作线程一个浏览器
+        self.drivers = []
+        self.drivers_lock = threading.Lock()
+        self.running = False
+        
+        # 自适应等待的延迟统计可以由调用方传入，在多次运行之间共享
+        self.wait_scheduler = wait_scheduler if wait_scheduler is not None else AdaptiveWaitScheduler()
+        
+        # 关键词结果缓存，仅在运行期间打开
+        self.result_cache = None
+        
+        # 当前任务的结果日志
+        self.journal = None
+        
+        # 后台截图写入线程，仅在运行期间存在
+        self.screenshot_writer = None
+        
+        # 每个关键词的阶段用时，仅在运行期间存在
+        self.metrics = None
+        
+        # 所有工作线程共享的搜索速率限制，仅在运行期间存在
+        self.rate_limiter = None
+        
+        # 调用方传入的速率限制（多目标模式中同一站点的所有目标共用一个），不传入时每次运行单独创建
+        self.shared_rate_limiter = rate_limiter
+        
+        # 遇到人机验证或错误页面的重试次数，以及超过重试次数后放弃的关键词
+        self.blocked_attempts = {}
+        self.abandoned_keywords = []
+        
+        # 连续未捕获到插件网络响应的关键词数，达到NETWORK_CAPTURE_MISS_LIMIT后本次运行不再等待网络响应
+        self.network_capture_misses = 0
+        self.network_capture_disabled = False
+        self.network_capture_lock = threading.Lock()
+        
+        # 每个工作线程当前可用的浏览器，主流程结束后由重试阶段继续使用
+        self.worker_drivers = {}
+        
+        # 关键词标准化后合并掉的重复行数，即节省的浏览器搜索次数
+        self.duplicate_keyword_count = 0
+        
+        # 多目标模式中当前引擎对应的目标（"站点 邮编"），单目标运行时为空
+        self.target_label = ""
+        
+        # 多目标模式中每个目标的引擎，以及不写Excel时收集到的结果
+        self.target_engines = []
+        self.collected_results = {}
+        
+        # 批量模式中的工作簿，仅在批量运行期间存在
+        self.workbook_batch = None
+    
+    def report_progress(self, current, total, status=None):
+        """通过回调通知进度"""
+        if self.on_progress is not None:
+            self.on_progress(current, total, status)
+    
+    def report_status(self, text):
+        """通过回调通知状态文字"""
+        if self.on_status is not None:
+            self.on_status(text)
+    
+    def stop(self):
+        """停止爬取任务并关闭所有浏览器"""
+        self.running = False
+        for engine in list(self.target_engines):
+            engine.stop()
+        self.close_all_browsers()
+    
+    def get_profile_path(self, config_dict, worker_id):
+        """返回(站点, 邮编)对应的持久化浏览器配置目录，每个工作线程使用单独的目录"""
+        profile_name = re.sub(r"[^\w.-]+", "_", f"{config_dict['AMAZON_SITE']}_{config_dict['DELIVERY_ZIPCODE']}_w{worker_id}")
+        return os.path.abspath(os.path.join(config_dict["PROFILE_DIR"], profile_name))
+    
+    def setup_browser_with_specific_extension(self, config_dict, profile_path=None):
+        """设置并启动Chrome浏览器，加载特定的电商数据分析插件
+        指定profile_path时使用该目录作为持久化的浏览器配置"""
+        # 配置Chrome选项
+        chrome_options = Options()
+        
+        # 使用持久化的浏览器配置，保留配送地址、插件状态和缓存
+        if profile_path:
+            os.makedirs(profile_path, exist_ok=True)
+            chrome_options.add_argument(f"--user-data-dir={profile_path}")
+            print(f"使用持久化浏览器配置: {profile_path}")
+        
+        # 从配置文件加载浏览器选项
+        if config_dict["BROWSER_OPTIONS"].get("start_maximized"):
+            chrome_options.add_argument("--start-maximized")
+        if config_dict["BROWSER_OPTIONS"].get("no_sandbox"):
+            chrome_options.add_argument("--no-sandbox")
+        if config_dict["BROWSER_OPTIONS"].get("disable_dev_shm_usage"):
+            chrome_options.add_argument("--disable-dev-shm-usage")
+        if config_dict["BROWSER_OPTIONS"].get("disable_extensions_file_access_check"):
+            chrome_options.add_argument("--disable-extensions-file-access-check")
+        if config_dict["BROWSER_OPTIONS"].get("headless"):
+            chrome_options.add_argument("--headless=new")
+        
+        # 加载插件（插件路径为空时不加载，例如针对本地模拟站点的基准测试）
+        if config_dict["EXTENSION_PATH"]:
+            chrome_options.add_argument(f"--load-extension={config_dict['EXTENSION_PATH']}")
+        
+        # 开启性能日志，用于捕获插件的网络响应
+        if config_dict["NETWORK_CAPTURE_ENABLED"]:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
+        # 异步CDP引擎同时使用多个标签页，不让后台或被遮挡的页面降低定时器和渲染频率
+        if config_dict["BROWSER_ENGINE"] == "cdp":
+            chrome_options.add_argument("--disable-background-timer-throttling")
+            chrome_options.add_argument("--disable-renderer-backgrounding")
+            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+        
+        # 防止检测自动化
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+        
+        # 创建浏览器实例
+        service = Service(executable_path=config_dict["CHROME_DRIVER_PATH"])
+        print("正在启动Chrome浏览器并加载电商数据分析插件...")
+        driver = webdriver.Chrome(options=chrome_options, service=service)
+        
+        # 修改navigator.webdriver标志
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        # 设置页面加载超时时间
+        driver.set_page_load_timeout(config_dict["PAGE_LOAD_TIMEOUT"])
+        
+        # 统计发送给chromedriver的命令数
+        self.install_command_counter(driver)
+        
+        return driver
+    
+    def install_command_counter(self, driver):
+        """统计WebDriver命令数，结果保存在driver.command_count中
+        所有命令（包括元素的.text、find_elements等）都会经过driver.execute"""
+        original_execute = driver.execute
+        driver.command_count = 0
+        
+        def counting_execute(driver_command, params=None):
+            driver.command_count += 1
+            return original_execute(driver_command, params)
+        
+        driver.execute = counting_execute
+    
+    def get_amazon_base_url(self, config_dict):
+        """返回亚马逊站点的根地址，配置了AMAZON_BASE_URL时使用该地址（例如本地模拟站点）"""
+        if config_dict["AMAZON_BASE_URL"]:
+            return config_dict["AMAZON_BASE_URL"].rstrip("/")
+        return f"https://www.{config_dict['AMAZON_SITE']}"
+    
+    def visit_amazon_homepage(self, driver, config_dict):
+        """访问亚马逊主页"""
+        url = f"{self.get_amazon_base_url(config_dict)}/"
+        print(f"正在访问亚马逊主页: {url}")
+        
+        try:
+            driver.get(url)
+            print("亚马逊主页已加载")
+        except TimeoutException:
+            print(f"亚马逊主页加载超时({config_dict['PAGE_LOAD_TIMEOUT']}秒)，已中断加载")
+            # 尝试停止页面加载
+            driver.execute_script("window.stop();")
+        
+        try:
+            # 只等待搜索框这个关键元素加载
+            WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                EC.presence_of_element_located((By.ID, "twotabsearchtextbox"))
+            )
+            print("亚马逊主页搜索框已加载，可以继续操作")
+            return True
+        except Exception as e:
+            print(f"等待搜索框超时: {e}")
+            return True  # 即使没有找到搜索框，也继续下一步
+    
+    def search_product(self, driver, keyword, config_dict):
+        """在亚马逊搜索特定产品"""
+        print(f"正在搜索产品: {keyword}")
+        
+        try:
+            # 标记当前页面为旧页面，用于判断新的搜索结果页是否已经加载
+            try:
+                driver.execute_script("window.__amazonAutoStale = true;")
+            except Exception:
+                pass
+            
+            # 直接跳转到搜索结果URL，省去等待搜索框和逐字输入的时间
+            if config_dict["DIRECT_SEARCH_URL"]:
+                if self.navigate_to_search_url(driver, keyword, config_dict):
+                    return True
+                print("直接跳转搜索URL未能打开搜索结果页，改用搜索框输入")
+            
+            # 减少等待时间，快速定位搜索框
+            try:
+                search_box = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                    EC.element_to_be_clickable((By.ID, "twotabsearchtextbox"))
+                )
+                
+                # 尝试使用JavaScript直接清空和设置值，这通常比send_keys快
+                driver.execute_script("arguments[0].value = '';", search_box)
+                search_box.send_keys(keyword)
+                print(f"已输入搜索关键词: {keyword}")
+                
+                # 优先使用回车键提交搜索，这通常比点击按钮更快
+                search_box.send_keys(Keys.RETURN)
+                print("使用回车键提交了搜索")
+            except TimeoutException:
+                print("搜索框加载超时，尝试直接操作")
+                try:
+                    search_box = driver.find_element(By.ID, "twotabsearchtextbox")
+                    driver.execute_script("arguments[0].value = '';", search_box)
+                    search_box.send_keys(keyword)
+                    search_box.send_keys(Keys.RETURN)
+                except:
+                    print("无法找到搜索框，继续下一步")
+                    return True
+            
+            if not self.wait_for_search_page(driver, config_dict):
+                print("搜索结果页面加载超时，继续下一步")
+                # 尝试停止页面加载
+                driver.execute_script("window.stop();")
+            
+            return True
+        except Exception as e:
+            print(f"搜索产品时出现错误: {e}")
+            # 即使出错也尝试继续流程
+            return True
+    
+    def navigate_to_search_url(self, driver, keyword, config_dict):
+        """直接跳转到亚马逊搜索结果URL，成功打开搜索结果页时返回True"""
+        url = f"{self.get_amazon_base_url(config_dict)}/s?k={quote_plus(keyword)}"
+        print(f"直接跳转到搜索结果页: {url}")
+        
+        try:
+            # 通过脚本跳转，不阻塞等待整个页面加载完成
+            driver.execute_script("window.location.href = arguments[0];", url)
+        except Exception as e:
+            print(f"跳转搜索结果页失败: {e}")
+            return False
+        
+        return self.wait_for_search_page(driver, config_dict)
+    
+    def wait_for_search_page(self, driver, config_dict):
+        """快速等待新的搜索结果页面出现，出现时返回True
+        上一个关键词的搜索结果页带有旧页面标记，不会被当成新页面"""
+        try:
+            # 页面跳转过程中执行脚本可能失败，忽略后继续等待
+            WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"], ignored_exceptions=(WebDriverException,)).until(
+                lambda d: d.execute_script(SEARCH_PAGE_STARTED_SCRIPT)
+            )
+            print("搜索结果页面开始加载")
+            return True
+        except TimeoutException:
+            return False
+    
+    def set_delivery_location(self, driver, config_dict):
+        """设置亚马逊配送地址"""
+        zipcode = config_dict["DELIVERY_ZIPCODE"]
+        print(f"正在尝试设置配送地址为: {zipcode}")
+        
+        try:
+            # 等待并点击配送地址按钮
+            try:
+                WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                    EC.element_to_be_clickable((By.ID, "glow-ingress-block"))
+                ).click()
+                print("点击了配送地址按钮")
+            except TimeoutException:
+                print("配送地址按钮加载超时，尝试直接点击")
+                try:
+                    driver.find_element(By.ID, "glow-ingress-block").click()
+                except:
+                    print("无法找到配送地址按钮，继续下一步")
+                    return True
+            
+            # 只等待必要的元素 - 邮政编码输入框
+            try:
+                zipcode_input = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                    EC.presence_of_element_located((By.ID, "GLUXZipUpdateInput"))
+                )
+                zipcode_input.clear()
+                zipcode_input.send_keys(zipcode)
+                print(f"输入了邮政编码: {zipcode}")
+                
+                # 等待并点击设置按钮 (GLUXZipUpdate)
+                try:
+                    # 使用更长的超时时间确保按钮可点击
+                    update_button = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                        EC.element_to_be_clickable((By.ID, "GLUXZipUpdate"))
+                    )
+                    update_button.click()
+                    print("点击了设置按钮 (GLUXZipUpdate)")
+                except Exception as e:
+                    print(f"通过ID查找设置按钮失败: {e}")
+                    # 备用方案：尝试通过XPath查找设置按钮
+                    try:
+                        xpath_selector = "//span[@id='GLUXZipUpdate-announce'][contains(text(), '设置')]/ancestor::span[@id='GLUXZipUpdate']"
+                        update_button = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
+                            EC.element_to_be_clickable((By.XPATH, xpath_selector))
+                        )
+                        update_button.click()
+                        print("通过XPath点击了设置按钮")
+                    except Exception as e2:
+                        print(f"通过XPath查找设置按钮失败: {e2}")
+                        # 最后尝试使用JavaScript点击
+                        try:
+                            driver.execute_script("document.getElementById('GLUXZipUpdate').getElementsByTagName('input')[0].click();")
+                            print("通过JavaScript点击了设置按钮")
+                        except Exception as e3:
+                            print(f"所有尝试点击设置按钮都失败: {e3}")
+                            print("将继续尝试其他操作")
+                
+                # 减少等待对话框的时间
+                time.sleep(config_dict["QUICK_WAIT_TIMEOUT"])  # 给一点时间让对话框显示
+                
+                # 尝试更快地找到并点击完成按钮
+                try:
+                    # 尝试通过多种选择器快速找到完成按钮
+                    selectors = [
+                        (By.NAME, "glowDoneButton"),
+                        (By.ID, "GLUXConfirmClose"),
+                        (By.XPATH, "//div[contains(@class, 'a-popover-footer')]//input"),
+                        (By.XPATH, "//div[contains(@class, 'a-popover-footer')]//button"),
+                        (By.XPATH, "//span[contains(text(), 'Done')]//parent::*")
+                    ]
+                    
+                    for selector in selectors:
+                        try:
+                            elements = WebDriverWait(driver, config_dict["QUICK_WAIT_TIMEOUT"]).until(
+                                EC.element_to_be_clickable(selector)
+                            )
+                            elements.click()
+                            print(f"点击了完成按钮，使用选择器: {selector}")
+                            break
+                        except:
+                            continue
+                except:
+                    print("无法找到完成按钮，尝试继续操作")
+                
+                # 减少等待页面刷新的时间
+                time.sleep(config_dict["QUICK_WAIT_TIMEOUT"])
+                
+                return True
+            except TimeoutException:
+                print("邮政编码输入框加载超时，继续下一步")
+                return True
+                
+        except Exception as e:
+            print(f"设置配送地址时出现错误: {e}")
+            return True  # 更改为True以不中断主流程
+    
+    def wait_for_plugin_render(self, driver, timeout):
+        """注入MutationObserver，在插件数据行或"暂无数据"提示出现时立即返回
+        返回 'data'、'empty'、'timeout'，脚本执行失败时返回None"""
+        try:
+            # 异步脚本超时需要比页面内的超时稍长，保证由页面脚本先返回'timeout'
+            driver.set_script_timeout(timeout + 5)
+            return driver.execute_async_script(PLUGIN_READY_SCRIPT, int(timeout * 1000))
+        except TimeoutException:
+            return "timeout"
+        except Exception as e:
+            # 页面跳转等情况会导致脚本中断，此时回退到轮询方式
+            print(f"监听插件渲染失败，回退到轮询方式: {e}")
+            return None
+    
+    def extract_plugin_table_with_script(self, driver):
+        """通过一次execute_script调用读取插件表格状态和第一行的转化率数据
+        脚本执行失败时返回None"""
+        try:
+            return driver.execute_script(PLUGIN_TABLE_SCRIPT)
+        except Exception as e:
+            print(f"通过脚本读取插件表格失败: {e}")
+            return None
+    
+    def drain_network_log(self, driver):
+        """丢弃已积累的性能日志，避免把上一个关键词的响应当成本次的数据"""
+        try:
+            driver.get_log("performance")
+        except Exception as e:
+            print(f"读取性能日志失败: {e}")
+    
+    def wait_for_plugin_response(self, driver, config_dict, keyword, prefix=""):
+        """通过性能日志监听插件发出的XHR/fetch请求，响应加载完成后立即解析其中的转化率
+        超时或没有匹配的响应时返回None，由页面提取兜底"""
+        url_pattern = config_dict["NETWORK_CAPTURE_URL_PATTERN"]
+        url_regex = re.compile(url_pattern) if url_pattern else None
+        timeout = config_dict["NETWORK_CAPTURE_TIMEOUT"]
+        start_time = time.time()
+        pending_requests = {}  # requestId -> url
+        
+        while self.running and time.time() - start_time < timeout:
+            try:
+                entries = driver.get_log("performance")
+            except Exception as e:
+                print(f"{prefix}读取性能日志失败，回退到页面提取: {e}")
+                return None
+            
+            for entry in entries:
+                try:
+                    message = json.loads(entry["message"])["message"]
+                except (KeyError, TypeError, ValueError):
+                    continue
+                method = message.get("method")
+                params = message.get("params", {})
+                
+                if method == "Network.responseReceived":
+                    if params.get("type") not in ("XHR", "Fetch"):
+                        continue
+                    url = params.get("response", {}).get("url", "")
+                    if url_regex is None or url_regex.search(url):
+                        pending_requests[params.get("requestId")] = url
+                elif method == "Network.loadingFinished" and params.get("requestId") in pending_requests:
+                    url = pending_requests.pop(params["requestId"])
+                    keyword_data = self.parse_plugin_response(driver, config_dict, params["requestId"], keyword)
+                    if keyword_data is not None:
+                        print(f"{prefix}从插件网络响应中获取到数据，用时 {time.time() - start_time:.2f} 秒: {url}")
+                        return keyword_data
+            
+            time.sleep(0.2)
+        
+        print(f"{prefix}{timeout}秒内未捕获到插件的网络响应，回退到页面提取")
+        return None
+    
+    def record_network_capture(self, config_dict, captured, prefix=""):
+        """记录一次网络响应捕获是否成功；连续多次未捕获（例如插件通过service worker请求数据）时，
+        本次运行后续的关键词直接从页面提取，不再每个关键词等待NETWORK_CAPTURE_TIMEOUT"""
+        limit = config_dict["NETWORK_CAPTURE_MISS_LIMIT"]
+        with self.network_capture_lock:
+            if captured:
+                self.network_capture_misses = 0
+                return
+            self.network_capture_misses += 1
+            if limit <= 0 or self.network_capture_misses < limit or self.network_capture_disabled:
+                return
+            self.network_capture_disabled = True
+        print(f"{prefix}连续{limit}个关键词未捕获到插件的网络响应，本次运行后续关键词改为直接从页面提取")
+    
+    def parse_plugin_response(self, driver, config_dict, request_id, keyword):
+        """读取响应内容并从JSON中找出当前关键词的转化率，不是插件数据时返回None"""
+        try:
+            response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            # 响应内容可能已被浏览器释放
+            return None
+        
+        body = response.get("body", "")
+        if response.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", errors="replace")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        
+        fields = config_dict["NETWORK_CAPTURE_FIELDS"]
+        keyword_field = config_dict["NETWORK_CAPTURE_KEYWORD_FIELD"]
+        record = self.find_plugin_record(payload, fields, keyword_field, keyword)
+        if record is None:
+            # 响应属于当前关键词但没有任何数据记录（例如 {"keyword": ..., "data": []}），即插件暂无数据，不必等到超时
+            if keyword_field and self.payload_has_keyword(payload, keyword_field, keyword):
+                return {"搜索转化率": "无", "点击转化率": "无"}
+            return None
+        
+        return {
+            "搜索转化率": self.format_conversion_rate(record.get(fields.get("搜索转化率"))),
+            "点击转化率": self.format_conversion_rate(record.get(fields.get("点击转化率")))
+        }
+    
+    def find_plugin_record(self, payload, fields, keyword_field, keyword):
+        """在JSON中深度优先查找包含转化率字段的对象
+        对象（或其上层对象）带有关键词字段且与当前关键词不一致时跳过"""
+        if isinstance(payload, list):
+            for item in payload:
+                record = self.find_plugin_record(item, fields, keyword_field, keyword)
+                if record is not None:
+                    return record
+            return None
+        
+        if not isinstance(payload, dict):
+            return None
+        
+        if keyword_field and isinstance(payload.get(keyword_field), str):
+            if normalize_keyword(payload[keyword_field]) != normalize_keyword(keyword):
+                return None
+        
+        if any(field in payload for field in fields.values()):
+            return payload
+        
+        for value in payload.values():
+            if isinstance(value, (dict, list)):
+                record = self.find_plugin_record(value, fields, keyword_field, keyword)
+                if record is not None:
+                    return record
+        return None
+    
+    def payload_has_keyword(self, payload, keyword_field, keyword):
+        """JSON中是否有对象的关键词字段与当前关键词一致"""
+        if isinstance(payload, list):
+            return any(self.payload_has_keyword(item, keyword_field, keyword) for item in payload)
+        if not isinstance(payload, dict):
+            return False
+        if isinstance(payload.get(keyword_field), str) and normalize_keyword(payload[keyword_field]) == normalize_keyword(keyword):
+            return True
+        return any(self.payload_has_keyword(value, keyword_field, keyword)
+                   for value in payload.values() if isinstance(value, (dict, list)))
+    
+    def format_conversion_rate(self, value):
+        """将响应中的转化率转换成与页面一致的格式，数值按百分数处理（12.5 -> "12.5%"）"""
+        if value is None or isinstance(value, bool) or value == "":
+            return "无"
+        if isinstance(value, (int, float)):
+            return f"{value:g}%"
+        return str(value).strip()
+    
+    def extract_keyword_data(self, driver, config_dict, stats=None, wait_for_complete=False):
+        """从插件数据面板中提取关键词数据
+        返回一个字典，包含搜索转化率和点击转化率
+        如果传入stats字典，会在其中记录成功的提取方式（method）和结果分类（status）
+        wait_for_complete为True时只取到部分数据也继续等待，直到两项数据都取到或超时"""
+        print("等待插件数据加载...")
+        
+        if stats is None:
+            stats = {}
+        stats["method"] = None
+        stats["status"] = "timeout"
+        
+        start_time = time.time()
+        search_conversion_rate = "无"
+        click_conversion_rate = "无"
+        
+        # 源码匹配的开销较大，每个关键词最多执行一次
+        source_checked = False
+        
+        # 插件已渲染数据时至少读取一次表格，即使等待渲染已经用完了全部等待时间
+        must_read = False
+        
+        # 事件驱动模式：一次异步脚本调用等待插件渲染完成，避免每秒轮询
+        if config_dict["USE_MUTATION_OBSERVER"]:
+            plugin_state = self.wait_for_plugin_render(driver, config_dict["PLUGIN_DATA_WAIT_TIME"])
+            stats["plugin_wait"] = time.time() - start_time
+            if plugin_state == "empty":
+                print("插件提示暂无数据")
+                stats["status"] = "empty"
+                return {"搜索转化率": "无", "点击转化率": "无"}
+            if plugin_state == "timeout":
+                print(f"等待超时({config_dict['PLUGIN_DATA_WAIT_TIME']}秒)，插件未渲染数据")
+                return {"搜索转化率": "无", "点击转化率": "无"}
+            if plugin_state == "data":
+                print(f"插件数据已渲染，用时 {time.time() - start_time:.2f} 秒")
+                must_read = True
+        
+        # 等待插件加载数据
+        while must_read or time.time() - start_time < config_dict["PLUGIN_DATA_WAIT_TIME"]:
+            must_read = False
+            try:
+                # 方法0: 一次脚本调用完成表格检查、列定位和取值
+                table_state = self.extract_plugin_table_with_script(driver)
+                
+                if table_state is None:
+                    # 脚本不可用时，使用元素查找检查是否有表格存在
+                    tables = driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-table-content')]")
+                    if not tables:
+                        print("未找到数据表格，继续等待...")
+                        time.sleep(1)
+                        continue
+                    
+                    # 检查是否有"暂无数据"提示
+                    if len(driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-empty-description') and contains(text(), '暂无数据')]")) > 0:
+                        print("插件提示暂无数据")
+                        stats["status"] = "empty"
+                        return {"搜索转化率": "无", "点击转化率": "无"}
+                else:
+                    if not table_state.get("table"):
+                        print("未找到数据表格，继续等待...")
+                        time.sleep(1)
+                        continue
+                    
+                    if table_state.get("empty"):
+                        print("插件提示暂无数据")
+                        stats["status"] = "empty"
+                        return {"搜索转化率": "无", "点击转化率": "无"}
+                    
+                    if table_state.get("search"):
+                        search_conversion_rate = table_state["search"]
+                        print(f"通过脚本获取到搜索转化率: {search_conversion_rate}")
+                    if table_state.get("click"):
+                        click_conversion_rate = table_state["click"]
+                        print(f"通过脚本获取到点击转化率: {click_conversion_rate}")
+                    if search_conversion_rate != "无" or click_conversion_rate != "无":
+                        stats["method"] = "script"
+                
+                # 只有脚本没有取到任何数据时，才使用下面的逐个元素查找方式
+                use_fallback = stats["method"] is None
+                
+                # 多种方式尝试定位搜索转化率和点击转化率数据
+                # 方法1: 通过表格标题行
+                if use_fallback:
+                    try:
+                        # 查找表格标题行中"搜索转化率"和"点击转化率"的位置
+                        headers = driver.find_elements(By.XPATH, "//th[contains(@class, 'ant-table-cell')]//div[contains(@class, 'ant-flex')]//div[not(contains(@class, 'sc-feUYzb'))]")
+                        
+                        search_conv_index = -1
+                        click_conv_index = -1
+                        
+                        for i, header in enumerate(headers):
+                            header_text = header.text.strip()
+                            if "搜索转化率" in header_text:
+                                search_conv_index = i
+                            elif "点击转化率" in header_text:
+                                click_conv_index = i
+                        
+                        # 如果找到了列索引，则尝试获取数据
+                        if search_conv_index >= 0 and click_conv_index >= 0:
+                            # 获取所有数据行
+                            rows = driver.find_elements(By.XPATH, "//tr[contains(@class, 'ant-table-row')]")
+                            
+                            if rows:
+                                # 获取第一行的单元格
+                                cells = rows[0].find_elements(By.XPATH, ".//td")
+                                
+                                if len(cells) > search_conv_index:
+                                    search_conversion_rate = cells[search_conv_index].text.strip()
+                                    if search_conversion_rate:
+                                        print(f"获取到搜索转化率: {search_conversion_rate}")
+                                    else:
+                                        search_conversion_rate = "无"
+                                
+                                if len(cells) > click_conv_index:
+                                    click_conversion_rate = cells[click_conv_index].text.strip()
+                                    if click_conversion_rate:
+                                        print(f"获取到点击转化率: {click_conversion_rate}")
+                                    else:
+                                        click_conversion_rate = "无"
+                                
+                                if stats["method"] is None and (search_conversion_rate != "无" or click_conversion_rate != "无"):
+                                    stats["method"] = "header"
+                    except Exception as e:
+                        print(f"通过表格标题尝试获取数据失败: {e}")
+                
+                # 方法2: 直接通过固定位置尝试
+                if use_fallback and (search_conversion_rate == "无" or click_conversion_rate == "无"):
+                    try:
+                        # 假设搜索转化率在第5列，点击转化率在第6列（根据示例判断）
+                        rows = driver.find_elements(By.XPATH, "//tr[contains(@class, 'ant-table-row')]")
+                        if rows:
+                            cells = rows[0].find_elements(By.XPATH, ".//td")
+                            if len(cells) > 4:  # 第5列（索引为4）
+                                search_conversion_rate = cells[4].text.strip()
+                                if search_conversion_rate:
+                                    print(f"通过固定位置获取到搜索转化率: {search_conversion_rate}")
+                            
+                            if len(cells) > 5:  # 第6列（索引为5）
+                                click_conversion_rate = cells[5].text.strip()
+                                if click_conversion_rate:
+                                    print(f"通过固定位置获取到点击转化率: {click_conversion_rate}")
+                            
+                            if stats["method"] is None and (search_conversion_rate != "无" or click_conversion_rate != "无"):
+                                stats["method"] = "position"
+                    except Exception as e:
+                        print(f"通过固定位置尝试获取数据失败: {e}")
+                
+                # 方法3: 尝试通过插件表格的源码查找（每个关键词最多一次）
+                if use_fallback and not source_checked and (search_conversion_rate == "无" or click_conversion_rate == "无"):
+                    source_checked = True
+                    try:
+                        # 只获取插件表格容器的HTML，而不是整个页面源码
+                        panel_html = driver.execute_script(PLUGIN_PANEL_HTML_SCRIPT) or ""
+                        
+                        # 使用预编译的正则表达式查找搜索转化率和点击转化率
+                        search_match = SEARCH_CONVERSION_PATTERN.search(panel_html)
+                        click_match = CLICK_CONVERSION_PATTERN.search(panel_html)
+                        
+                        if search_match:
+                            search_conversion_rate = search_match.group(1)
+                            print(f"通过源码获取到搜索转化率: {search_conversion_rate}")
+                        
+                        if click_match:
+                            click_conversion_rate = click_match.group(1)
+                            print(f"通过源码获取到点击转化率: {click_conversion_rate}")
+                        
+                        if stats["method"] is None and (search_match or click_match):
+                            stats["method"] = "source"
+                    except Exception as e:
+                        print(f"通过页面源码尝试获取数据失败: {e}")
+                
+                # 如果两个数据都获取到了，就可以返回结果了
+                if search_conversion_rate != "无" and click_conversion_rate != "无":
+                    stats["status"] = "complete"
+                    return {
+                        "搜索转化率": search_conversion_rate,
+                        "点击转化率": click_conversion_rate
+                    }
+                
+                # 如果已经有部分数据，就直接返回（重试阶段继续等待完整数据）
+                if not wait_for_complete and (search_conversion_rate != "无" or click_conversion_rate != "无"):
+                    print("只获取到部分数据，将继续使用")
+                    stats["status"] = "partial"
+                    return {
+                        "搜索转化率": search_conversion_rate,
+                        "点击转化率": click_conversion_rate
+                    }
+                    
+            except Exception as e:
+                print(f"提取数据时出现错误: {e}")
+            
+            # 短暂等待后再次尝试
+            time.sleep(1)
+            print(f"已等待 {int(time.time() - start_time)} 秒，继续尝试获取数据...")
+        
+        print(f"等待超时({config_dict['PLUGIN_DATA_WAIT_TIME']}秒)，无法获取完整数据")
+        keyword_data = {
+            "搜索转化率": search_conversion_rate,
+            "点击转化率": click_conversion_rate
+        }
+        stats["status"] = classify_result(keyword_data)
+        return keyword_data
+    
+    def read_product_names_from_excel(self, excel_path, max_products, normalize=False):
+        """从Excel文件中读取产品名
+        只读取"流量词"一列，读到max_products个有效产品名后立即停止；
+        完整的数据在写回结果时才会读取
+        normalize为True时返回标准化并去重后的关键词，max_products按去重后的数量计算"""
+        self.duplicate_keyword_count = 0
+        try:
+            # 检查文件是否存在
+            if not os.path.exists(excel_path):
+                print(f"错误: 找不到Excel文件: {excel_path}")
+                return []
+            
+            print(f"正在读取Excel文件: {excel_path}")
+            if excel_path.lower().endswith((".xlsx", ".xlsm")):
+                column_values = self.iter_keyword_column_xlsx(excel_path)
+            else:
+                # openpyxl不支持旧版.xls文件，使用pandas但只解析需要的列
+                columns = pd.read_excel(excel_path, nrows=0).columns.tolist()
+                if "流量词" in columns:
+                    column_values = iter(pd.read_excel(excel_path, usecols=["流量词"])["流量词"].tolist())
+                else:
+                    print(f"错误: Excel文件中没有'流量词'列")
+                    print(f"可用列: {columns}")
+                    column_values = None
+            
+            # 检查是否有"流量词"列
+            if column_values is None:
+                return []
+            
+            # 过滤掉空值和NaN值，读到max_products个产品名后停止
+            product_names = []
+            seen_names = set()
+            for name in column_values:
+                if pd.isna(name):
+                    continue
+                if not isinstance(name, str):
+                    name = str(name)
+                if not name.strip():
+                    continue
+                if normalize:
+                    name = normalize_keyword(name)
+                    if name in seen_names:
+                        self.duplicate_keyword_count += 1
+                        continue
+                    seen_names.add(name)
+                product_names.append(name)
+                if len(product_names) >= max_products:
+                    break
+            
+            # 提前停止时关闭流式读取的工作簿
+            if hasattr(column_values, "close"):
+                column_values.close()
+            
+            print(f"成功读取{len(product_names)}个产品名")
+            if self.duplicate_keyword_count:
+                print(f"标准化后合并了{self.duplicate_keyword_count}个重复的关键词（大小写、空格或全角字符不同），"
+                      f"这些行将使用同一个搜索结果")
+            return product_names
+        
+        except Exception as e:
+            print(f"读取Excel文件时出现错误: {e}")
+            return []
+    
+    def iter_keyword_column_xlsx(self, excel_path):
+        """以只读流式方式逐行读取第一个工作表的"流量词"列
+        找不到该列时返回None"""
+        workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        worksheet = workbook.worksheets[0]
+        header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        
+        if "流量词" not in header:
+            print(f"错误: Excel文件中没有'流量词'列")
+            # 打印所有列名以便调试
+            print(f"可用列: {[column for column in header if column is not None]}")
+            workbook.close()
+            return None
+        
+        column_number = header.index("流量词") + 1
+        
+        def generate():
+            try:
+                for (value,) in worksheet.iter_rows(min_row=2, min_col=column_number, max_col=column_number, values_only=True):
+                    yield value
+            finally:
+                workbook.close()
+        
+        return generate()
+    
+    def get_target_suffix(self):
+        """多目标模式中用于区分各目标输出文件的后缀，单目标运行时为空"""
+        if not self.target_label:
+            return ""
+        return "_" + re.sub(r"[^\w.-]+", "_", self.target_label)
+    
+    def get_output_base(self, config_dict):
+        """结果日志和用时报告的路径前缀：单个文件时为Excel文件名，批量模式时为输入目录下的batch"""
+        if self.workbook_batch is not None:
+            return self.workbook_batch.output_base
+        return os.path.splitext(config_dict["EXCEL_PATH"])[0]
+    
+    def get_journal_path(self, output_base):
+        """返回结果日志路径，output_base是get_output_base返回的路径前缀（已去掉扩展名），
+        多目标模式中每个目标一个日志"""
+        return output_base + self.get_target_suffix() + "_journal.jsonl"
+    
+    def close_all_browsers(self):
+        """关闭所有工作线程的浏览器"""
+        with self.drivers_lock:
+            drivers = list(self.drivers)
+            self.drivers.clear()
+        
+        for driver in drivers:
+            interceptor = getattr(driver, "request_interceptor", None)
+            if interceptor is not None:
+                interceptor.close()
+            try:
+                driver.quit()
+                print("已关闭浏览器")
+            except:
+                print("关闭浏览器时出错")
+    
+    def countdown(self, seconds, message):
+        """倒计时等待，每秒检查一次是否停止运行"""
+        for i in range(seconds, 0, -1):
+            if not self.running:
+                break
+            self.report_status(message.format(i))
+            time.sleep(1)
+    
+    def wait_for_page_signal(self, driver, name, script, worst_case, description, *script_args, prefix=""):
+        """等待页面就绪信号，最长等待时间由自适应等待调度器决定"""
+        ready, elapsed = self.wait_scheduler.wait_until(
+            name,
+            lambda: driver.execute_script(script, *script_args),
+            worst_case,
+            lambda: self.running
+        )
+        if ready:
+            print(f"{prefix}{description}已就绪，用时 {elapsed:.2f} 秒")
+        else:
+            print(f"{prefix}等待{description}达到上限 {elapsed:.2f} 秒，继续下一步")
+        return ready
+    
+    def delivery_location_matches(self, driver, config_dict):
+        """快速检查页面顶部的配送地址是否已经是目标邮编"""
+        try:
+            WebDriverWait(driver, config_dict["QUICK_WAIT_TIMEOUT"]).until(
+                lambda d: d.execute_script(DELIVERY_LOCATION_READY_SCRIPT, config_dict["DELIVERY_ZIPCODE"])
+            )
+            return True
+        except Exception:
+            return False
+    
+    def start_request_interceptor(self, driver, config_dict, prefix=""):
+        """为浏览器启动请求拦截，成功后保存在driver.request_interceptor中"""
+        blocked_types = list(config_dict["BLOCKED_RESOURCE_TYPES"])
+        if config_dict["BLOCK_IMAGES"] and "Image" not in blocked_types:
+            blocked_types.append("Image")
+        
+        interceptor = RequestInterceptor(driver, blocked_types, config_dict["BLOCKED_DOMAINS"], config_dict["ALLOWED_DOMAINS"])
+        if interceptor.start():
+            driver.request_interceptor = interceptor
+            print(f"{prefix}已启用请求拦截，拦截资源类型: {', '.join(blocked_types) or '无'}，"
+                  f"拦截域名: {', '.join(interceptor.blocked_domains) or '无'}")
+        else:
+            interceptor.close()
+            print(f"{prefix}启用请求拦截失败，只使用屏蔽资源列表: {interceptor.error}")
+    
+    def report_traffic(self, traffic, prefix=""):
+        """输出一个关键词的页面流量统计：实际传输的字节数和请求数，以及按资源类型统计的拦截请求数
+        被拦截的请求在发出之前就已失败，没有响应头可以读取大小，因此拦截部分只统计请求数量"""
+        blocked_by_type = traffic["blocked_by_type"]
+        blocked_total = sum(blocked_by_type.values())
+        blocked_detail = ", ".join(f"{t} {n}" for t, n in sorted(blocked_by_type.items(), key=lambda item: -item[1]))
+        print(f"{prefix}页面流量: 传输 {traffic['transferred_bytes'] / 1024:.1f} KB（{traffic['finished_requests']}个请求），"
+              f"拦截 {blocked_total}个请求" + (f"（{blocked_detail}）" if blocked_detail else ""))
+    
+    def prepare_browser(self, config_dict, prefix="", worker_id=1):
+        """启动一个浏览器实例，并完成访问主页和设置配送地址等准备工作"""
+        profile_path = self.get_profile_path(config_dict, worker_id) if config_dict["PERSISTENT_PROFILE"] else None
+        driver = self.setup_browser_with_specific_extension(config_dict, profile_path)
+        with self.drivers_lock:
+            self.drivers.append(driver)
+        
+        # 减少插件加载等待时间
+        print(f"{prefix}等待插件加载...")
+        time.sleep(config_dict["PLUGIN_INITIAL_WAIT"])
+        
+        # 设置页面加载策略，但允许加载图片元素
+        driver.execute_script("window.onbeforeunload = function() { return null; };")
+        driver.execute_cdp_cmd('Page.setLifecycleEventsEnabled', {'enabled': True})
+        # 只阻止非必要的第三方资源，保留图片加载
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": config_dict["BLOCKED_RESOURCES"]})
+        driver.execute_cdp_cmd('Network.enable', {})
+        
+        # 按资源类型和域名规则拦截请求
+        if config_dict["REQUEST_INTERCEPTION_ENABLED"]:
+            self.start_request_interceptor(driver, config_dict, prefix)
+        
+        # 直接访问亚马逊主页
+        self.visit_amazon_homepage(driver, config_dict)
+        
+        # 复用持久化配置且配送地址已经正确时，跳过整个设置阶段
+        if profile_path and self.delivery_location_matches(driver, config_dict):
+            print(f"{prefix}配送地址已是 {config_dict['DELIVERY_ZIPCODE']}，跳过配送地址设置")
+            return driver
+        
+        # 访问亚马逊主页后等待指定时间
+        homepage_wait = config_dict["AMAZON_HOMEPAGE_WAIT"]
+        if config_dict["ADAPTIVE_WAIT"]:
+            self.wait_for_page_signal(driver, "homepage", HOMEPAGE_READY_SCRIPT, homepage_wait, "亚马逊主页", prefix=prefix)
+        else:
+            print(f"{prefix}亚马逊主页加载后等待 {homepage_wait} 秒...")
+            self.countdown(homepage_wait, prefix + "亚马逊主页加载后等待 {} 秒...")
+        
+        # 设置配送地址
+        self.set_delivery_location(driver, config_dict)
+        
+        # 设置配送地址后等待指定时间
+        location_wait = config_dict["DELIVERY_LOCATION_WAIT"]
+        if config_dict["ADAPTIVE_WAIT"]:
+            self.wait_for_page_signal(driver, "delivery_location", DELIVERY_LOCATION_READY_SCRIPT, location_wait,
+                                      "配送地址", config_dict["DELIVERY_ZIPCODE"], prefix=prefix)
+        else:
+            print(f"{prefix}设置配送地址后等待 {location_wait} 秒...")
+            self.countdown(location_wait, prefix + "设置配送地址后等待 {} 秒...")
+        
+        return driver
+    
+    def scrape_worker(self, worker_id, config_dict, keyword_queue, results, progress, lock, retry_keywords=None, retry_pass=False):
+        """单个浏览器工作线程：独立准备浏览器，然后从共享队列中依次领取关键词进行搜索
+        传入retry_keywords列表时，把部分数据和等待超时的关键词记录到其中
+        retry_pass为True时使用主流程留下的浏览器，只在结果比原来更完整时才更新"""
+        prefix = f"[浏览器{worker_id}] " if config_dict["WORKER_COUNT"] > 1 else ""
+        if self.target_label:
+            prefix = f"[{self.target_label}] {prefix}"
+        total = progress["total"]
+        
+        if retry_pass:
+            with self.drivers_lock:
+                driver = self.worker_drivers.get(worker_id)
+            if driver is None:
+                return
+        else:
+            try:
+                driver = self.prepare_browser(config_dict, prefix, worker_id)
+            except Exception as e:
+                print(f"{prefix}浏览器准备失败，该工作线程将退出: {e}")
+                return
+            with self.drivers_lock:
+                self.worker_drivers[worker_id] = driver
+        
+        while self.running:
+            try:
+                product_name = keyword_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            try:
+                with lock:
+                    done = progress["done"]
+                
+                # 更新进度条
+                self.report_progress(done, total, f"{prefix}正在搜索: {product_name} ({done + 1}/{total})")
+                
+                print(f"\n--- {prefix}搜索: {product_name} ---")
+                
+                # 记录每个阶段的用时
+                timer = PhaseTimer()
+                
+                # 按所有浏览器共享的速率限制等待搜索时机
+                self.wait_for_rate_limit(prefix)
+                timer.lap("wait")
+                start_time = time.time()
+                command_count_before = driver.command_count
+                interceptor = getattr(driver, "request_interceptor", None)
+                if interceptor is not None:
+                    interceptor.reset_stats()
+                
+                # 丢弃上一个关键词遗留的网络日志
+                network_capture = config_dict["NETWORK_CAPTURE_ENABLED"] and not self.network_capture_disabled
+                if network_capture:
+                    self.drain_network_log(driver)
+                
+                # 尝试搜索产品
+                self.search_product(driver, product_name, config_dict)
+                
+                # 导航后立即判断页面类型，人机验证和错误页面不再等待插件数据
+                page_class = self.classify_page(driver, config_dict)
+                timer.lap("navigate")
+                if page_class in ("captcha", "error"):
+                    self.record_rate_limit(page_class, None, prefix)
+                    if not self.requeue_blocked_keyword(config_dict, product_name, page_class, keyword_queue, lock, prefix):
+                        self.finish_keyword(product_name, results, lock)
+                    if self.metrics is not None:
+                        self.metrics.add(product_name, worker_id, page_class, driver.command_count - command_count_before, timer)
+                    continue
+                if page_class == "no_results":
+                    print(f"{prefix}亚马逊没有该关键词的搜索结果，继续读取插件数据")
+                
+                # 优先从插件自己的网络响应中获取数据，响应到达后立即继续
+                extract_stats = {"method": None}
+                keyword_data = None
+                if network_capture:
+                    keyword_data = self.wait_for_plugin_response(driver, config_dict, product_name, prefix)
+                    self.record_network_capture(config_dict, keyword_data is not None, prefix)
+                    if keyword_data is not None:
+                        extract_stats["method"] = "network"
+                        extract_stats["status"] = classify_result(keyword_data, "empty")
+                    timer.lap("plugin_ready")
+                
+                # 未捕获到网络响应时，从页面上的插件表格中提取
+                if keyword_data is None:
+                    if config_dict["ADAPTIVE_WAIT"]:
+                        # 等待搜索结果列表出现，页面就绪后立即继续
+                        self.wait_for_page_signal(driver, "search_results", SEARCH_RESULTS_READY_SCRIPT,
+                                                  config_dict["SEARCH_RESULT_INITIAL_WAIT"], "搜索结果", prefix=prefix)
+                        timer.lap("results_ready")
+                    
+                        # 监听插件渲染模式下由extract_keyword_data负责等待插件
+                        if not config_dict["USE_MUTATION_OBSERVER"]:
+                            self.wait_for_page_signal(driver, "plugin_table", PLUGIN_TABLE_READY_SCRIPT,
+                                                      config_dict["PLUGIN_DATA_PROCESSING_WAIT"], "插件表格", prefix=prefix)
+                    else:
+                        # 等待页面加载一些基本内容，然后尝试提取数据
+                        time.sleep(config_dict["SEARCH_RESULT_INITIAL_WAIT"])
+                        timer.lap("results_ready")
+                    
+                        # 提取数据前等待插件完全加载
+                        print(f"{prefix}等待插件加载和处理数据...")
+                        time.sleep(config_dict["PLUGIN_DATA_PROCESSING_WAIT"])
+                    timer.lap("plugin_ready")
+                
+                    # 尝试提取数据，其中等待插件渲染的时间计入plugin_ready
+                    keyword_data = self.extract_keyword_data(driver, config_dict, extract_stats, wait_for_complete=retry_pass)
+                    timer.lap("extract")
+                    timer.move("extract", "plugin_ready", extract_stats.get("plugin_wait", 0))
+                
+                print(f"{prefix}本关键词共发送 {driver.command_count - command_count_before} 条WebDriver命令"
+                      f"（提取方式: {extract_stats['method'] or '未获取到数据'}）")
+                if interceptor is not None:
+                    self.report_traffic(interceptor.take_stats(), prefix)
+                
+                # 根据页面状态调整共享的搜索速率
+                self.record_rate_limit(page_class, keyword_data, prefix)
+                
+                done = self.record_keyword_result(config_dict, product_name, keyword_data, extract_stats["status"],
+                                                  results, progress, lock, retry_keywords, retry_pass, prefix)
+                timer.lap("record")
+                
+                # 按截图策略保存当前页面状态（用于调试）
+                if self.should_capture_screenshot(config_dict, keyword_data, done):
+                    self.capture_screenshot(driver, config_dict, product_name, prefix)
+                timer.lap("screenshot")
+                command_count = driver.command_count - command_count_before
+            except Exception as e:
+                # 浏览器异常时将关键词放回队列，交给其他工作线程处理
+                print(f"{prefix}处理关键词 {product_name} 时出现错误，该工作线程将退出: {e}")
+                keyword_queue.put(product_name)
+                with self.drivers_lock:
+                    self.worker_drivers.pop(worker_id, None)
+                break
+            
+            # 计算实际搜索用时
+            elapsed_time = time.time() - start_time
+            print(f"{prefix}本次搜索和数据收集用时: {elapsed_time:.2f}秒")
+            
+            if self.metrics is not None:
+                self.metrics.add(product_name, worker_id, extract_stats["method"], command_count, timer)
+    
+    def record_keyword_result(self, config_dict, product_name, keyword_data, status, results, progress, lock,
+                              retry_keywords=None, retry_pass=False, prefix=""):
+        """记录一个关键词的提取结果：更新共享结果和进度、写入结果日志和缓存，
+        把需要重试的关键词加入retry_keywords，批量模式中写出已完成的工作簿
+        返回更新后的完成数量"""
+        with lock:
+            # 重试阶段只保留比主流程更完整的结果
+            improved = count_result_fields(keyword_data) > count_result_fields(results.get(product_name))
+            record = not retry_pass or improved
+            queued_for_retry = record and retry_keywords is not None and status in RETRY_RESULT_STATUSES
+            if record:
+                results[product_name] = keyword_data
+            if queued_for_retry:
+                retry_keywords.append(product_name)
+            progress["done"] += 1
+            done = progress["done"]
+        self.report_progress(done, progress["total"])
+        
+        if retry_pass and not record:
+            print(f"{prefix}重试没有获取到更完整的数据（{status}），保留原来的结果")
+        elif queued_for_retry:
+            print(f"{prefix}{'只获取到部分数据' if status == 'partial' else '等待插件数据超时'}，主流程结束后将重新搜索")
+        
+        if record:
+            # 立即写入结果日志，崩溃或停止后不会丢失
+            self.journal.append(product_name, keyword_data)
+            
+            # 只缓存两项数据都取到的结果，以及插件明确提示暂无数据的结果（有效期较短）；
+            # 部分数据和等待超时可能是临时失败，留给重试阶段和之后的运行重新搜索
+            if self.result_cache is not None and (status == "complete" or
+                                                  (status == "empty" and config_dict["RESULT_CACHE_EMPTY_TTL_HOURS"] > 0)):
+                self.result_cache.put(config_dict["AMAZON_SITE"], config_dict["DELIVERY_ZIPCODE"], product_name, keyword_data)
+        
+        # 等待重试的关键词还不是最终结果
+        if not queued_for_retry:
+            self.finish_keyword(product_name, results, lock)
+        return done
+    
+    def wait_for_rate_limit(self, prefix=""):
+        """从共享的速率限制中预约下一次搜索并等待，停止运行时立即返回"""
+        wait = self.rate_limiter.acquire()
+        if wait <= 0:
+            return
+        
+        print(f"{prefix}等待{wait:.1f}秒后搜索下一个产品（当前速率约 {self.rate_limiter.rate_per_minute():.1f} 个/分钟）...")
+        end_time = time.time() + wait
+        while self.running:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            self.report_status(f"{prefix}等待 {math.ceil(remaining)} 秒后继续...")
+            time.sleep(min(1, remaining))
+    
+    def record_rate_limit(self, page_class, keyword_data, prefix=""):
+        """将页面分类（人机验证、错误页面）和是否取到数据反馈给共享的速率限制"""
+        if page_class in ("captcha", "error"):
+            outcome = "throttled"
+        elif keyword_data is None or (keyword_data["搜索转化率"] == "无" and keyword_data["点击转化率"] == "无"):
+            outcome = "empty"
+        else:
+            outcome = "ok"
+        
+        if self.rate_limiter.record(outcome):
+            reason = {"captcha": "人机验证页面", "error": "错误页面"}.get(
+                page_class, f"连续{self.rate_limiter.empty_streak_limit}个关键词没有数据")
+            print(f"{prefix}检测到限流信号（{reason}），搜索间隔增加到 {self.rate_limiter.interval:.1f} 秒")
+    
+    def classify_page(self, driver, config_dict):
+        """导航后轮询页面分类脚本，通常几百毫秒内即可判断是否是人机验证、错误或无结果页面
+        超时仍无法判断时返回 'unknown'"""
+        deadline = time.time() + config_dict["QUICK_WAIT_TIMEOUT"]
+        while True:
+            try:
+                page_class = driver.execute_script(PAGE_CLASSIFY_SCRIPT)
+            except Exception:
+                page_class = None
+            if page_class or time.time() >= deadline:
+                return page_class or "unknown"
+            time.sleep(0.1)
+    
+    def requeue_blocked_keyword(self, config_dict, product_name, page_class, keyword_queue, lock, prefix=""):
+        """人机验证或错误页面的关键词不记录结果，放回队列等待速率限制退避后重试
+        超过重试次数后放弃，留给下次继续任务处理；返回是否放回了队列"""
+        description = "人机验证页面" if page_class == "captcha" else "错误页面"
+        with lock:
+            attempts = self.blocked_attempts.get(product_name, 0) + 1
+            self.blocked_attempts[product_name] = attempts
+            if attempts > config_dict["BLOCKED_RETRY_LIMIT"]:
+                self.abandoned_keywords.append(product_name)
+        
+        if attempts > config_dict["BLOCKED_RETRY_LIMIT"]:
+            print(f"{prefix}关键词 {product_name} 已{attempts}次遇到{description}，放弃本次搜索，不记录结果")
+            return False
+        
+        print(f"{prefix}关键词 {product_name} 遇到{description}，放回队列稍后重试（第{attempts}次）")
+        keyword_queue.put(product_name)
+        return True
+    
+    def run_retry_pass(self, config_dict, retry_keywords, results, lock, run_workers=None):
+        """主流程结束后，用主流程留下的浏览器重新搜索只有部分数据或等待超时的关键词
+        每个关键词重新直接打开搜索结果页，插件等待时间使用RETRY_PLUGIN_DATA_WAIT_TIME
+        run_workers(retry_config, retry_queue, progress)用于以其他方式处理重试队列（例如异步CDP引擎的标签页），
+        默认使用主流程留下的工作线程浏览器
+        返回获取到更完整数据的关键词列表"""
+        worker_ids = []
+        if run_workers is None:
+            with self.drivers_lock:
+                worker_ids = sorted(self.worker_drivers)
+            if not worker_ids:
+                print(f"\n没有可用的浏览器，跳过{len(retry_keywords)}个关键词的重试")
+                return []
+        
+        retry_wait = config_dict["RETRY_PLUGIN_DATA_WAIT_TIME"]
+        retry_config = dict(
+            config_dict,
+            PLUGIN_DATA_WAIT_TIME=max(retry_wait, config_dict["PLUGIN_DATA_WAIT_TIME"]),
+            NETWORK_CAPTURE_TIMEOUT=max(retry_wait, config_dict["NETWORK_CAPTURE_TIMEOUT"]),
+            DIRECT_SEARCH_URL=True
+        )
+        print(f"\n开始重试{len(retry_keywords)}个只有部分数据或等待超时的关键词，"
+              f"插件数据等待时间 {retry_config['PLUGIN_DATA_WAIT_TIME']} 秒")
+        
+        with lock:
+            fields_before = {name: count_result_fields(results.get(name)) for name in retry_keywords}
+        
+        retry_queue = queue.Queue()
+        for product_name in retry_keywords:
+            retry_queue.put(product_name)
+        progress = {"done": 0, "total": len(retry_keywords)}
+        
+        # 重试阶段重新计算人机验证和错误页面的重试次数，放弃时保留主流程的结果
+        self.blocked_attempts = {}
+        self.abandoned_keywords = []
+        
+        if run_workers is not None:
+            run_workers(retry_config, retry_queue, progress)
+        
+        workers = []
+        for worker_id in worker_ids[:len(retry_keywords)]:
+            worker = threading.Thread(
+                target=self.scrape_worker,
+                args=(worker_id, retry_config, retry_queue, results, progress, lock),
+                kwargs={"retry_pass": True}
+            )
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+        
+        for worker in workers:
+            worker.join()
+        
+        with lock:
+            improved = [name for name in retry_keywords if count_result_fields(results.get(name)) > fields_before[name]]
+        print(f"\n重试完成: {len(improved)}/{len(retry_keywords)}个关键词获取到更完整的数据")
+        if self.abandoned_keywords:
+            print(f"重试时以下关键词多次遇到人机验证或错误页面，保留主流程的结果: {', '.join(self.abandoned_keywords)}")
+        return improved
+    
+    def read_batch_product_names(self, config_dict):
+        """批量模式：读取目录或通配符匹配的所有工作簿，合并成去重后的关键词列表
+        MAX_PRODUCTS对每个工作簿分别生效"""
+        batch = WorkbookBatch(config_dict["EXCEL_BATCH_INPUT"])
+        excel_paths = WorkbookBatch.find_workbooks(batch.input_path)
+        if not excel_paths:
+            print(f"错误: 批量输入中没有找到Excel文件: {batch.input_path}")
+            return []
+        
+        product_names = []
+        seen_names = set()
+        duplicate_count = 0
+        for excel_path in excel_paths:
+            names = self.read_product_names_from_excel(excel_path, config_dict["MAX_PRODUCTS"], config_dict["KEYWORD_NORMALIZATION"])
+            duplicate_count += self.duplicate_keyword_count
+            batch.add(excel_path, names)
+            for name in names:
+                if name in seen_names:
+                    duplicate_count += 1
+                    continue
+                seen_names.add(name)
+                product_names.append(name)
+        
+        self.workbook_batch = batch
+        self.duplicate_keyword_count = duplicate_count
+        print(f"批量模式: {len(excel_paths)}个工作簿共{len(product_names)}个不同的关键词，由同一组浏览器依次搜索")
+        return product_names
+    
+    def finish_keyword(self, product_name, results, lock):
+        """批量模式：关键词有了最终结果（或已放弃）后，把所有关键词都已完成的工作簿交给后台线程写出"""
+        if self.workbook_batch is None:
+            return
+        for excel_path in self.workbook_batch.finish(product_name):
+            with lock:
+                workbook_results = {name: results[name] for name in self.workbook_batch.workbooks[excel_path] if name in results}
+            self.workbook_batch.submit(excel_path, workbook_results)
+    
+    def write_batch_workbook(self, excel_path, workbook_results):
+        """写出批量模式中的一个工作簿，失败时记录下来"""
+        keyword_count = len(set(self.workbook_batch.workbooks[excel_path]))
+        if not workbook_results:
+            print(f"\n工作簿 {excel_path} 没有完成任何关键词，不生成更新文件")
+            return
+        
+        print(f"\n工作簿 {excel_path} 完成{len(workbook_results)}/{keyword_count}个关键词，正在写出结果...")
+        if not self.update_excel_with_data(None, workbook_results, excel_path, self.config_dict["KEYWORD_NORMALIZATION"]):
+            self.workbook_batch.failed.append(excel_path)
+    
+    def should_capture_screenshot(self, config_dict, keyword_data, sequence):
+        """根据截图策略判断当前关键词是否需要截图
+        always: 每个关键词; failure: 只在数据缺失或不完整时; every_n: 每N个关键词; never: 不截图"""
+        policy = config_dict["SCREENSHOT_POLICY"]
+        if policy == "always":
+            return True
+        if policy == "failure":
+            return keyword_data["搜索转化率"] == "无" or keyword_data["点击转化率"] == "无"
+        if policy == "every_n":
+            return sequence % max(1, config_dict["SCREENSHOT_EVERY_N"]) == 0
+        return False
+    
+    def capture_screenshot(self, driver, config_dict, product_name, prefix=""):
+        """通过CDP截图（支持JPEG/WebP质量和裁剪到插件面板），编码和写盘交给后台线程"""
+        try:
+            image_format = config_dict["SCREENSHOT_FORMAT"]
+            params = {"format": image_format}
+            if image_format != "png":
+                params["quality"] = config_dict["SCREENSHOT_QUALITY"]
+            
+            # 可选：只截取插件数据面板
+            if config_dict["SCREENSHOT_CLIP_PLUGIN"]:
+                panel_rect = driver.execute_script(PLUGIN_PANEL_RECT_SCRIPT)
+                if panel_rect:
+                    params["clip"] = dict(panel_rect, scale=1)
+                    params["captureBeyondViewport"] = True
+            
+            screenshot = driver.execute_cdp_cmd("Page.captureScreenshot", params)
+            extension = "jpg" if image_format == "jpeg" else image_format
+            screenshot_path = f"{config_dict['SCREENSHOTS_DIR']}/{product_name}_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+            self.screenshot_writer.submit(screenshot_path, screenshot["data"])
+            print(f"{prefix}页面截图将保存到: {screenshot_path}")
+        except Exception as e:
+            print(f"{prefix}保存截图时出现错误: {e}")
+    
+    def run(self, resume=False, write_excel=True):
+        """运行爬取任务，resume为True时跳过结果日志中已完成的关键词
+        配置了多个目标（TARGETS）时改为多目标模式运行
+        write_excel为False时只收集结果到self.collected_results，由调用方写入Excel
+        返回是否成功将结果写入Excel文件（不写Excel时返回是否收集到结果）"""
+        config_dict = self.config_dict
+        if config_dict["TARGETS"]:
+            if config_dict["EXCEL_BATCH_INPUT"]:
+                print("多目标模式暂不支持批量输入，请去掉TARGETS或EXCEL_BATCH_INPUT中的一项")
+                return False
+            return self.run_matrix(resume)
+        
+        self.running = True
+        self.collected_results = {}
+        self.workbook_batch = None
+        success = False
+        
+        try:
+            # 读取产品名，批量模式时合并所有工作簿的关键词
+            if config_dict["EXCEL_BATCH_INPUT"]:
+                product_names = self.read_batch_product_names(config_dict)
+            else:
+                product_names = self.read_product_names_from_excel(
+                    config_dict["EXCEL_PATH"], 
+                    config_dict["MAX_PRODUCTS"],
+                    config_dict["KEYWORD_NORMALIZATION"]
+                )
+            
+            if not product_names:
+                print("没有找到任何产品名，任务将退出")
+                return False
+            
+            results = {}
+            pending_names = product_names
+            
+            # 结果日志：继续任务时读取已完成的关键词，否则开始新的日志
+            self.journal = ScrapeJournal(self.get_journal_path(self.get_output_base(config_dict)))
+            if resume:
+                journal_results = self.journal.load()
+                results = {name: journal_results[name] for name in product_names if name in journal_results}
+                pending_names = [name for name in product_names if name not in results]
+                print(f"已从结果日志恢复{len(results)}个关键词的结果: {self.journal.journal_path}")
+            else:
+                self.journal.reset()
+            
+            # 从缓存中读取有效期内的结果，这些关键词不再打开浏览器搜索
+            if config_dict["RESULT_CACHE_ENABLED"]:
+                cache_path = os.path.join(config_dict["SCREENSHOTS_DIR"], "keyword_cache.sqlite3")
+                self.result_cache = KeywordResultCache(cache_path, config_dict["RESULT_CACHE_TTL_HOURS"],
+                                                       config_dict["RESULT_CACHE_EMPTY_TTL_HOURS"])
+                uncached_names = []
+                for product_name in pending_names:
+                    cached_data = self.result_cache.get(config_dict["AMAZON_SITE"], config_dict["DELIVERY_ZIPCODE"], product_name)
+                    # 旧版本缓存过的部分数据不再使用，重新搜索
+                    if cached_data is not None and classify_result(cached_data, "empty") in ("complete", "empty"):
+                        results[product_name] = cached_data
+                        self.journal.append(product_name, cached_data)
+                    else:
+                        uncached_names.append(product_name)
+                print(f"从缓存中读取了{len(pending_names) - len(uncached_names)}个关键词的结果，剩余{len(uncached_names)}个需要搜索")
+                pending_names = uncached_names
+            
+            # 浏览器（异步CDP引擎时为标签页）数量不超过关键词数量
+            use_cdp = config_dict["BROWSER_ENGINE"] == "cdp"
+            worker_count = min(config_dict["CDP_TAB_COUNT"] if use_cdp else config_dict["WORKER_COUNT"], len(pending_names))
+            if pending_names:
+                worker_count = max(1, worker_count)
+                if use_cdp:
+                    print(f"将搜索以下{len(pending_names)}个产品，使用1个浏览器的{worker_count}个标签页并行（异步CDP引擎）")
+                else:
+                    print(f"将搜索以下{len(pending_names)}个产品，使用{worker_count}个浏览器并行")
+            
+            # 所有工作线程共享的关键词队列、结果和进度
+            keyword_queue = queue.Queue()
+            for product_name in pending_names:
+                keyword_queue.put(product_name)
+            
+            progress = {"done": len(results), "total": len(product_names)}
+            lock = threading.Lock()
+            
+            # 批量模式：已完成的工作簿由后台线程写出，不占用浏览器线程；
+            # 从日志或缓存中取得结果的关键词已经完成，全部完成的工作簿立即写出
+            if self.workbook_batch is not None:
+                self.workbook_batch.start_writer(self.write_batch_workbook)
+            for product_name in list(results):
+                self.finish_keyword(product_name, results, lock)
+            
+            if pending_names and config_dict["SCREENSHOT_POLICY"] != "never":
+                self.screenshot_writer = ScreenshotWriter(config_dict["SCREENSHOTS_DIR"])
+            
+            # 每个关键词的阶段用时报告
+            if pending_names:
+                report_format = config_dict["METRICS_REPORT_FORMAT"]
+                report_path = None
+                if report_format != "none":
+                    extension = "csv" if report_format == "csv" else "jsonl"
+                    report_path = (f"{self.get_output_base(config_dict)}{self.get_target_suffix()}"
+                                   f"_timings_{time.strftime('%Y%m%d_%H%M%S')}.{extension}")
+                self.metrics = RunMetrics(report_path, report_format)
+            
+            self.rate_limiter = self.shared_rate_limiter or self.create_rate_limiter(config_dict, worker_count)
+            
+            self.blocked_attempts = {}
+            self.abandoned_keywords = []
+            self.worker_drivers = {}
+            self.network_capture_misses = 0
+            self.network_capture_disabled = False
+            
+            # 主流程中只有部分数据或等待超时的关键词，主流程结束后统一重试
+            retry_keywords = [] if config_dict["RETRY_PASS_ENABLED"] else None
+            
+            if pending_names:
+                print(f"开始依次搜索产品，每次搜索后将等待插件数据加载并提取数据")
+            workers = []
+            if use_cdp:
+                # 异步CDP引擎在单独的线程中运行自己的事件循环
+                if pending_names:
+                    from cdp_engine import CDPTabEngine
+                    tab_engine = CDPTabEngine(self, config_dict, keyword_queue, results, progress, lock, retry_keywords)
+                    workers.append(threading.Thread(target=tab_engine.run))
+            else:
+                for worker_id in range(1, worker_count + 1):
+                    workers.append(threading.Thread(
+                        target=self.scrape_worker,
+                        args=(worker_id, config_dict, keyword_queue, results, progress, lock, retry_keywords)
+                    ))
+            
+            for worker in workers:
+                worker.daemon = True
+                worker.start()
+            
+            for worker in workers:
+                worker.join()
+            
+            # 所有工作线程都启动失败或因异常退出时，放回队列的关键词没有被处理
+            unprocessed = []
+            while True:
+                try:
+                    unprocessed.append(keyword_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if unprocessed and self.running:
+                print(f"\n没有可用的浏览器，以下{len(unprocessed)}个关键词没有处理，"
+                      f"可以稍后继续任务重试: {', '.join(unprocessed)}")
+            
+            if self.abandoned_keywords:
+                print(f"\n以下{len(self.abandoned_keywords)}个关键词多次遇到人机验证或错误页面，没有记录结果，"
+                      f"可以稍后继续任务重试: {', '.join(self.abandoned_keywords)}")
+            
+            # 异步CDP引擎在关闭标签页之前已经完成了重试阶段
+            if retry_keywords and self.running and not use_cdp:
+                self.run_retry_pass(config_dict, retry_keywords, results, lock)
+            
+            if self.duplicate_keyword_count:
+                print(f"\n关键词去重节省了{self.duplicate_keyword_count}次浏览器搜索")
+            
+            if workers and self.rate_limiter.interval > 0:
+                print(f"\n搜索速率: 最终间隔 {self.rate_limiter.interval:.1f} 秒（约 {self.rate_limiter.rate_per_minute():.1f} 个/分钟），"
+                      f"触发限流 {self.rate_limiter.throttle_count} 次")
+            
+            if self.metrics is not None:
+                self.metrics.print_summary()
+                if config_dict["METRICS_PROMETHEUS_PATH"]:
+                    try:
+                        self.metrics.write_prometheus(config_dict["METRICS_PROMETHEUS_PATH"])
+                    except Exception as e:
+                        print(f"写入Prometheus指标时出现错误: {e}")
+            
+            if not self.running:
+                print("爬取任务被中断，将使用已完成的结果更新Excel文件，之后可以从结果日志继续任务")
+            elif unprocessed:
+                self.report_progress(progress["done"], progress["total"], f"{len(unprocessed)}个关键词未处理")
+            else:
+                # 更新进度条到完成
+                self.report_progress(len(product_names), len(product_names), "数据收集完成")
+            
+            # 等待后台线程写完运行中已完成的工作簿
+            if self.workbook_batch is not None:
+                self.workbook_batch.close_writer()
+            
+            # 最终结果以结果日志为准，停止后也会写出已完成的部分
+            journal_results = self.journal.load()
+            results = {name: journal_results[name] for name in product_names if name in journal_results}
+            
+            self.collected_results = results
+            
+            # 多目标模式中由调用方合并写入Excel
+            if results and not write_excel:
+                print(f"\n共{len(results)}/{len(product_names)}个产品完成数据收集")
+                success = True
+            
+            # 批量模式：写出还没有写出的工作簿（停止或部分关键词没有最终结果时）
+            elif results and self.workbook_batch is not None:
+                print(f"\n共{len(results)}/{len(product_names)}个产品完成数据收集")
+                for excel_path in self.workbook_batch.take_unwritten():
+                    self.write_batch_workbook(excel_path, {name: results[name] for name in self.workbook_batch.workbooks[excel_path] if name in results})
+                success = not self.workbook_batch.failed
+                if success:
+                    self.report_status("全部完成")
+                else:
+                    print(f"以下工作簿更新失败: {', '.join(self.workbook_batch.failed)}")
+                    self.report_status("数据收集完成，但部分Excel更新失败")
+            
+            # 将收集到的数据更新到Excel文件
+            elif results:
+                print(f"\n共{len(results)}/{len(product_names)}个产品完成数据收集，正在更新Excel文件...")
+                update_success = self.update_excel_with_data(None, results, config_dict["EXCEL_PATH"],
+                                                             config_dict["KEYWORD_NORMALIZATION"])
+                success = update_success
+                if update_success:
+                    self.report_status("全部完成")
+                else:
+                    self.report_status("数据收集完成，但Excel更新失败")
+            
+            # 有关键词没有处理时不算成功，已完成的结果仍然写入Excel
+            if unprocessed and self.running:
+                success = False
+                self.report_status(f"{len(unprocessed)}个关键词未处理，可以稍后继续任务")
+            
+            # 完成所有搜索后，等待设定的时间再关闭浏览器
+            if workers:
+                close_wait = config_dict["DEFAULT_BROWSER_CLOSE_WAIT"]
+                print(f"\n爬取任务结束。浏览器将在{close_wait}秒后自动关闭...")
+                
+                # 创建计数器进行倒计时
+                self.countdown(close_wait, "浏览器将在 {} 秒后关闭...")
+                
+        except Exception as e:
+            print(f"执行过程中遇到错误: {e}")
+            import traceback
+            traceback.print_exc()
+            self.report_status("发生错误")
+        
+        finally:
+            # 程序结束前关闭浏览器
+            if self.running:
+                print("即将关闭浏览器...")
+                self.close_all_browsers()
+            
+            if self.workbook_batch is not None:
+                self.workbook_batch.close_writer()
+            
+            if self.result_cache is not None:
+                self.result_cache.close()
+                self.result_cache = None
+            
+            # 等待后台线程写完剩余的截图
+            if self.screenshot_writer is not None:
+                self.screenshot_writer.close()
+                self.screenshot_writer = None
+            
+            if self.metrics is not None:
+                self.metrics.close()
+                self.metrics = None
+            
+            self.running = False
+        
+        return success
+    
+    def create_rate_limiter(self, config_dict, parallel):
+        """把原来每个浏览器各自的搜索间隔换算成parallel个浏览器（或标签页）共享的全局间隔"""
+        parallel = max(1, parallel)
+        return AdaptiveRateLimiter(
+            config_dict["PRODUCT_SEARCH_INTERVAL"] / parallel,
+            config_dict["MIN_PRODUCT_SEARCH_INTERVAL"] / parallel,
+            config_dict["RATE_LIMIT_MAX_INTERVAL"],
+            adaptive=config_dict["ADAPTIVE_RATE_LIMIT"],
+            empty_streak_limit=config_dict["RATE_LIMIT_EMPTY_STREAK"]
+        )
+    
+    def run_matrix(self, resume=False):
+        """多目标模式：每个(站点, 邮编)目标使用单独的引擎和一组浏览器同时运行，
+        每个浏览器只在准备阶段设置一次该目标的配送地址；
+        全部完成后把每个目标的结果写入同一个Excel文件中单独的列
+        返回是否成功将结果写入Excel文件"""
+        config_dict = self.config_dict
+        self.running = True
+        success = False
+        
+        try:
+            targets = parse_targets(config_dict["TARGETS"])
+            print(f"多目标模式: {len(targets)}个目标同时运行，每个目标使用{config_dict['WORKER_COUNT']}个浏览器: "
+                  f"{', '.join(f'{site} {zipcode}' for site, zipcode in targets)}")
+            
+            # 汇总所有目标的进度
+            target_progress = {}
+            progress_lock = threading.Lock()
+            
+            def make_progress_callback(label):
+                def on_progress(current, total, status=None):
+                    with progress_lock:
+                        target_progress[label] = (current, total)
+                        done = sum(value[0] for value in target_progress.values())
+                        total_all = sum(value[1] for value in target_progress.values())
+                    self.report_progress(done, total_all, f"[{label}] {status}" if status else None)
+                return on_progress
+            
+            # 同一站点的所有目标共用一个速率限制，总搜索频率和只有一个目标时相同，任一目标遇到限流时一起退避
+            per_target = config_dict["CDP_TAB_COUNT"] if config_dict["BROWSER_ENGINE"] == "cdp" else config_dict["WORKER_COUNT"]
+            site_limiters = {site: self.create_rate_limiter(config_dict, per_target) for site in set(site for site, _ in targets)}
+            
+            self.target_engines = []
+            for site, zipcode in targets:
+                label = f"{site} {zipcode}"
+                target_config = dict(config_dict, TARGETS=[], AMAZON_SITE=site, DELIVERY_ZIPCODE=zipcode,
+                                     DEFAULT_BROWSER_CLOSE_WAIT=0)
+                engine = AmazonScraperEngine(
+                    target_config,
+                    on_progress=make_progress_callback(label),
+                    on_status=lambda text, label=label: self.report_status(f"[{label}] {text}"),
+                    rate_limiter=site_limiters[site]
+                )
+                engine.target_label = label
+                
+                # 截图、缓存和Prometheus指标按目标分开保存
+                target_config["SCREENSHOTS_DIR"] = os.path.join(config_dict["SCREENSHOTS_DIR"], engine.get_target_suffix().lstrip("_"))
+                if config_dict["METRICS_PROMETHEUS_PATH"]:
+                    root, extension = os.path.splitext(config_dict["METRICS_PROMETHEUS_PATH"])
+                    target_config["METRICS_PROMETHEUS_PATH"] = root + engine.get_target_suffix() + extension
+                self.target_engines.append(engine)
+            
+            threads = []
+            for engine in self.target_engines:
+                if not self.running:
+                    break
+                thread = threading.Thread(target=engine.run, args=(resume, False))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            
+            for thread in threads:
+                thread.join()
+            
+            results_by_target = {engine.target_label: engine.collected_results
+                                 for engine in self.target_engines if engine.collected_results}
+            for engine in self.target_engines:
+                print(f"目标 {engine.target_label}: 完成{len(engine.collected_results)}个关键词")
+            
+            if results_by_target:
+                success = self.update_excel_with_targets(results_by_target, config_dict["EXCEL_PATH"],
+                                                         config_dict["KEYWORD_NORMALIZATION"])
+                self.report_status("全部完成" if success else "数据收集完成，但Excel更新失败")
+        
+        except Exception as e:
+            print(f"执行过程中遇到错误: {e}")
+            import traceback
+            traceback.print_exc()
+            self.report_status("发生错误")
+        
+        finally:
+            self.target_engines = []
+            self.running = False
+        
+        return success
+    
+    def update_excel_with_data(self, df, results, excel_path, normalize=False):
+        """将收集到的数据更新到Excel文件中
+        df为None时在这里才读取完整的Excel数据
+        normalize为True时results的键是标准化后的关键词，按标准化结果匹配所有对应的行"""
+        try:
+            if df is None:
+                print(f"正在读取完整的Excel文件: {excel_path}")
+                df = pd.read_excel(excel_path)
+            
+            print("正在更新Excel文件...")
+            self.fill_result_columns(df, results, normalize)
+            self.save_updated_excel(df, excel_path)
+            return True
+        
+        except Exception as e:
+            print(f"更新Excel文件时出现错误: {e}")
+            return False
+    
+    def update_excel_with_targets(self, results_by_target, excel_path, normalize=False):
+        """多目标模式：每个目标的结果写入列名带有目标名称的单独列，例如"搜索转化率 (amazon.de 10115)"，
+        所有目标保存到同一个新文件"""
+        try:
+            print(f"正在读取完整的Excel文件: {excel_path}")
+            df = pd.read_excel(excel_path)
+            
+            for label, results in results_by_target.items():
+                print(f"正在写入目标 {label} 的结果...")
+                self.fill_result_columns(df, results, normalize, f" ({label})")
+            self.save_updated_excel(df, excel_path)
+            return True
+        
+        except Exception as e:
+            print(f"更新Excel文件时出现错误: {e}")
+            return False
+    
+    def fill_result_columns(self, df, results, normalize=False, column_suffix=""):
+        """把结果按关键词映射到数据框的转化率列，返回更新的行数
+        指定column_suffix时写入列名加上该后缀的单独列，列不存在时新建"""
+        # 将结果整理成以关键词为索引的数据框，再按关键词一次性映射到所有行
+        results_df = pd.DataFrame.from_dict(results, orient="index").reindex(columns=["搜索转化率", "点击转化率"])
+        keywords = df["流量词"]
+        if normalize:
+            keywords = keywords.map(lambda keyword: keyword if pd.isna(keyword) else normalize_keyword(keyword))
+        matched = keywords.isin(results_df.index)
+        
+        # Excel列名 -> 结果字段，点击转化率对应的列名是"类目转化率"
+        column_mapping = {"搜索转化率": "搜索转化率", "类目转化率": "点击转化率"}
+        for excel_column, result_key in column_mapping.items():
+            excel_column += column_suffix
+            if excel_column not in df.columns:
+                if not column_suffix:
+                    print(f"警告: Excel文件中没有'{excel_column}'列，无法更新")
+                    continue
+                df[excel_column] = None
+            
+            # 空列读入后是数值类型，先转换为object才能写入百分比文本
+            if df[excel_column].dtype != object:
+                df[excel_column] = df[excel_column].astype(object)
+            df.loc[matched, excel_column] = keywords[matched].map(results_df[result_key])
+        
+        # 用集合差找出Excel中不存在的关键词，汇总提示一次
+        missing_keywords = sorted(set(results) - set(keywords.dropna()))
+        if missing_keywords:
+            preview = ", ".join(str(keyword) for keyword in missing_keywords[:20])
+            suffix = " 等" if len(missing_keywords) > 20 else ""
+            print(f"警告: 在Excel文件中找不到{len(missing_keywords)}个关键词: {preview}{suffix}")
+        updated_rows = int(matched.sum())
+        print(f"共更新了{updated_rows}行数据")
+        return updated_rows
+    
+    def save_updated_excel(self, df, excel_path):
+        """保存到带时间戳的新文件，返回新文件路径"""
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        output_path = f"{os.path.splitext(excel_path)[0]}_更新_{timestamp}.xlsx"
+        df.to_excel(output_path, index=False)
+        print(f"已将更新后的数据保存到: {output_path}")
+        return output_path
+
+def parse_args(argv):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog="amazon_auto", description="亚马逊数据爬取工具（无界面模式）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = subparsers.add_parser("run", help="运行爬取任务")
+    run_parser.add_argument("--config", help="配置文件路径（.py或.toml），默认使用config.py")
+    run_parser.add_argument("--workers", type=int, help="并行浏览器数量，覆盖配置中的WORKER_COUNT")
+    run_parser.add_argument("--excel", help="Excel文件路径，覆盖配置中的EXCEL_PATH")
+    run_parser.add_argument("--batch", help="批量模式：Excel文件所在目录或通配符（例如 \"data/*.xlsx\"），覆盖配置中的EXCEL_BATCH_INPUT")
+    run_parser.add_argument("--resume", action="store_true", help="从结果日志继续上次中断的任务")
+    run_parser.add_argument("--target", nargs=2, action="append", metavar=("SITE", "ZIPCODE"),
+                            help="多目标模式的(站点, 邮编)，可以重复指定，覆盖配置中的TARGETS")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    
+    config_dict = load_config_dict(args.config)
+    if args.workers is not None:
+        config_dict["WORKER_COUNT"] = args.workers
+    if args.excel is not None:
+        config_dict["EXCEL_PATH"] = args.excel
+    if args.batch is not None:
+        config_dict["EXCEL_BATCH_INPUT"] = args.batch
+    if args.target:
+        config_dict["TARGETS"] = parse_targets(args.target)
+    
+    def print_progress(current, total, status=None):
+        print(status or f"进度: {current}/{total} ({current / total * 100:.1f}%)")
+    
+    engine = AmazonScraperEngine(config_dict, on_progress=print_progress)
+    result = {"success": False}
+    
+    def run_engine():
+        result["success"] = engine.run(resume=args.resume)
+    
+    # 在后台线程运行，主线程负责响应Ctrl+C，停止后仍会写出已完成的结果
+    engine_thread = threading.Thread(target=run_engine)
+    engine_thread.start()
+    try:
+        while engine_thread.is_alive():
+            engine_thread.join(0.5)
+    except KeyboardInterrupt:
+        print("收到中断信号，正在停止爬取任务...")
+        engine.stop()
+        engine_thread.join()
+    
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""本地模拟亚马逊站点和插件数据表格
+
+提供主页、搜索结果页和配送地址弹窗，使用与真实站点相同的元素ID（twotabsearchtextbox、
+glow-ingress-block、GLUXZipUpdateInput等），搜索结果页中注入模拟插件：
+页面脚本请求 /plugin/api 后渲染antd表格，接口响应按配置的渲染延迟返回，
+并按比例返回"暂无数据"或只有部分数据的结果。
+
+每个关键词的数据和延迟由随机种子和关键词确定，同样的参数多次运行结果一致。
+
+单独启动:
+    python benchmarks/mock_amazon.py --port 8765
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, unquote
+
+DEFAULT_LOCATION = "Beijing 100000"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<div id="nav-belt">
+    <a id="glow-ingress-block" href="#" onclick="document.getElementById('glow-popover').style.display = 'block'; return false;">
+        <span id="glow-ingress-line1">Deliver to</span>
+        <span id="glow-ingress-line2">{location}</span>
+    </a>
+    <form action="/s" method="get">
+        <input id="twotabsearchtextbox" name="k" type="text" value="{keyword}">
+        <input id="nav-search-submit-button" type="submit" value="Go">
+    </form>
+</div>
+<div id="glow-popover" class="a-popover" style="display: none">
+    <input id="GLUXZipUpdateInput" type="text">
+    <span id="GLUXZipUpdate" onclick="document.cookie = 'mock_zip=' + encodeURIComponent(document.getElementById('GLUXZipUpdateInput').value) + '; path=/';">
+        <input type="submit" value="Apply"><span id="GLUXZipUpdate-announce">设置</span>
+    </span>
+    <div class="a-popover-footer"><button name="glowDoneButton" onclick="location.reload()">Done</button></div>
+</div>
+{content}
+</body>
+</html>
+"""
+
+# 模拟插件：请求插件接口，收到数据后渲染antd表格或"暂无数据"提示
+PLUGIN_TEMPLATE = """
+<div id="plugin-root"></div>
+<script>
+(function() {
+    var keyword = %s;
+    function cell(text) {
+        var td = document.createElement('td');
+        td.className = 'ant-table-cell';
+        td.textContent = text;
+        return td;
+    }
+    function rate(value) {
+        return value === null || value === undefined ? '' : value + '%%';
+    }
+    fetch('/plugin/api?k=' + encodeURIComponent(keyword)).then(function(response) {
+        return response.json();
+    }).then(function(payload) {
+        var wrapper = document.createElement('div');
+        wrapper.className = 'ant-table-wrapper';
+        var content = document.createElement('div');
+        content.className = 'ant-table-content';
+        wrapper.appendChild(content);
+        if (!payload.data.length) {
+            content.innerHTML = '<div class="ant-empty"><div class="ant-empty-description">暂无数据</div></div>';
+        } else {
+            content.innerHTML = '<table><thead><tr><th class="ant-table-cell">关键词</th><th class="ant-table-cell">搜索量</th>' +
+                '<th class="ant-table-cell">搜索转化率</th><th class="ant-table-cell">点击转化率</th></tr></thead><tbody></tbody></table>';
+            var tbody = content.querySelector('tbody');
+            payload.data.forEach(function(record) {
+                var row = document.createElement('tr');
+                row.className = 'ant-table-row';
+                row.appendChild(cell(record.keyword));
+                row.appendChild(cell(String(record.searchVolume)));
+                row.appendChild(cell(rate(record.searchConversionRate)));
+                row.appendChild(cell(rate(record.clickConversionRate)));
+                tbody.appendChild(row);
+            });
+        }
+        document.getElementById('plugin-root').appendChild(wrapper);
+    });
+})();
+</script>
+"""
+
+
+def keyword_fixture(keyword, seed=0, render_delay=1.0, render_jitter=0.5, empty_rate=0.1, partial_rate=0.1):
+    """返回关键词对应的模拟插件数据和接口延迟（秒），同样的参数总是返回同样的结果
+    数据为None表示插件显示"暂无数据"，部分数据时点击转化率为None"""
+    rng = random.Random(f"{seed}:{keyword}")
+    delay = render_delay + rng.uniform(0, render_jitter)
+    
+    roll = rng.random()
+    if roll < empty_rate:
+        return None, delay
+    
+    record = {
+        "keyword": keyword,
+        "searchVolume": rng.randint(100, 100000),
+        "searchConversionRate": round(rng.uniform(0.1, 30), 2),
+        "clickConversionRate": round(rng.uniform(0.1, 60), 2)
+    }
+    if roll < empty_rate + partial_rate:
+        record["clickConversionRate"] = None
+    return record, delay
+
+
+def expected_result(record):
+    """模拟数据对应的引擎提取结果（与extract_keyword_data的返回格式相同）"""
+    if record is None:
+        return {"搜索转化率": "无", "点击转化率": "无"}
+    
+    def rate(value):
+        return "无" if value is None else f"{value:g}%"
+    
+    return {"搜索转化率": rate(record["searchConversionRate"]), "点击转化率": rate(record["clickConversionRate"])}
+
+
+class MockAmazonHandler(BaseHTTPRequestHandler):
+    """处理模拟站点的请求，参数保存在self.server.settings中"""
+    
+    def log_message(self, format, *args):
+        # 基准测试时不输出每个请求的访问日志
+        pass
+    
+    def do_GET(self):
+        settings = self.server.settings
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        
+        if url.path == "/plugin/api":
+            keyword = query.get("k", [""])[0]
+            record, delay = keyword_fixture(keyword, **settings["fixture"])
+            time.sleep(delay)
+            payload = {"keyword": keyword, "data": [record] if record is not None else []}
+            self.send_body(json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+            return
+        
+        if url.path.startswith("/img/"):
+            self.send_body(b"\xff" * settings["image_bytes"], "image/jpeg")
+            return
+        
+        time.sleep(settings["page_delay"])
+        location = DEFAULT_LOCATION
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        if "mock_zip" in cookie:
+            location = unquote(cookie["mock_zip"].value)
+        
+        if url.path == "/":
+            page = PAGE_TEMPLATE.format(title="Amazon.com", location=html.escape(location), keyword="", content="")
+        elif url.path == "/s":
+            keyword = query.get("k", [""])[0]
+            results = "".join(
+                f'<div class="s-result-item"><img src="/img/{i}.jpg" width="200" height="200"><h2>{html.escape(keyword)} {i + 1}</h2></div>'
+                for i in range(settings["image_count"])
+            )
+            content = f'<div class="s-main-slot s-result-list">{results}</div>' + PLUGIN_TEMPLATE % json.dumps(keyword)
+            page = PAGE_TEMPLATE.format(title=f"Amazon.com : {html.escape(keyword)}", location=html.escape(location),
+                                        keyword=html.escape(keyword), content=content)
+        else:
+            self.send_error(404)
+            return
+        
+        self.send_body(page.encode("utf-8"), "text/html; charset=utf-8")
+    
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockAmazonServer:
+    """在后台线程中运行的模拟站点，start()返回站点根地址"""
+    
+    def __init__(self, port=0, seed=0, render_delay=1.0, render_jitter=0.5, empty_rate=0.1, partial_rate=0.1,
+                 page_delay=0.0, image_count=16, image_bytes=20000):
+        self.fixture = {
+            "seed": seed,
+            "render_delay": render_delay,
+            "render_jitter": render_jitter,
+            "empty_rate": empty_rate,
+            "partial_rate": partial_rate
+        }
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MockAmazonHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = {
+            "fixture": self.fixture,
+            "page_delay": page_delay,
+            "image_count": image_count,
+            "image_bytes": image_bytes
+        }
+        self.thread = None
+    
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.base_url
+    
+    def expected(self, keyword):
+        """返回关键词在当前参数下应当提取到的结果"""
+        record, _ = keyword_fixture(keyword, **self.fixture)
+        return expected_result(record)
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟亚马逊站点和插件数据表格")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render-delay", type=float, default=1.0, help="插件接口的基础延迟（秒）")
+    parser.add_argument("--render-jitter", type=float, default=0.5, help="在基础延迟上增加的随机延迟上限（秒）")
+    parser.add_argument("--empty-rate", type=float, default=0.1, help="返回暂无数据的比例")
+    parser.add_argument("--partial-rate", type=float, default=0.1, help="只返回部分数据的比例")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="页面响应延迟（秒）")
+    args = parser.parse_args()
+    
+    server = MockAmazonServer(args.port, args.seed, args.render_delay, args.render_jitter,
+                              args.empty_rate, args.partial_rate, args.page_delay)
+    print(f"模拟站点已启动: {server.start()}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""离线基准测试：用真实的爬取引擎（无头模式）跑本地模拟站点，输出吞吐量、各阶段延迟百分位和内存占用
+
+用法:
+    python benchmarks/run_benchmark.py --config config.py --keywords 50 --workers 2
+    python benchmarks/run_benchmark.py --config config.py --output benchmark_results.jsonl
+
+配置文件只需要提供ChromeDriver路径等本机设置，站点地址、插件、Excel文件和截图目录由基准测试覆盖。
+同样的参数（包括--seed）每次生成同样的关键词数据，使用--output把每次的结果追加到同一个文件便于对比。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amazon_auto import BROWSER_ENGINES, AmazonScraperEngine, ScrapeJournal, TIMING_PHASES, load_config_dict, percentile
+from mock_amazon import MockAmazonServer
+
+
+class MemorySampler:
+    """后台定期采样当前进程及其子进程（ChromeDriver和浏览器）的内存占用总和
+    需要psutil，未安装时不采样"""
+    
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_bytes = 0
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        try:
+            import psutil
+        except ImportError:
+            print("未安装psutil，跳过内存统计（pip install psutil）")
+            return False
+        
+        self.thread = threading.Thread(target=self.sample_loop, args=(psutil,))
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+    
+    def sample_loop(self, psutil):
+        process = psutil.Process()
+        while not self.stopped.wait(self.interval):
+            total = 0
+            for p in [process] + process.children(recursive=True):
+                try:
+                    total += p.memory_info().rss
+                except psutil.Error:
+                    # 采样期间退出的进程
+                    continue
+            self.samples.append(total)
+            self.peak_bytes = max(self.peak_bytes, total)
+    
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="亚马逊爬取引擎离线基准测试")
+    parser.add_argument("--config", help="配置文件路径（.py或.toml），默认使用config.py")
+    parser.add_argument("--keywords", type=int, default=30, help="关键词数量")
+    parser.add_argument("--workers", type=int, help="并行浏览器数量，默认使用配置中的WORKER_COUNT")
+    parser.add_argument("--engine", choices=BROWSER_ENGINES, help="浏览器引擎，默认使用配置中的BROWSER_ENGINE")
+    parser.add_argument("--tabs", type=int, help="异步CDP引擎的标签页数量，默认使用配置中的CDP_TAB_COUNT")
+    parser.add_argument("--seed", type=int, default=0, help="模拟数据的随机种子")
+    parser.add_argument("--render-delay", type=float, default=1.0, help="插件接口的基础延迟（秒）")
+    parser.add_argument("--render-jitter", type=float, default=0.5, help="在基础延迟上增加的随机延迟上限（秒）")
+    parser.add_argument("--empty-rate", type=float, default=0.1, help="返回暂无数据的比例")
+    parser.add_argument("--partial-rate", type=float, default=0.1, help="只返回部分数据的比例")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="页面响应延迟（秒）")
+    parser.add_argument("--network-capture", action="store_true", help="开启从插件网络响应中获取数据")
+    parser.add_argument("--keep-interval", action="store_true", help="保留配置中的关键词间隔（默认不等待）")
+    parser.add_argument("--retry-pass", action="store_true",
+                        help="开启数据不完整关键词的重试（模拟站点的部分数据不会变化，默认关闭）")
+    parser.add_argument("--output", help="把本次结果以JSON行追加到该文件")
+    return parser.parse_args(argv)
+
+
+def build_config(args, base_url, work_dir, excel_path):
+    """在用户配置的基础上覆盖基准测试需要的设置"""
+    config_dict = load_config_dict(args.config)
+    config_dict.update({
+        "AMAZON_BASE_URL": base_url,
+        "EXTENSION_PATH": "",
+        "BROWSER_OPTIONS": dict(config_dict["BROWSER_OPTIONS"], headless=True),
+        "EXCEL_PATH": excel_path,
+        "SCREENSHOTS_DIR": os.path.join(work_dir, "screenshots"),
+        "MAX_PRODUCTS": args.keywords,
+        "PLUGIN_INITIAL_WAIT": 0,
+        "DEFAULT_BROWSER_CLOSE_WAIT": 0,
+        "PERSISTENT_PROFILE": False,
+        "RESULT_CACHE_ENABLED": False,
+        "METRICS_REPORT_FORMAT": "jsonl",
+        "METRICS_PROMETHEUS_PATH": "",
+        "RETRY_PASS_ENABLED": args.retry_pass
+    })
+    if args.workers is not None:
+        config_dict["WORKER_COUNT"] = args.workers
+    if args.engine is not None:
+        config_dict["BROWSER_ENGINE"] = args.engine
+    if args.tabs is not None:
+        config_dict["CDP_TAB_COUNT"] = args.tabs
+    if not args.keep_interval:
+        config_dict["PRODUCT_SEARCH_INTERVAL"] = 0
+        config_dict["MIN_PRODUCT_SEARCH_INTERVAL"] = 0
+    if args.network_capture:
+        config_dict["NETWORK_CAPTURE_ENABLED"] = True
+        config_dict["NETWORK_CAPTURE_URL_PATTERN"] = r"/plugin/api"
+        config_dict["NETWORK_CAPTURE_FIELDS"] = {"搜索转化率": "searchConversionRate", "点击转化率": "clickConversionRate"}
+        config_dict["NETWORK_CAPTURE_KEYWORD_FIELD"] = "keyword"
+    return config_dict
+
+
+def load_timings(work_dir):
+    """读取引擎写出的阶段用时报告"""
+    records = []
+    for filename in os.listdir(work_dir):
+        if "_timings_" in filename and filename.endswith(".jsonl"):
+            with open(os.path.join(work_dir, filename), encoding="utf-8") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def summarize(records):
+    """各阶段和总用时的p50/p95"""
+    summary = {}
+    for name in TIMING_PHASES + ["total", "commands"]:
+        values = sorted(record[name] for record in records)
+        summary[name] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return summary
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    
+    server = MockAmazonServer(seed=args.seed, render_delay=args.render_delay, render_jitter=args.render_jitter,
+                              empty_rate=args.empty_rate, partial_rate=args.partial_rate, page_delay=args.page_delay)
+    base_url = server.start()
+    print(f"模拟站点已启动: {base_url}")
+    
+    work_dir = tempfile.mkdtemp(prefix="amazon_auto_benchmark_")
+    excel_path = os.path.join(work_dir, "benchmark.xlsx")
+    keywords = [f"benchmark keyword {i:04d}" for i in range(args.keywords)]
+    pd.DataFrame({"流量词": keywords, "搜索转化率": None, "类目转化率": None}).to_excel(excel_path, index=False)
+    
+    config_dict = build_config(args, base_url, work_dir, excel_path)
+    engine = AmazonScraperEngine(config_dict)
+    
+    sampler = MemorySampler()
+    sampler.start()
+    start_time = time.time()
+    try:
+        success = engine.run()
+    finally:
+        elapsed = time.time() - start_time
+        sampler.stop()
+        server.stop()
+    
+    records = load_timings(work_dir)
+    results = ScrapeJournal(engine.get_journal_path(engine.get_output_base(config_dict))).load()
+    correct = sum(1 for keyword, data in results.items() if data == server.expected(keyword))
+    summary = summarize(records)
+    
+    report = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "success": success,
+        "keywords": args.keywords,
+        "completed": len(results),
+        "correct": correct,
+        "workers": config_dict["WORKER_COUNT"],
+        "engine": config_dict["BROWSER_ENGINE"],
+        "elapsed_seconds": round(elapsed, 2),
+        "keywords_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0,
+        "peak_memory_mb": round(sampler.peak_bytes / 1024 / 1024, 1) if sampler.samples else None,
+        "phases": summary,
+        "args": vars(args)
+    }
+    
+    print("\n========== 基准测试结果 ==========")
+    print(f"完成关键词: {report['completed']}/{report['keywords']}，结果正确: {correct}")
+    print(f"并行浏览器: {report['workers']}，总用时: {report['elapsed_seconds']} 秒")
+    print(f"吞吐量: {report['keywords_per_minute']} 关键词/分钟")
+    print(f"{'阶段':<14}{'p50':>8}{'p95':>8}")
+    for name in TIMING_PHASES + ["total"]:
+        print(f"{name:<16}{summary[name]['p50']:>8.2f}{summary[name]['p95']:>8.2f}")
+    print(f"WebDriver/CDP命令数: p50 {summary['commands']['p50']}，p95 {summary['commands']['p95']}")
+    if report["peak_memory_mb"] is not None:
+        print(f"内存峰值（含浏览器进程）: {report['peak_memory_mb']} MB")
+    print(f"运行文件保存在: {work_dir}")
+    
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"结果已追加到: {args.output}")
+    
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""异步CDP引擎：在一个Chrome进程中用多个标签页并发处理关键词
+
+浏览器仍由ChromeDriver启动，并由Selenium完成访问主页和设置配送地址（沿用插件加载、持久化配置、
+无头模式等设置）；之后通过浏览器的DevTools websocket直接发送CDP命令，不再经过ChromeDriver的HTTP转发。
+每个标签页是一个asyncio任务，各自处于导航、等待插件或提取数据的不同阶段，
+每个阶段的超时都是asyncio的截止时间，等待期间不占用线程。
+
+结果记录、结果日志、缓存、共享速率限制、用时统计、重试阶段和批量模式的工作簿写出都沿用AmazonScraperEngine。
+该引擎不支持从插件网络响应获取数据（NETWORK_CAPTURE_ENABLED）和按资源类型拦截请求，这两项设置会被忽略。
+
+依赖websockets（见requirements.txt），只在使用该引擎时才导入。
+"""
+import asyncio
+import itertools
+import json
+import queue
+import time
+import urllib.request
+from urllib.parse import quote_plus
+
+from amazon_auto import (
+    PAGE_CLASSIFY_SCRIPT, PLUGIN_PANEL_RECT_SCRIPT, PLUGIN_READY_SCRIPT, PLUGIN_TABLE_SCRIPT,
+    PhaseTimer, classify_result
+)
+
+
+def wrap_script(script, *args):
+    """把Selenium风格的脚本（函数体，通过arguments读取参数）转换成Runtime.evaluate的表达式"""
+    return f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+
+
+def wrap_async_script(script, *args):
+    """把Selenium风格的异步脚本（最后一个参数是回调）转换成返回Promise的表达式"""
+    return (f"new Promise(function(resolve) {{ (function() {{\n{script}\n}})"
+            f".apply(null, {json.dumps(list(args))}.concat([resolve])); }})")
+
+
+class CDPError(Exception):
+    """CDP命令返回错误、页面脚本抛出异常或浏览器连接已断开"""
+
+
+class CDPConnection:
+    """浏览器级别的CDP websocket连接
+    所有标签页通过flatten会话共用这一个连接，按id分发命令的响应，按sessionId分发事件"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.ids = itertools.count(1)
+        self.pending = {}  # 命令id -> Future
+        self.event_waiters = []  # (sessionId, 事件名, Future)
+        self.reader = asyncio.ensure_future(self.read_loop())
+
+    @classmethod
+    async def connect(cls, websocket_url):
+        import websockets
+        websocket = await websockets.connect(websocket_url, max_size=None)
+        return cls(websocket)
+
+    async def read_loop(self):
+        try:
+            async for message in self.websocket:
+                data = json.loads(message)
+                if "id" in data:
+                    future = self.pending.pop(data["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in data:
+                        future.set_exception(CDPError(data["error"].get("message", str(data["error"]))))
+                    else:
+                        future.set_result(data.get("result", {}))
+                else:
+                    self.dispatch_event(data)
+        except Exception as e:
+            print(f"CDP连接读取失败: {e}")
+        finally:
+            # 连接断开后让所有等待中的命令和事件立即失败
+            waiting = list(self.pending.values()) + [waiter[2] for waiter in self.event_waiters]
+            self.pending.clear()
+            self.event_waiters.clear()
+            for future in waiting:
+                if not future.done():
+                    future.set_exception(CDPError("浏览器连接已断开"))
+
+    def dispatch_event(self, data):
+        # 丢弃已超时取消的等待
+        self.event_waiters = [waiter for waiter in self.event_waiters if not waiter[2].done()]
+        for waiter in list(self.event_waiters):
+            session_id, method, future = waiter
+            if data.get("sessionId") == session_id and data.get("method") == method:
+                self.event_waiters.remove(waiter)
+                future.set_result(data.get("params", {}))
+
+    def expect_event(self, method, session_id=None):
+        """在发送命令之前注册，返回事件到达时完成的Future"""
+        future = asyncio.get_running_loop().create_future()
+        self.event_waiters.append((session_id, method, future))
+        return future
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        """发送一条命令并等待响应，timeout为None时不限制等待时间"""
+        if self.reader.done():
+            raise CDPError("浏览器连接已断开")
+
+        message_id = next(self.ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = future
+        try:
+            await self.websocket.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(message_id, None)
+
+    async def close(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+        await asyncio.gather(self.reader, return_exceptions=True)
+
+
+class CDPTab:
+    """通过flatten会话控制的一个标签页"""
+
+    def __init__(self, connection, target_id, session_id):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.command_count = 0
+
+    @classmethod
+    async def open(cls, connection, blocked_urls=None):
+        """新建标签页并附加会话，与浏览器中已设置好配送地址的页面共享Cookie
+        每个标签页在单独的窗口中打开，都处于前台，截图不会因为页面被隐藏而卡住"""
+        target = await connection.send("Target.createTarget", {"url": "about:blank", "newWindow": True})
+        attached = await connection.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        tab = cls(connection, target["targetId"], attached["sessionId"])
+        await tab.send("Page.enable")
+        if blocked_urls:
+            # 与Selenium引擎相同，只阻止配置中的非必要第三方资源
+            await tab.send("Network.enable")
+            await tab.send("Network.setBlockedURLs", {"urls": blocked_urls})
+        return tab
+
+    async def send(self, method, params=None, timeout=30):
+        self.command_count += 1
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def navigate(self, url, timeout):
+        """导航并等待新页面的DOMContentLoaded
+        返回 'loaded'、'timeout'（已停止加载）或导航失败时浏览器给出的错误信息（例如net::ERR_CONNECTION_RESET）"""
+        loaded = self.connection.expect_event("Page.domContentEventFired", self.session_id)
+        try:
+            async with asyncio.timeout(timeout):
+                result = await self.send("Page.navigate", {"url": url}, timeout=None)
+                if result.get("errorText"):
+                    return result["errorText"]
+                await loaded
+            return "loaded"
+        except TimeoutError:
+            await self.send("Page.stopLoading")
+            return "timeout"
+        finally:
+            loaded.cancel()
+
+    async def evaluate(self, expression, await_promise=False, timeout=30):
+        """在页面中执行表达式并返回结果的值，脚本抛出异常时引发CDPError"""
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise
+        }, timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CDPError(details.get("exception", {}).get("description") or details.get("text", "脚本执行失败"))
+        return result.get("result", {}).get("value")
+
+    async def run_script(self, script, *args, timeout=30):
+        return await self.evaluate(wrap_script(script, *args), timeout=timeout)
+
+    async def close(self):
+        await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+
+
+class CDPTabEngine:
+    """在AmazonScraperEngine的一次运行中代替每个工作线程一个浏览器的方式：
+    一个浏览器中的多个标签页由同一个事件循环并发处理共享队列中的关键词"""
+
+    def __init__(self, engine, config_dict, keyword_queue, results, progress, lock, retry_keywords=None):
+        self.engine = engine
+        self.config_dict = config_dict
+        self.keyword_queue = keyword_queue
+        self.results = results
+        self.progress = progress
+        self.lock = lock
+        self.retry_keywords = retry_keywords
+        self.loop = None
+
+    def run(self):
+        """在当前线程中运行事件循环，直到主流程和重试阶段都完成"""
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            print("异步CDP引擎需要websockets，请先安装: pip install websockets")
+            return
+
+        try:
+            asyncio.run(self.main())
+        except Exception as e:
+            print(f"异步CDP引擎出现错误: {e}")
+
+    async def main(self):
+        config_dict = self.config_dict
+        self.loop = asyncio.get_running_loop()
+
+        # 用ChromeDriver启动浏览器并完成主页和配送地址的准备，之后只通过CDP控制
+        driver = await asyncio.to_thread(self.engine.prepare_browser, config_dict)
+        websocket_url = await asyncio.to_thread(self.get_browser_websocket_url, driver)
+        connection = await CDPConnection.connect(websocket_url)
+
+        try:
+            tab_count = max(1, min(config_dict["CDP_TAB_COUNT"], self.keyword_queue.qsize()))
+            tabs = await asyncio.gather(*(CDPTab.open(connection, config_dict["BLOCKED_RESOURCES"]) for _ in range(tab_count)))
+            print(f"已打开{len(tabs)}个标签页，开始并发搜索")
+
+            await self.run_tabs(tabs, config_dict, self.keyword_queue, self.progress, self.retry_keywords)
+
+            # 重试阶段使用同样的标签页，由引擎的重试流程在另一个线程中调度
+            if self.retry_keywords and self.engine.running:
+                def run_workers(retry_config, retry_queue, retry_progress):
+                    future = asyncio.run_coroutine_threadsafe(
+                        self.run_tabs(tabs, retry_config, retry_queue, retry_progress, retry_pass=True), self.loop)
+                    future.result()
+
+                await asyncio.to_thread(self.engine.run_retry_pass, config_dict, self.retry_keywords,
+                                        self.results, self.lock, run_workers)
+
+            await asyncio.gather(*(tab.close() for tab in tabs), return_exceptions=True)
+        finally:
+            await connection.close()
+
+    def get_browser_websocket_url(self, driver):
+        """通过ChromeDriver报告的调试地址取得浏览器级别的DevTools websocket地址"""
+        address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=10) as response:
+            return json.load(response)["webSocketDebuggerUrl"]
+
+    async def run_tabs(self, tabs, config_dict, keyword_queue, progress, retry_keywords=None, retry_pass=False):
+        """所有标签页并发地从队列中领取关键词，直到队列为空"""
+        await asyncio.gather(*(
+            self.tab_worker(tab_id, tab, config_dict, keyword_queue, progress, retry_keywords, retry_pass)
+            for tab_id, tab in enumerate(tabs, 1)
+        ))
+
+    async def tab_worker(self, tab_id, tab, config_dict, keyword_queue, progress, retry_keywords, retry_pass):
+        prefix = f"[标签页{tab_id}] "
+        if self.engine.target_label:
+            prefix = f"[{self.engine.target_label}] {prefix}"
+
+        while self.engine.running:
+            try:
+                product_name = keyword_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                await self.process_keyword(tab_id, tab, config_dict, product_name, keyword_queue, progress,
+                                           retry_keywords, retry_pass, prefix)
+            except Exception as e:
+                # 标签页异常时将关键词放回队列，交给其他标签页处理
+                print(f"{prefix}处理关键词 {product_name} 时出现错误，该标签页将退出: {e}")
+                keyword_queue.put(product_name)
+                break
+
+    async def process_keyword(self, tab_id, tab, config_dict, product_name, keyword_queue, progress,
+                              retry_keywords, retry_pass, prefix):
+        engine = self.engine
+        with self.lock:
+            done = progress["done"]
+        engine.report_progress(done, progress["total"], f"{prefix}正在搜索: {product_name} ({done + 1}/{progress['total']})")
+        print(f"\n--- {prefix}搜索: {product_name} ---")
+
+        timer = PhaseTimer()
+        command_count_before = tab.command_count
+
+        # 从共享的速率限制中预约搜索时机，等待期间其他标签页继续工作
+        await self.sleep(engine.rate_limiter.acquire())
+        timer.lap("wait")
+        start_time = time.time()
+
+        url = f"{engine.get_amazon_base_url(config_dict)}/s?k={quote_plus(product_name)}"
+        navigation = await tab.navigate(url, config_dict["PAGE_LOAD_TIMEOUT"])
+        if navigation == "timeout":
+            print(f"{prefix}搜索结果页面加载超时，继续下一步")
+        if navigation in ("loaded", "timeout"):
+            page_class = await self.classify_page(tab, config_dict)
+        else:
+            # 网络错误等导航失败按错误页面处理，关键词在退避后重试，标签页继续工作
+            print(f"{prefix}打开搜索结果页失败: {navigation}")
+            page_class = "error"
+        timer.lap("navigate")
+
+        if page_class in ("captcha", "error"):
+            engine.record_rate_limit(page_class, None, prefix)
+            if not engine.requeue_blocked_keyword(config_dict, product_name, page_class, keyword_queue, self.lock, prefix):
+                await asyncio.to_thread(engine.finish_keyword, product_name, self.results, self.lock)
+            if engine.metrics is not None:
+                engine.metrics.add(product_name, tab_id, page_class, tab.command_count - command_count_before, timer)
+            return
+        if page_class == "no_results":
+            print(f"{prefix}亚马逊没有该关键词的搜索结果，继续读取插件数据")
+
+        keyword_data, status, plugin_wait = await self.extract_keyword_data(tab, config_dict, retry_pass, prefix)
+        timer.lap("extract")
+        timer.move("extract", "plugin_ready", plugin_wait)
+        print(f"{prefix}本关键词共发送 {tab.command_count - command_count_before} 条CDP命令（结果: {status}）")
+
+        engine.record_rate_limit(page_class, keyword_data, prefix)
+        # 写结果日志、缓存以及批量模式中写出工作簿都是阻塞操作，放到线程中执行，不影响其他标签页的等待
+        done = await asyncio.to_thread(engine.record_keyword_result, config_dict, product_name, keyword_data, status,
+                                       self.results, progress, self.lock, retry_keywords, retry_pass, prefix)
+        timer.lap("record")
+
+        if engine.should_capture_screenshot(config_dict, keyword_data, done):
+            await self.capture_screenshot(tab, config_dict, product_name, prefix)
+        timer.lap("screenshot")
+
+        print(f"{prefix}本次搜索和数据收集用时: {time.time() - start_time:.2f}秒")
+        if engine.metrics is not None:
+            engine.metrics.add(product_name, tab_id, "cdp", tab.command_count - command_count_before, timer)
+
+    async def sleep(self, seconds):
+        """等待指定时间，停止运行时立即返回"""
+        deadline = time.time() + seconds
+        while self.engine.running and time.time() < deadline:
+            await asyncio.sleep(min(0.5, deadline - time.time()))
+
+    async def classify_page(self, tab, config_dict):
+        """导航后轮询页面分类脚本，超时仍无法判断时返回 'unknown'"""
+        try:
+            async with asyncio.timeout(config_dict["QUICK_WAIT_TIMEOUT"]):
+                while True:
+                    try:
+                        page_class = await tab.run_script(PAGE_CLASSIFY_SCRIPT)
+                    except CDPError:
+                        page_class = None
+                    if page_class:
+                        return page_class
+                    await asyncio.sleep(0.1)
+        except TimeoutError:
+            return "unknown"
+
+    async def extract_keyword_data(self, tab, config_dict, wait_for_complete=False, prefix=""):
+        """用MutationObserver脚本（以Promise方式）等待插件渲染，再用一次脚本读取表格
+        只取到部分数据时，wait_for_complete为True则在剩余时间内继续读取
+        返回(结果, 分类, 等待插件渲染的秒数)"""
+        wait_time = config_dict["PLUGIN_DATA_WAIT_TIME"]
+        start_time = time.time()
+        no_data = {"搜索转化率": "无", "点击转化率": "无"}
+
+        plugin_state = None
+        try:
+            async with asyncio.timeout(wait_time + 5):
+                plugin_state = await tab.evaluate(wrap_async_script(PLUGIN_READY_SCRIPT, int(wait_time * 1000)),
+                                                  await_promise=True, timeout=None)
+        except (TimeoutError, CDPError) as e:
+            print(f"{prefix}监听插件渲染失败，改为轮询插件表格: {e or '超时'}")
+        plugin_wait = time.time() - start_time
+
+        if plugin_state == "empty":
+            print(f"{prefix}插件提示暂无数据")
+            return no_data, "empty", plugin_wait
+        if plugin_state == "timeout":
+            print(f"{prefix}等待超时({wait_time}秒)，插件未渲染数据")
+            return no_data, "timeout", plugin_wait
+
+        keyword_data = dict(no_data)
+        deadline = start_time + wait_time
+        while True:
+            try:
+                table_state = await tab.run_script(PLUGIN_TABLE_SCRIPT) or {}
+            except CDPError as e:
+                print(f"{prefix}通过脚本读取插件表格失败: {e}")
+                table_state = {}
+
+            if table_state.get("empty"):
+                print(f"{prefix}插件提示暂无数据")
+                return no_data, "empty", plugin_wait
+            if table_state.get("search"):
+                keyword_data["搜索转化率"] = table_state["search"]
+            if table_state.get("click"):
+                keyword_data["点击转化率"] = table_state["click"]
+
+            status = classify_result(keyword_data)
+            if status == "complete" or (status == "partial" and not wait_for_complete) or time.time() >= deadline:
+                print(f"{prefix}搜索转化率: {keyword_data['搜索转化率']}，点击转化率: {keyword_data['点击转化率']}")
+                return keyword_data, status, plugin_wait
+            await asyncio.sleep(0.5)
+
+    async def capture_screenshot(self, tab, config_dict, product_name, prefix=""):
+        """通过标签页会话截图，编码和写盘交给引擎的后台截图线程"""
+        try:
+            image_format = config_dict["SCREENSHOT_FORMAT"]
+            params = {"format": image_format}
+            if image_format != "png":
+                params["quality"] = config_dict["SCREENSHOT_QUALITY"]
+
+            if config_dict["SCREENSHOT_CLIP_PLUGIN"]:
+                panel_rect = await tab.run_script(PLUGIN_PANEL_RECT_SCRIPT)
+                if panel_rect:
+                    params["clip"] = dict(panel_rect, scale=1)
+                    params["captureBeyondViewport"] = True
+
+            screenshot = await tab.send("Page.captureScreenshot", params)
+            extension = "jpg" if image_format == "jpeg" else image_format
+            screenshot_path = f"{config_dict['SCREENSHOTS_DIR']}/{product_name}_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+            self.engine.screenshot_writer.submit(screenshot_path, screenshot["data"])
+            print(f"{prefix}页面截图将保存到: {screenshot_path}")
+        except Exception as e:
+            print(f"{prefix}保存截图时出现错误: {e}")
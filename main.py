@@ -1,25 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext
 import threading
+import queue
+import logging
+from logging.handlers import RotatingFileHandler
 import os
 import sys
-import time
 
-# Import the original scraping functionality
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import TimeoutException
-import pandas as pd
-import re
+# Import the GUI-free scraping engine
+import amazon_auto
+from amazon_auto import AmazonScraperEngine, AdaptiveWaitScheduler, SCREENSHOT_POLICIES, SCREENSHOT_FORMATS, METRICS_REPORT_FORMATS, BROWSER_ENGINES, parse_targets, format_targets
 
 # Import default configuration
 import config
 
+# 日志设置：界面只保留最近的日志行，完整日志写入滚动日志文件
+LOG_FILE = getattr(config, "LOG_FILE", "amazon_auto.log")
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+MAX_LOG_LINES = 2000
+LOG_DRAIN_INTERVAL_MS = 100
+
 class AmazonScraperGUI:
     def __init__(self, root):
         self.root = root
@@ -45,10 +46,20 @@ class AmazonScraperGUI:
         # Create control buttons
         self.create_control_buttons()
         
-        # Initialize the driver variable
-        self.driver = None
+        # Initialize the scraping engine (created for each run)
+        self.engine = None
         self.running = False
         
+        # 自适应等待的延迟统计在同一会话的多次运行之间共享
+        self.wait_scheduler = AdaptiveWaitScheduler()
+        
+        # Log pipeline: worker threads enqueue text and progress updates,
+        # the Tk thread drains them in batches on a timer
+        self.ui_queue = queue.Queue()
+        self.log_line_buffer = ""
+        self.file_logger = self.create_file_logger()
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self.drain_ui_queue)
+        
         # Redirect stdout to the log text area
         self.stdout_original = sys.stdout
         sys.stdout = self
@@ -64,6 +75,11 @@ class AmazonScraperGUI:
         self.no_sandbox = tk.BooleanVar(value=config.BROWSER_OPTIONS.get("no_sandbox", True))
         self.disable_dev_shm_usage = tk.BooleanVar(value=config.BROWSER_OPTIONS.get("disable_dev_shm_usage", True))
         self.disable_extensions_file_access_check = tk.BooleanVar(value=config.BROWSER_OPTIONS.get("disable_extensions_file_access_check", True))
+        self.headless = tk.BooleanVar(value=config.BROWSER_OPTIONS.get("headless", False))
+        
+        # 持久化浏览器配置（按站点和邮编保存配送地址、插件状态和缓存）
+        self.persistent_profile = tk.BooleanVar(value=getattr(config, "PERSISTENT_PROFILE", False))
+        self.profile_dir = tk.StringVar(value=getattr(config, "PROFILE_DIR", "chrome_profiles"))
         
         # Timeout settings
         self.page_load_timeout = tk.IntVar(value=config.PAGE_LOAD_TIMEOUT)
@@ -77,10 +93,25 @@ class AmazonScraperGUI:
         # Blocked resources
         self.blocked_resources = tk.StringVar(value=", ".join(config.BLOCKED_RESOURCES))
         
+        # 请求拦截（按资源类型和域名规则拦截，插件请求始终放行）
+        self.request_interception_enabled = tk.BooleanVar(value=getattr(config, "REQUEST_INTERCEPTION_ENABLED", False))
+        self.block_images = tk.BooleanVar(value=getattr(config, "BLOCK_IMAGES", True))
+        self.blocked_resource_types = tk.StringVar(value=", ".join(getattr(config, "BLOCKED_RESOURCE_TYPES", ["Font", "Media"])))
+        self.blocked_domains = tk.StringVar(value=", ".join(getattr(config, "BLOCKED_DOMAINS", ["amazon-adsystem.com", "doubleclick.net", "googlesyndication.com"])))
+        self.allowed_domains = tk.StringVar(value=", ".join(getattr(config, "ALLOWED_DOMAINS", [])))
+        
         # File paths
         self.excel_path = tk.StringVar(value=config.EXCEL_PATH)
+        self.excel_batch_input = tk.StringVar(value=getattr(config, "EXCEL_BATCH_INPUT", ""))
         self.screenshots_dir = tk.StringVar(value=config.SCREENSHOTS_DIR)
         
+        # 截图设置
+        self.screenshot_policy = tk.StringVar(value=getattr(config, "SCREENSHOT_POLICY", "always"))
+        self.screenshot_every_n = tk.IntVar(value=getattr(config, "SCREENSHOT_EVERY_N", 10))
+        self.screenshot_format = tk.StringVar(value=getattr(config, "SCREENSHOT_FORMAT", "jpeg"))
+        self.screenshot_quality = tk.IntVar(value=getattr(config, "SCREENSHOT_QUALITY", 60))
+        self.screenshot_clip_plugin = tk.BooleanVar(value=getattr(config, "SCREENSHOT_CLIP_PLUGIN", False))
+        
         # Data scraping configuration
         self.max_products = tk.IntVar(value=config.MAX_PRODUCTS)
         self.plugin_data_wait_time = tk.IntVar(value=config.PLUGIN_DATA_WAIT_TIME)
@@ -89,11 +120,65 @@ class AmazonScraperGUI:
         self.plugin_data_processing_wait = tk.IntVar(value=config.PLUGIN_DATA_PROCESSING_WAIT)
         self.product_search_interval = tk.IntVar(value=config.PRODUCT_SEARCH_INTERVAL)
         self.min_product_search_interval = tk.IntVar(value=config.MIN_PRODUCT_SEARCH_INTERVAL)
+        
+        # 自适应搜索速率：页面正常时逐步缩短到最小间隔，出现限流信号时加倍退避
+        self.adaptive_rate_limit = tk.BooleanVar(value=getattr(config, "ADAPTIVE_RATE_LIMIT", True))
+        self.rate_limit_max_interval = tk.IntVar(value=getattr(config, "RATE_LIMIT_MAX_INTERVAL", 120))
+        self.rate_limit_empty_streak = tk.IntVar(value=getattr(config, "RATE_LIMIT_EMPTY_STREAK", 3))
+        self.blocked_retry_limit = tk.IntVar(value=getattr(config, "BLOCKED_RETRY_LIMIT", 3))
+        
+        # 只有部分数据或等待超时的关键词在主流程结束后用更长的插件等待时间重试
+        self.retry_pass_enabled = tk.BooleanVar(value=getattr(config, "RETRY_PASS_ENABLED", True))
+        self.retry_plugin_data_wait_time = tk.IntVar(value=getattr(config, "RETRY_PLUGIN_DATA_WAIT_TIME", 30))
         self.default_browser_close_wait = tk.IntVar(value=config.DEFAULT_BROWSER_CLOSE_WAIT)
         
         # 新增加的等待时间变量
         self.amazon_homepage_wait = tk.IntVar(value=getattr(config, "AMAZON_HOMEPAGE_WAIT", 10))  # 默认10秒
         self.delivery_location_wait = tk.IntVar(value=getattr(config, "DELIVERY_LOCATION_WAIT", 10))  # 默认10秒
+        
+        # 根据页面信号自适应等待，上述等待时间作为最长等待
+        self.adaptive_wait = tk.BooleanVar(value=getattr(config, "ADAPTIVE_WAIT", True))
+        
+        # 并行浏览器数量
+        self.worker_count = tk.IntVar(value=getattr(config, "WORKER_COUNT", 1))  # 默认1个浏览器
+        
+        # 浏览器引擎：selenium每个工作线程一个浏览器，cdp在一个浏览器中用多个标签页并发
+        self.browser_engine = tk.StringVar(value=getattr(config, "BROWSER_ENGINE", "selenium"))
+        self.cdp_tab_count = tk.IntVar(value=getattr(config, "CDP_TAB_COUNT", 4))
+        
+        # 直接跳转搜索URL（关闭时使用搜索框输入关键词）
+        self.direct_search_url = tk.BooleanVar(value=getattr(config, "DIRECT_SEARCH_URL", True))
+        
+        # 站点地址覆盖（为空时使用 https://www.<站点>，基准测试时指向本地模拟站点）
+        self.amazon_base_url = tk.StringVar(value=getattr(config, "AMAZON_BASE_URL", ""))
+        
+        # 多目标模式：同时运行多个(站点, 邮编)，格式为"站点 邮编; 站点 邮编"
+        self.amazon_targets = tk.StringVar(value=format_targets(getattr(config, "TARGETS", [])))
+        
+        # 关键词结果缓存
+        self.result_cache_enabled = tk.BooleanVar(value=getattr(config, "RESULT_CACHE_ENABLED", False))
+        self.result_cache_ttl_hours = tk.IntVar(value=getattr(config, "RESULT_CACHE_TTL_HOURS", 168))  # 默认7天
+        self.result_cache_empty_ttl_hours = tk.IntVar(value=getattr(config, "RESULT_CACHE_EMPTY_TTL_HOURS", 24))
+        
+        # 关键词标准化和去重
+        self.keyword_normalization = tk.BooleanVar(value=getattr(config, "KEYWORD_NORMALIZATION", True))
+        
+        # 数据提取设置
+        self.use_mutation_observer = tk.BooleanVar(value=getattr(config, "USE_MUTATION_OBSERVER", True))
+        
+        # 从插件的网络响应中获取数据（未捕获到响应时回退到页面提取）
+        network_capture_fields = getattr(config, "NETWORK_CAPTURE_FIELDS", {})
+        self.network_capture_enabled = tk.BooleanVar(value=getattr(config, "NETWORK_CAPTURE_ENABLED", False))
+        self.network_capture_url_pattern = tk.StringVar(value=getattr(config, "NETWORK_CAPTURE_URL_PATTERN", ""))
+        self.network_capture_timeout = tk.IntVar(value=getattr(config, "NETWORK_CAPTURE_TIMEOUT", 10))
+        self.network_capture_search_field = tk.StringVar(value=network_capture_fields.get("搜索转化率", "searchConversionRate"))
+        self.network_capture_click_field = tk.StringVar(value=network_capture_fields.get("点击转化率", "clickConversionRate"))
+        self.network_capture_keyword_field = tk.StringVar(value=getattr(config, "NETWORK_CAPTURE_KEYWORD_FIELD", "keyword"))
+        self.network_capture_miss_limit = tk.IntVar(value=getattr(config, "NETWORK_CAPTURE_MISS_LIMIT", 3))
+        
+        # 运行统计：每个关键词的阶段用时报告和可选的Prometheus文本文件
+        self.metrics_report_format = tk.StringVar(value=getattr(config, "METRICS_REPORT_FORMAT", "csv"))
+        self.metrics_prometheus_path = tk.StringVar(value=getattr(config, "METRICS_PROMETHEUS_PATH", ""))
     
     def create_browser_tab(self):
         """Create the browser configuration tab"""
@@ -123,6 +208,17 @@ class AmazonScraperGUI:
         ttk.Checkbutton(options_frame, text="禁用沙箱", variable=self.no_sandbox).grid(row=0, column=1, sticky='w', padx=5, pady=5)
         ttk.Checkbutton(options_frame, text="禁用共享内存", variable=self.disable_dev_shm_usage).grid(row=1, column=0, sticky='w', padx=5, pady=5)
         ttk.Checkbutton(options_frame, text="禁用扩展文件访问检查", variable=self.disable_extensions_file_access_check).grid(row=1, column=1, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(options_frame, text="无头模式（不显示浏览器窗口）", variable=self.headless).grid(row=2, column=0, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Persistent profile frame
+        profile_frame = ttk.LabelFrame(browser_frame, text="持久化浏览器配置")
+        profile_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Checkbutton(profile_frame, text="按站点和邮编复用浏览器配置（配送地址正确时跳过设置）", variable=self.persistent_profile).grid(row=0, column=0, columnspan=3, sticky='w', padx=5, pady=5)
+        ttk.Label(profile_frame, text="配置保存目录:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(profile_frame, textvariable=self.profile_dir, width=40).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Button(profile_frame, text="浏览...", command=lambda: self.browse_directory(self.profile_dir)).grid(row=1, column=2, padx=5, pady=5)
         row += 1
         
         # Timeout settings frame
@@ -142,6 +238,23 @@ class AmazonScraperGUI:
         # Blocked resources
         ttk.Label(browser_frame, text="屏蔽的资源（逗号分隔）:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
         ttk.Entry(browser_frame, textvariable=self.blocked_resources, width=50).grid(row=row, column=1, columnspan=2, sticky='we', padx=5, pady=5)
+        row += 1
+        
+        # Request interception frame
+        interception_frame = ttk.LabelFrame(browser_frame, text="请求拦截")
+        interception_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Checkbutton(interception_frame, text="按资源类型和域名拦截请求（统计每个关键词的页面流量）", variable=self.request_interception_enabled).grid(row=0, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(interception_frame, text="拦截图片", variable=self.block_images).grid(row=1, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(interception_frame, text="拦截的资源类型:").grid(row=2, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(interception_frame, textvariable=self.blocked_resource_types, width=40).grid(row=2, column=1, sticky='we', padx=5, pady=5)
+        
+        ttk.Label(interception_frame, text="拦截的域名:").grid(row=3, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(interception_frame, textvariable=self.blocked_domains, width=40).grid(row=3, column=1, sticky='we', padx=5, pady=5)
+        
+        ttk.Label(interception_frame, text="始终放行的域名:").grid(row=4, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(interception_frame, textvariable=self.allowed_domains, width=40).grid(row=4, column=1, sticky='we', padx=5, pady=5)
     
     def create_amazon_tab(self):
         """Create the Amazon configuration tab"""
@@ -158,6 +271,23 @@ class AmazonScraperGUI:
         # Delivery zipcode
         ttk.Label(amazon_frame, text="配送地址邮编:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
         ttk.Entry(amazon_frame, textvariable=self.delivery_zipcode, width=15).grid(row=row, column=1, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Search navigation mode
+        ttk.Checkbutton(amazon_frame, text="直接跳转搜索URL（插件需要时可关闭，改用搜索框输入）", variable=self.direct_search_url).grid(row=row, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Base URL override
+        ttk.Label(amazon_frame, text="站点地址覆盖（可选）:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(amazon_frame, textvariable=self.amazon_base_url, width=40).grid(row=row, column=1, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Multi-target matrix
+        ttk.Label(amazon_frame, text="多目标（可选）:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(amazon_frame, textvariable=self.amazon_targets, width=40).grid(row=row, column=1, sticky='w', padx=5, pady=5)
+        row += 1
+        ttk.Label(amazon_frame, text="格式: 站点 邮编; 站点 邮编（例如 amazon.com 10001; amazon.de 10115），\n"
+                                     "填写后同时运行所有目标，结果写入同一个Excel文件的单独列").grid(row=row, column=0, columnspan=2, sticky='w', padx=5, pady=5)
     
     def create_data_tab(self):
         """Create the data configuration tab"""
@@ -172,16 +302,56 @@ class AmazonScraperGUI:
         ttk.Button(data_frame, text="浏览...", command=lambda: self.browse_file(self.excel_path, [("Excel文件", "*.xlsx *.xls")])).grid(row=row, column=2, padx=5, pady=5)
         row += 1
         
+        # Batch input
+        ttk.Label(data_frame, text="批量输入（目录或通配符，可选）:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(data_frame, textvariable=self.excel_batch_input, width=50).grid(row=row, column=1, padx=5, pady=5)
+        ttk.Button(data_frame, text="浏览...", command=lambda: self.browse_directory(self.excel_batch_input)).grid(row=row, column=2, padx=5, pady=5)
+        row += 1
+        ttk.Label(data_frame, text="填写后忽略上面的Excel文件，合并所有工作簿的关键词用同一组浏览器搜索，每个工作簿完成后立即写出").grid(row=row, column=0, columnspan=3, sticky='w', padx=5, pady=5)
+        row += 1
+        
         # Screenshots directory
         ttk.Label(data_frame, text="截图保存目录:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
         ttk.Entry(data_frame, textvariable=self.screenshots_dir, width=50).grid(row=row, column=1, padx=5, pady=5)
         ttk.Button(data_frame, text="浏览...", command=lambda: self.browse_directory(self.screenshots_dir)).grid(row=row, column=2, padx=5, pady=5)
         row += 1
         
+        # Screenshot settings frame
+        screenshot_frame = ttk.LabelFrame(data_frame, text="截图设置")
+        screenshot_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Label(screenshot_frame, text="截图策略:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        ttk.Combobox(screenshot_frame, textvariable=self.screenshot_policy, values=SCREENSHOT_POLICIES, state='readonly', width=10).grid(row=0, column=1, sticky='w', padx=5, pady=5)
+        ttk.Label(screenshot_frame, text="每N个关键词截图一次:").grid(row=0, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(screenshot_frame, from_=1, to=1000, textvariable=self.screenshot_every_n, width=5).grid(row=0, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(screenshot_frame, text="图片格式:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        ttk.Combobox(screenshot_frame, textvariable=self.screenshot_format, values=SCREENSHOT_FORMATS, state='readonly', width=10).grid(row=1, column=1, sticky='w', padx=5, pady=5)
+        ttk.Label(screenshot_frame, text="图片质量(1-100):").grid(row=1, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(screenshot_frame, from_=1, to=100, textvariable=self.screenshot_quality, width=5).grid(row=1, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Checkbutton(screenshot_frame, text="只截取插件数据面板", variable=self.screenshot_clip_plugin).grid(row=2, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        row += 1
+        
         # Max products
         ttk.Label(data_frame, text="最大爬取产品数:").grid(row=row, column=0, sticky='w', padx=5, pady=5)
         ttk.Spinbox(data_frame, from_=1, to=1000, textvariable=self.max_products, width=10).grid(row=row, column=1, sticky='w', padx=5, pady=5)
         row += 1
+        
+        # Keyword normalization
+        ttk.Checkbutton(data_frame, text="合并大小写、空格或全角字符不同的重复关键词（只搜索一次，结果写回所有对应行）", variable=self.keyword_normalization).grid(row=row, column=0, columnspan=3, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Result cache frame
+        cache_frame = ttk.LabelFrame(data_frame, text="结果缓存")
+        cache_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Checkbutton(cache_frame, text="跳过有效期内已爬取过的关键词（缓存保存在截图目录）", variable=self.result_cache_enabled).grid(row=0, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Label(cache_frame, text="缓存有效期（小时）:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(cache_frame, from_=1, to=8760, textvariable=self.result_cache_ttl_hours, width=8).grid(row=1, column=1, sticky='w', padx=5, pady=5)
+        ttk.Label(cache_frame, text="暂无数据结果的有效期（小时，0为不缓存）:").grid(row=2, column=0, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(cache_frame, from_=0, to=8760, textvariable=self.result_cache_empty_ttl_hours, width=8).grid(row=2, column=1, sticky='w', padx=5, pady=5)
+        row += 1
     
     def create_execution_tab(self):
         """Create the execution configuration tab"""
@@ -222,6 +392,78 @@ class AmazonScraperGUI:
         
         ttk.Label(wait_frame, text="默认浏览器关闭等待时间:").grid(row=4, column=0, sticky='w', padx=5, pady=5)
         ttk.Spinbox(wait_frame, from_=5, to=300, textvariable=self.default_browser_close_wait, width=5).grid(row=4, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Checkbutton(wait_frame, text="根据页面信号自适应等待（以上时间作为最长等待）", variable=self.adaptive_wait).grid(row=5, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        
+        ttk.Checkbutton(wait_frame, text="自适应搜索速率（页面正常时缩短到最小间隔，出现人机验证等限流信号时加倍退避）", variable=self.adaptive_rate_limit).grid(row=6, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(wait_frame, text="最大退避间隔时间:").grid(row=7, column=0, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(wait_frame, from_=10, to=600, textvariable=self.rate_limit_max_interval, width=5).grid(row=7, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(wait_frame, text="连续无数据视为限流:").grid(row=7, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(wait_frame, from_=1, to=20, textvariable=self.rate_limit_empty_streak, width=5).grid(row=7, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(wait_frame, text="人机验证/错误页面重试次数:").grid(row=8, column=0, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(wait_frame, from_=0, to=10, textvariable=self.blocked_retry_limit, width=5).grid(row=8, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Checkbutton(wait_frame, text="全部搜索完后重试数据不完整的关键词", variable=self.retry_pass_enabled).grid(row=9, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(wait_frame, text="重试时插件数据等待时间:").grid(row=9, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(wait_frame, from_=5, to=120, textvariable=self.retry_plugin_data_wait_time, width=5).grid(row=9, column=3, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Parallel settings frame
+        parallel_frame = ttk.LabelFrame(execution_frame, text="并行设置")
+        parallel_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Label(parallel_frame, text="并行浏览器数量:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(parallel_frame, from_=1, to=16, textvariable=self.worker_count, width=5).grid(row=0, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(parallel_frame, text="浏览器引擎:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        ttk.Combobox(parallel_frame, textvariable=self.browser_engine, values=BROWSER_ENGINES, state='readonly', width=10).grid(row=1, column=1, sticky='w', padx=5, pady=5)
+        ttk.Label(parallel_frame, text="标签页数量(cdp):").grid(row=1, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(parallel_frame, from_=1, to=32, textvariable=self.cdp_tab_count, width=5).grid(row=1, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(parallel_frame, text="cdp引擎只启动一个浏览器，在多个标签页中同时处理关键词（需要安装websockets）").grid(row=2, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Extraction settings frame
+        extraction_frame = ttk.LabelFrame(execution_frame, text="数据提取设置")
+        extraction_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Checkbutton(extraction_frame, text="监听插件渲染（MutationObserver，替代轮询等待）", variable=self.use_mutation_observer).grid(row=0, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        
+        ttk.Checkbutton(extraction_frame, text="从插件网络响应中获取数据（未捕获到时回退到页面提取）", variable=self.network_capture_enabled).grid(row=1, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="响应URL匹配(正则):").grid(row=2, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(extraction_frame, textvariable=self.network_capture_url_pattern, width=25).grid(row=2, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="等待响应时间:").grid(row=2, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(extraction_frame, from_=1, to=60, textvariable=self.network_capture_timeout, width=5).grid(row=2, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="搜索转化率字段:").grid(row=3, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(extraction_frame, textvariable=self.network_capture_search_field, width=25).grid(row=3, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="点击转化率字段:").grid(row=3, column=2, sticky='w', padx=5, pady=5)
+        ttk.Entry(extraction_frame, textvariable=self.network_capture_click_field, width=25).grid(row=3, column=3, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="关键词字段:").grid(row=4, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(extraction_frame, textvariable=self.network_capture_keyword_field, width=25).grid(row=4, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(extraction_frame, text="连续未捕获几次后停用(0为不停用):").grid(row=4, column=2, sticky='w', padx=5, pady=5)
+        ttk.Spinbox(extraction_frame, from_=0, to=100, textvariable=self.network_capture_miss_limit, width=5).grid(row=4, column=3, sticky='w', padx=5, pady=5)
+        row += 1
+        
+        # Metrics frame
+        metrics_frame = ttk.LabelFrame(execution_frame, text="运行统计")
+        metrics_frame.grid(row=row, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+        
+        ttk.Label(metrics_frame, text="阶段用时报告格式:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        ttk.Combobox(metrics_frame, textvariable=self.metrics_report_format, values=METRICS_REPORT_FORMATS, state='readonly', width=10).grid(row=0, column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(metrics_frame, text="Prometheus文本文件（可选）:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        ttk.Entry(metrics_frame, textvariable=self.metrics_prometheus_path, width=40).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Button(metrics_frame, text="浏览...", command=lambda: self.browse_file(self.metrics_prometheus_path, [("Prometheus文本文件", "*.prom")])).grid(row=1, column=2, padx=5, pady=5)
     
     def create_log_area(self):
         """Create the log output area"""
@@ -251,6 +493,10 @@ class AmazonScraperGUI:
         self.start_button = ttk.Button(button_frame, text="开始爬取", command=self.start_scraping)
         self.start_button.pack(side='left', padx=5)
         
+        # Resume button
+        self.resume_button = ttk.Button(button_frame, text="继续上次任务", command=self.resume_scraping)
+        self.resume_button.pack(side='left', padx=5)
+        
         # Stop button
         self.stop_button = ttk.Button(button_frame, text="停止", command=self.stop_scraping, state='disabled')
         self.stop_button.pack(side='left', padx=5)
@@ -282,15 +528,66 @@ class AmazonScraperGUI:
         if directory:
             string_var.set(directory)
     
+    def create_file_logger(self):
+        """Create the rotating file logger that receives the full log"""
+        file_logger = logging.getLogger("amazon_auto.gui")
+        file_logger.setLevel(logging.INFO)
+        file_logger.propagate = False
+        
+        if not file_logger.handlers:
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES,
+                                          backupCount=LOG_FILE_BACKUP_COUNT, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            file_logger.addHandler(handler)
+        
+        return file_logger
+    
     def write(self, text):
-        """Write text to the log area (used for redirecting stdout)"""
+        """Queue text for the log area (used for redirecting stdout)
+        Never touches Tk, so it is safe and non-blocking from any thread"""
+        self.ui_queue.put_nowait(("log", text))
+    
+    def drain_ui_queue(self):
+        """Apply queued log text, progress and run-state updates in one batch (runs on the Tk thread)
+        Always reschedules itself, so one failing update cannot stop the pump"""
+        texts = []
+        try:
+            while True:
+                kind, payload = self.ui_queue.get_nowait()
+                if kind == "log":
+                    texts.append(payload)
+                elif kind == "progress":
+                    self.apply_progress(*payload)
+                elif kind == "status":
+                    self.progress_label.config(text=payload)
+                elif kind == "finished":
+                    self.apply_finished()
+        except queue.Empty:
+            pass
+        finally:
+            if texts:
+                self.append_log("".join(texts))
+            self.root.after(LOG_DRAIN_INTERVAL_MS, self.drain_ui_queue)
+    
+    def append_log(self, text):
+        """Append a batch of text to the log area and the log file, keeping only the most recent lines in the widget"""
         self.log_text.config(state='normal')
         self.log_text.insert(tk.END, text)
+        
+        # Keep a bounded ring of recent lines in the widget
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > MAX_LOG_LINES:
+            self.log_text.delete('1.0', f"{line_count - MAX_LOG_LINES + 1}.0")
+        
         self.log_text.see(tk.END)
         self.log_text.config(state='disabled')
         
-        # Force update the UI
-        self.root.update_idletasks()
+        # Write complete lines to the log file, keeping any partial line for the next batch
+        lines = (self.log_line_buffer + text).split("\n")
+        self.log_line_buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.file_logger.info(line)
     
     def flush(self):
         """Required for stdout redirection"""
@@ -303,17 +600,22 @@ class AmazonScraperGUI:
         self.log_text.config(state='disabled')
     
     def update_progress(self, current, total, status=None):
-        """Update the progress bar and label"""
-        progress = (current / total) * 100
+        """Queue a progress bar and label update (safe to call from any thread)"""
+        self.ui_queue.put_nowait(("progress", (current, total, status)))
+    
+    def apply_progress(self, current, total, status=None):
+        """Update the progress bar and label (runs on the Tk thread)"""
+        progress = (current / total) * 100 if total else 0
         self.progress_var.set(progress)
         
         if status:
             self.progress_label.config(text=status)
         else:
             self.progress_label.config(text=f"进度: {current}/{total} ({progress:.1f}%)")
-        
-        # Force update the UI
-        self.root.update_idletasks()
+    
+    def set_status(self, text):
+        """Queue a progress label update (safe to call from any thread)"""
+        self.ui_queue.put_nowait(("status", text))
     
     def save_config(self):
         """Save current configuration to a file"""
@@ -336,9 +638,15 @@ class AmazonScraperGUI:
                 f.write(f"    \"start_maximized\": {self.start_maximized.get()},\n")
                 f.write(f"    \"no_sandbox\": {self.no_sandbox.get()},\n")
                 f.write(f"    \"disable_dev_shm_usage\": {self.disable_dev_shm_usage.get()},\n")
-                f.write(f"    \"disable_extensions_file_access_check\": {self.disable_extensions_file_access_check.get()}\n")
+                f.write(f"    \"disable_extensions_file_access_check\": {self.disable_extensions_file_access_check.get()},\n")
+                f.write(f"    \"headless\": {self.headless.get()}\n")
                 f.write("}\n\n")
                 
+                # 持久化浏览器配置
+                f.write("# 持久化浏览器配置\n")
+                f.write(f"PERSISTENT_PROFILE = {self.persistent_profile.get()}\n")
+                f.write(f"PROFILE_DIR = r\"{self.profile_dir.get()}\"\n\n")
+                
                 # 页面加载超时设置
                 f.write("# 页面加载超时设置（秒）\n")
                 f.write(f"PAGE_LOAD_TIMEOUT = {self.page_load_timeout.get()}\n")
@@ -348,12 +656,16 @@ class AmazonScraperGUI:
                 # 亚马逊站点配置
                 f.write("# 亚马逊站点配置\n")
                 f.write(f"AMAZON_SITE = \"{self.amazon_site.get()}\"\n")
-                f.write(f"DELIVERY_ZIPCODE = \"{self.delivery_zipcode.get()}\"\n\n")
+                f.write(f"DELIVERY_ZIPCODE = \"{self.delivery_zipcode.get()}\"\n")
+                f.write(f"DIRECT_SEARCH_URL = {self.direct_search_url.get()}\n")
+                f.write(f"AMAZON_BASE_URL = \"{self.amazon_base_url.get()}\"\n")
+                f.write(f"TARGETS = {parse_targets(self.amazon_targets.get())!r}\n\n")
                 
                 # 新增：亚马逊页面等待时间
                 f.write("# 亚马逊页面等待时间（秒）\n")
                 f.write(f"AMAZON_HOMEPAGE_WAIT = {self.amazon_homepage_wait.get()}\n")
-                f.write(f"DELIVERY_LOCATION_WAIT = {self.delivery_location_wait.get()}\n\n")
+                f.write(f"DELIVERY_LOCATION_WAIT = {self.delivery_location_wait.get()}\n")
+                f.write(f"ADAPTIVE_WAIT = {self.adaptive_wait.get()}\n\n")
                 
                 # 网络资源屏蔽列表
                 f.write("# 网络资源屏蔽列表\n")
@@ -367,14 +679,35 @@ class AmazonScraperGUI:
                             f.write(f"    \"{resource}\"\n")
                 f.write("]\n\n")
                 
+                # 请求拦截
+                f.write("# 请求拦截（资源类型使用CDP的ResourceType名称，如Image、Font、Media）\n")
+                f.write(f"REQUEST_INTERCEPTION_ENABLED = {self.request_interception_enabled.get()}\n")
+                f.write(f"BLOCK_IMAGES = {self.block_images.get()}\n")
+                f.write(f"BLOCKED_RESOURCE_TYPES = {self.split_list(self.blocked_resource_types.get())!r}\n")
+                f.write(f"BLOCKED_DOMAINS = {self.split_list(self.blocked_domains.get())!r}\n")
+                f.write(f"ALLOWED_DOMAINS = {self.split_list(self.allowed_domains.get())!r}\n\n")
+                
                 # 文件路径配置
                 f.write("# 文件路径配置\n")
                 f.write(f"EXCEL_PATH = \"{self.excel_path.get()}\"\n")
+                f.write(f"EXCEL_BATCH_INPUT = {self.excel_batch_input.get()!r}\n")
                 f.write(f"SCREENSHOTS_DIR = \"{self.screenshots_dir.get()}\"\n\n")
                 
+                # 截图设置
+                f.write("# 截图设置\n")
+                f.write(f"SCREENSHOT_POLICY = \"{self.screenshot_policy.get()}\"\n")
+                f.write(f"SCREENSHOT_EVERY_N = {self.screenshot_every_n.get()}\n")
+                f.write(f"SCREENSHOT_FORMAT = \"{self.screenshot_format.get()}\"\n")
+                f.write(f"SCREENSHOT_QUALITY = {self.screenshot_quality.get()}\n")
+                f.write(f"SCREENSHOT_CLIP_PLUGIN = {self.screenshot_clip_plugin.get()}\n\n")
+                
                 # 数据爬取配置
                 f.write("# 数据爬取配置\n")
                 f.write(f"MAX_PRODUCTS = {self.max_products.get()}\n")
+                f.write(f"KEYWORD_NORMALIZATION = {self.keyword_normalization.get()}\n")
+                f.write(f"RESULT_CACHE_ENABLED = {self.result_cache_enabled.get()}\n")
+                f.write(f"RESULT_CACHE_TTL_HOURS = {self.result_cache_ttl_hours.get()}\n")
+                f.write(f"RESULT_CACHE_EMPTY_TTL_HOURS = {self.result_cache_empty_ttl_hours.get()}\n")
                 f.write(f"PLUGIN_DATA_WAIT_TIME = {self.plugin_data_wait_time.get()}\n")
                 f.write(f"PLUGIN_INITIAL_WAIT = {self.plugin_initial_wait.get()}\n")
                 f.write(f"SEARCH_RESULT_INITIAL_WAIT = {self.search_result_initial_wait.get()}\n")
@@ -382,9 +715,45 @@ class AmazonScraperGUI:
                 f.write(f"PRODUCT_SEARCH_INTERVAL = {self.product_search_interval.get()}\n")
                 f.write(f"MIN_PRODUCT_SEARCH_INTERVAL = {self.min_product_search_interval.get()}\n\n")
                 
+                # 自适应搜索速率
+                f.write("# 自适应搜索速率（所有浏览器共享，间隔单位为秒）\n")
+                f.write(f"ADAPTIVE_RATE_LIMIT = {self.adaptive_rate_limit.get()}\n")
+                f.write(f"RATE_LIMIT_MAX_INTERVAL = {self.rate_limit_max_interval.get()}\n")
+                f.write(f"RATE_LIMIT_EMPTY_STREAK = {self.rate_limit_empty_streak.get()}\n")
+                f.write(f"BLOCKED_RETRY_LIMIT = {self.blocked_retry_limit.get()}\n\n")
+                
+                # 数据不完整的关键词重试
+                f.write("# 只有部分数据或等待超时的关键词在全部搜索完后重试（等待时间单位为秒）\n")
+                f.write(f"RETRY_PASS_ENABLED = {self.retry_pass_enabled.get()}\n")
+                f.write(f"RETRY_PLUGIN_DATA_WAIT_TIME = {self.retry_plugin_data_wait_time.get()}\n\n")
+                
                 # 默认浏览器关闭等待时间
                 f.write("# 默认浏览器关闭等待时间（秒）\n")
-                f.write(f"DEFAULT_BROWSER_CLOSE_WAIT = {self.default_browser_close_wait.get()}\n")
+                f.write(f"DEFAULT_BROWSER_CLOSE_WAIT = {self.default_browser_close_wait.get()}\n\n")
+                
+                # 并行设置
+                f.write("# 并行设置\n")
+                f.write(f"WORKER_COUNT = {self.worker_count.get()}\n")
+                f.write(f"BROWSER_ENGINE = \"{self.browser_engine.get()}\"\n")
+                f.write(f"CDP_TAB_COUNT = {self.cdp_tab_count.get()}\n\n")
+                
+                # 数据提取设置
+                f.write("# 数据提取设置\n")
+                f.write(f"USE_MUTATION_OBSERVER = {self.use_mutation_observer.get()}\n")
+                f.write(f"NETWORK_CAPTURE_ENABLED = {self.network_capture_enabled.get()}\n")
+                f.write(f"NETWORK_CAPTURE_URL_PATTERN = r\"{self.network_capture_url_pattern.get()}\"\n")
+                f.write(f"NETWORK_CAPTURE_TIMEOUT = {self.network_capture_timeout.get()}\n")
+                f.write("NETWORK_CAPTURE_FIELDS = {\n")
+                f.write(f"    \"搜索转化率\": \"{self.network_capture_search_field.get()}\",\n")
+                f.write(f"    \"点击转化率\": \"{self.network_capture_click_field.get()}\"\n")
+                f.write("}\n")
+                f.write(f"NETWORK_CAPTURE_KEYWORD_FIELD = \"{self.network_capture_keyword_field.get()}\"\n")
+                f.write(f"NETWORK_CAPTURE_MISS_LIMIT = {self.network_capture_miss_limit.get()}\n\n")
+                
+                # 运行统计
+                f.write("# 运行统计（报告格式: csv、jsonl 或 none）\n")
+                f.write(f"METRICS_REPORT_FORMAT = \"{self.metrics_report_format.get()}\"\n")
+                f.write(f"METRICS_PROMETHEUS_PATH = r\"{self.metrics_prometheus_path.get()}\"\n")
             
             print(f"配置已保存到: {filename}")
         except Exception as e:
@@ -411,6 +780,13 @@ class AmazonScraperGUI:
             self.no_sandbox.set(temp_config.BROWSER_OPTIONS.get("no_sandbox", True))
             self.disable_dev_shm_usage.set(temp_config.BROWSER_OPTIONS.get("disable_dev_shm_usage", True))
             self.disable_extensions_file_access_check.set(temp_config.BROWSER_OPTIONS.get("disable_extensions_file_access_check", True))
+            self.headless.set(temp_config.BROWSER_OPTIONS.get("headless", False))
+            
+            if hasattr(temp_config, 'PERSISTENT_PROFILE'):
+                self.persistent_profile.set(temp_config.PERSISTENT_PROFILE)
+            
+            if hasattr(temp_config, 'PROFILE_DIR'):
+                self.profile_dir.set(temp_config.PROFILE_DIR)
             
             self.page_load_timeout.set(temp_config.PAGE_LOAD_TIMEOUT)
             self.element_wait_timeout.set(temp_config.ELEMENT_WAIT_TIMEOUT)
@@ -419,6 +795,15 @@ class AmazonScraperGUI:
             self.amazon_site.set(temp_config.AMAZON_SITE)
             self.delivery_zipcode.set(temp_config.DELIVERY_ZIPCODE)
             
+            if hasattr(temp_config, 'DIRECT_SEARCH_URL'):
+                self.direct_search_url.set(temp_config.DIRECT_SEARCH_URL)
+            
+            if hasattr(temp_config, 'AMAZON_BASE_URL'):
+                self.amazon_base_url.set(temp_config.AMAZON_BASE_URL)
+            
+            if hasattr(temp_config, 'TARGETS'):
+                self.amazon_targets.set(format_targets(temp_config.TARGETS))
+            
             # 新增：加载亚马逊页面等待时间（如果存在）
             if hasattr(temp_config, 'AMAZON_HOMEPAGE_WAIT'):
                 self.amazon_homepage_wait.set(temp_config.AMAZON_HOMEPAGE_WAIT)
@@ -426,24 +811,132 @@ class AmazonScraperGUI:
             if hasattr(temp_config, 'DELIVERY_LOCATION_WAIT'):
                 self.delivery_location_wait.set(temp_config.DELIVERY_LOCATION_WAIT)
             
+            if hasattr(temp_config, 'ADAPTIVE_WAIT'):
+                self.adaptive_wait.set(temp_config.ADAPTIVE_WAIT)
+            
             self.blocked_resources.set(", ".join(temp_config.BLOCKED_RESOURCES))
             
+            if hasattr(temp_config, 'REQUEST_INTERCEPTION_ENABLED'):
+                self.request_interception_enabled.set(temp_config.REQUEST_INTERCEPTION_ENABLED)
+            
+            if hasattr(temp_config, 'BLOCK_IMAGES'):
+                self.block_images.set(temp_config.BLOCK_IMAGES)
+            
+            if hasattr(temp_config, 'BLOCKED_RESOURCE_TYPES'):
+                self.blocked_resource_types.set(", ".join(temp_config.BLOCKED_RESOURCE_TYPES))
+            
+            if hasattr(temp_config, 'BLOCKED_DOMAINS'):
+                self.blocked_domains.set(", ".join(temp_config.BLOCKED_DOMAINS))
+            
+            if hasattr(temp_config, 'ALLOWED_DOMAINS'):
+                self.allowed_domains.set(", ".join(temp_config.ALLOWED_DOMAINS))
+            
             self.excel_path.set(temp_config.EXCEL_PATH)
             self.screenshots_dir.set(temp_config.SCREENSHOTS_DIR)
             
+            if hasattr(temp_config, 'EXCEL_BATCH_INPUT'):
+                self.excel_batch_input.set(temp_config.EXCEL_BATCH_INPUT)
+            
+            if hasattr(temp_config, 'SCREENSHOT_POLICY'):
+                self.screenshot_policy.set(temp_config.SCREENSHOT_POLICY)
+            
+            if hasattr(temp_config, 'SCREENSHOT_EVERY_N'):
+                self.screenshot_every_n.set(temp_config.SCREENSHOT_EVERY_N)
+            
+            if hasattr(temp_config, 'SCREENSHOT_FORMAT'):
+                self.screenshot_format.set(temp_config.SCREENSHOT_FORMAT)
+            
+            if hasattr(temp_config, 'SCREENSHOT_QUALITY'):
+                self.screenshot_quality.set(temp_config.SCREENSHOT_QUALITY)
+            
+            if hasattr(temp_config, 'SCREENSHOT_CLIP_PLUGIN'):
+                self.screenshot_clip_plugin.set(temp_config.SCREENSHOT_CLIP_PLUGIN)
+            
             self.max_products.set(temp_config.MAX_PRODUCTS)
+            
+            if hasattr(temp_config, 'KEYWORD_NORMALIZATION'):
+                self.keyword_normalization.set(temp_config.KEYWORD_NORMALIZATION)
+            
+            if hasattr(temp_config, 'RESULT_CACHE_ENABLED'):
+                self.result_cache_enabled.set(temp_config.RESULT_CACHE_ENABLED)
+            
+            if hasattr(temp_config, 'RESULT_CACHE_TTL_HOURS'):
+                self.result_cache_ttl_hours.set(temp_config.RESULT_CACHE_TTL_HOURS)
+            
+            if hasattr(temp_config, 'RESULT_CACHE_EMPTY_TTL_HOURS'):
+                self.result_cache_empty_ttl_hours.set(temp_config.RESULT_CACHE_EMPTY_TTL_HOURS)
+            
             self.plugin_data_wait_time.set(temp_config.PLUGIN_DATA_WAIT_TIME)
             self.plugin_initial_wait.set(temp_config.PLUGIN_INITIAL_WAIT)
             self.search_result_initial_wait.set(temp_config.SEARCH_RESULT_INITIAL_WAIT)
             self.plugin_data_processing_wait.set(temp_config.PLUGIN_DATA_PROCESSING_WAIT)
             self.product_search_interval.set(temp_config.PRODUCT_SEARCH_INTERVAL)
             self.min_product_search_interval.set(temp_config.MIN_PRODUCT_SEARCH_INTERVAL)
+            
+            if hasattr(temp_config, 'ADAPTIVE_RATE_LIMIT'):
+                self.adaptive_rate_limit.set(temp_config.ADAPTIVE_RATE_LIMIT)
+            
+            if hasattr(temp_config, 'RATE_LIMIT_MAX_INTERVAL'):
+                self.rate_limit_max_interval.set(temp_config.RATE_LIMIT_MAX_INTERVAL)
+            
+            if hasattr(temp_config, 'RATE_LIMIT_EMPTY_STREAK'):
+                self.rate_limit_empty_streak.set(temp_config.RATE_LIMIT_EMPTY_STREAK)
+            
+            if hasattr(temp_config, 'BLOCKED_RETRY_LIMIT'):
+                self.blocked_retry_limit.set(temp_config.BLOCKED_RETRY_LIMIT)
+            
+            if hasattr(temp_config, 'RETRY_PASS_ENABLED'):
+                self.retry_pass_enabled.set(temp_config.RETRY_PASS_ENABLED)
+            
+            if hasattr(temp_config, 'RETRY_PLUGIN_DATA_WAIT_TIME'):
+                self.retry_plugin_data_wait_time.set(temp_config.RETRY_PLUGIN_DATA_WAIT_TIME)
             self.default_browser_close_wait.set(temp_config.DEFAULT_BROWSER_CLOSE_WAIT)
             
+            if hasattr(temp_config, 'WORKER_COUNT'):
+                self.worker_count.set(temp_config.WORKER_COUNT)
+            
+            if hasattr(temp_config, 'BROWSER_ENGINE'):
+                self.browser_engine.set(temp_config.BROWSER_ENGINE)
+            
+            if hasattr(temp_config, 'CDP_TAB_COUNT'):
+                self.cdp_tab_count.set(temp_config.CDP_TAB_COUNT)
+            
+            if hasattr(temp_config, 'USE_MUTATION_OBSERVER'):
+                self.use_mutation_observer.set(temp_config.USE_MUTATION_OBSERVER)
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_ENABLED'):
+                self.network_capture_enabled.set(temp_config.NETWORK_CAPTURE_ENABLED)
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_URL_PATTERN'):
+                self.network_capture_url_pattern.set(temp_config.NETWORK_CAPTURE_URL_PATTERN)
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_TIMEOUT'):
+                self.network_capture_timeout.set(temp_config.NETWORK_CAPTURE_TIMEOUT)
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_FIELDS'):
+                self.network_capture_search_field.set(temp_config.NETWORK_CAPTURE_FIELDS.get("搜索转化率", ""))
+                self.network_capture_click_field.set(temp_config.NETWORK_CAPTURE_FIELDS.get("点击转化率", ""))
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_KEYWORD_FIELD'):
+                self.network_capture_keyword_field.set(temp_config.NETWORK_CAPTURE_KEYWORD_FIELD)
+            
+            if hasattr(temp_config, 'NETWORK_CAPTURE_MISS_LIMIT'):
+                self.network_capture_miss_limit.set(temp_config.NETWORK_CAPTURE_MISS_LIMIT)
+            
+            if hasattr(temp_config, 'METRICS_REPORT_FORMAT'):
+                self.metrics_report_format.set(temp_config.METRICS_REPORT_FORMAT)
+            
+            if hasattr(temp_config, 'METRICS_PROMETHEUS_PATH'):
+                self.metrics_prometheus_path.set(temp_config.METRICS_PROMETHEUS_PATH)
+            
             print(f"配置已从 {filename} 加载")
         except Exception as e:
             print(f"加载配置时出错: {e}")
     
+    def split_list(self, text):
+        """Split a comma separated entry into a list of non-empty items"""
+        return [item.strip() for item in text.split(",") if item.strip()]
+    
     def get_current_config(self):
         """Get current configuration as a dictionary"""
         blocked_resources = [r.strip() for r in self.blocked_resources.get().split(",") if r.strip()]
@@ -455,413 +948,91 @@ class AmazonScraperGUI:
                 "start_maximized": self.start_maximized.get(),
                 "no_sandbox": self.no_sandbox.get(),
                 "disable_dev_shm_usage": self.disable_dev_shm_usage.get(),
-                "disable_extensions_file_access_check": self.disable_extensions_file_access_check.get()
+                "disable_extensions_file_access_check": self.disable_extensions_file_access_check.get(),
+                "headless": self.headless.get()
             },
+            "PERSISTENT_PROFILE": self.persistent_profile.get(),
+            "PROFILE_DIR": self.profile_dir.get(),
             "PAGE_LOAD_TIMEOUT": self.page_load_timeout.get(),
             "ELEMENT_WAIT_TIMEOUT": self.element_wait_timeout.get(),
             "QUICK_WAIT_TIMEOUT": self.quick_wait_timeout.get(),
             "AMAZON_SITE": self.amazon_site.get(),
             "DELIVERY_ZIPCODE": self.delivery_zipcode.get(),
+            "DIRECT_SEARCH_URL": self.direct_search_url.get(),
+            "AMAZON_BASE_URL": self.amazon_base_url.get(),
+            "TARGETS": parse_targets(self.amazon_targets.get()),
             "BLOCKED_RESOURCES": blocked_resources,
+            "REQUEST_INTERCEPTION_ENABLED": self.request_interception_enabled.get(),
+            "BLOCK_IMAGES": self.block_images.get(),
+            "BLOCKED_RESOURCE_TYPES": self.split_list(self.blocked_resource_types.get()),
+            "BLOCKED_DOMAINS": self.split_list(self.blocked_domains.get()),
+            "ALLOWED_DOMAINS": self.split_list(self.allowed_domains.get()),
             "EXCEL_PATH": self.excel_path.get(),
+            "EXCEL_BATCH_INPUT": self.excel_batch_input.get(),
             "SCREENSHOTS_DIR": self.screenshots_dir.get(),
+            "SCREENSHOT_POLICY": self.screenshot_policy.get(),
+            "SCREENSHOT_EVERY_N": self.screenshot_every_n.get(),
+            "SCREENSHOT_FORMAT": self.screenshot_format.get(),
+            "SCREENSHOT_QUALITY": self.screenshot_quality.get(),
+            "SCREENSHOT_CLIP_PLUGIN": self.screenshot_clip_plugin.get(),
             "MAX_PRODUCTS": self.max_products.get(),
+            "KEYWORD_NORMALIZATION": self.keyword_normalization.get(),
+            "RESULT_CACHE_ENABLED": self.result_cache_enabled.get(),
+            "RESULT_CACHE_TTL_HOURS": self.result_cache_ttl_hours.get(),
+            "RESULT_CACHE_EMPTY_TTL_HOURS": self.result_cache_empty_ttl_hours.get(),
             "PLUGIN_DATA_WAIT_TIME": self.plugin_data_wait_time.get(),
             "PLUGIN_INITIAL_WAIT": self.plugin_initial_wait.get(),
             "SEARCH_RESULT_INITIAL_WAIT": self.search_result_initial_wait.get(),
             "PLUGIN_DATA_PROCESSING_WAIT": self.plugin_data_processing_wait.get(),
             "PRODUCT_SEARCH_INTERVAL": self.product_search_interval.get(),
             "MIN_PRODUCT_SEARCH_INTERVAL": self.min_product_search_interval.get(),
+            "ADAPTIVE_RATE_LIMIT": self.adaptive_rate_limit.get(),
+            "RATE_LIMIT_MAX_INTERVAL": self.rate_limit_max_interval.get(),
+            "RATE_LIMIT_EMPTY_STREAK": self.rate_limit_empty_streak.get(),
+            "BLOCKED_RETRY_LIMIT": self.blocked_retry_limit.get(),
+            "RETRY_PASS_ENABLED": self.retry_pass_enabled.get(),
+            "RETRY_PLUGIN_DATA_WAIT_TIME": self.retry_plugin_data_wait_time.get(),
             "DEFAULT_BROWSER_CLOSE_WAIT": self.default_browser_close_wait.get(),
             # 新增加的等待时间配置
             "AMAZON_HOMEPAGE_WAIT": self.amazon_homepage_wait.get(),
-            "DELIVERY_LOCATION_WAIT": self.delivery_location_wait.get()
+            "DELIVERY_LOCATION_WAIT": self.delivery_location_wait.get(),
+            "ADAPTIVE_WAIT": self.adaptive_wait.get(),
+            "WORKER_COUNT": self.worker_count.get(),
+            "BROWSER_ENGINE": self.browser_engine.get(),
+            "CDP_TAB_COUNT": self.cdp_tab_count.get(),
+            "USE_MUTATION_OBSERVER": self.use_mutation_observer.get(),
+            "NETWORK_CAPTURE_ENABLED": self.network_capture_enabled.get(),
+            "NETWORK_CAPTURE_URL_PATTERN": self.network_capture_url_pattern.get(),
+            "NETWORK_CAPTURE_TIMEOUT": self.network_capture_timeout.get(),
+            "NETWORK_CAPTURE_FIELDS": {
+                "搜索转化率": self.network_capture_search_field.get(),
+                "点击转化率": self.network_capture_click_field.get()
+            },
+            "NETWORK_CAPTURE_KEYWORD_FIELD": self.network_capture_keyword_field.get(),
+            "NETWORK_CAPTURE_MISS_LIMIT": self.network_capture_miss_limit.get(),
+            "METRICS_REPORT_FORMAT": self.metrics_report_format.get(),
+            "METRICS_PROMETHEUS_PATH": self.metrics_prometheus_path.get()
         }
 
-    def setup_browser_with_specific_extension(self, config_dict):
-        """设置并启动Chrome浏览器，加载特定的电商数据分析插件"""
-        # 配置Chrome选项
-        chrome_options = Options()
-        
-        # 从配置文件加载浏览器选项
-        if config_dict["BROWSER_OPTIONS"].get("start_maximized"):
-            chrome_options.add_argument("--start-maximized")
-        if config_dict["BROWSER_OPTIONS"].get("no_sandbox"):
-            chrome_options.add_argument("--no-sandbox")
-        if config_dict["BROWSER_OPTIONS"].get("disable_dev_shm_usage"):
-            chrome_options.add_argument("--disable-dev-shm-usage")
-        if config_dict["BROWSER_OPTIONS"].get("disable_extensions_file_access_check"):
-            chrome_options.add_argument("--disable-extensions-file-access-check")
-        
-        # 加载插件
-        chrome_options.add_argument(f"--load-extension={config_dict['EXTENSION_PATH']}")
-        
-        # 防止检测自动化
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        
-        # 创建浏览器实例
-        service = Service(executable_path=config_dict["CHROME_DRIVER_PATH"])
-        print("正在启动Chrome浏览器并加载电商数据分析插件...")
-        driver = webdriver.Chrome(options=chrome_options, service=service)
-        
-        # 修改navigator.webdriver标志
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        # 设置页面加载超时时间
-        driver.set_page_load_timeout(config_dict["PAGE_LOAD_TIMEOUT"])
-        
-        return driver
+    def resume_scraping(self):
+        """从结果日志继续上次中断的爬取任务"""
+        self.start_scraping(resume=True)
     
-    def visit_amazon_homepage(self, driver, config_dict):
-        """访问亚马逊主页"""
-        url = f"https://www.{config_dict['AMAZON_SITE']}/"
-        print(f"正在访问亚马逊主页: {url}")
-        
-        try:
-            driver.get(url)
-            print("亚马逊主页已加载")
-        except TimeoutException:
-            print(f"亚马逊主页加载超时({config_dict['PAGE_LOAD_TIMEOUT']}秒)，已中断加载")
-            # 尝试停止页面加载
-            driver.execute_script("window.stop();")
-        
-        try:
-            # 只等待搜索框这个关键元素加载
-            WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                EC.presence_of_element_located((By.ID, "twotabsearchtextbox"))
-            )
-            print("亚马逊主页搜索框已加载，可以继续操作")
-            return True
-        except Exception as e:
-            print(f"等待搜索框超时: {e}")
-            return True  # 即使没有找到搜索框，也继续下一步
-    
-    def search_product(self, driver, keyword, config_dict):
-        """在亚马逊搜索特定产品"""
-        print(f"正在搜索产品: {keyword}")
-        
-        try:
-            # 减少等待时间，快速定位搜索框
-            try:
-                search_box = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                    EC.element_to_be_clickable((By.ID, "twotabsearchtextbox"))
-                )
-                
-                # 尝试使用JavaScript直接清空和设置值，这通常比send_keys快
-                driver.execute_script("arguments[0].value = '';", search_box)
-                search_box.send_keys(keyword)
-                print(f"已输入搜索关键词: {keyword}")
-                
-                # 优先使用回车键提交搜索，这通常比点击按钮更快
-                search_box.send_keys(Keys.RETURN)
-                print("使用回车键提交了搜索")
-            except TimeoutException:
-                print("搜索框加载超时，尝试直接操作")
-                try:
-                    search_box = driver.find_element(By.ID, "twotabsearchtextbox")
-                    driver.execute_script("arguments[0].value = '';", search_box)
-                    search_box.send_keys(keyword)
-                    search_box.send_keys(Keys.RETURN)
-                except:
-                    print("无法找到搜索框，继续下一步")
-                    return True
-            
-            # 使用try-except处理页面加载超时
-            try:
-                # 快速等待搜索结果页面的某些标志性元素
-                WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                    EC.any_of(
-                        EC.url_contains("s?k="),
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".s-result-list"))
-                    )
-                )
-                print("搜索结果页面开始加载")
-            except TimeoutException:
-                print("搜索结果页面加载超时，继续下一步")
-                # 尝试停止页面加载
-                driver.execute_script("window.stop();")
-            
-            return True
-        except Exception as e:
-            print(f"搜索产品时出现错误: {e}")
-            # 即使出错也尝试继续流程
-            return True
-    
-    def set_delivery_location(self, driver, config_dict):
-        """设置亚马逊配送地址"""
-        zipcode = config_dict["DELIVERY_ZIPCODE"]
-        print(f"正在尝试设置配送地址为: {zipcode}")
-        
-        try:
-            # 等待并点击配送地址按钮
-            try:
-                WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                    EC.element_to_be_clickable((By.ID, "glow-ingress-block"))
-                ).click()
-                print("点击了配送地址按钮")
-            except TimeoutException:
-                print("配送地址按钮加载超时，尝试直接点击")
-                try:
-                    driver.find_element(By.ID, "glow-ingress-block").click()
-                except:
-                    print("无法找到配送地址按钮，继续下一步")
-                    return True
-            
-            # 只等待必要的元素 - 邮政编码输入框
-            try:
-                zipcode_input = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                    EC.presence_of_element_located((By.ID, "GLUXZipUpdateInput"))
-                )
-                zipcode_input.clear()
-                zipcode_input.send_keys(zipcode)
-                print(f"输入了邮政编码: {zipcode}")
-                
-                # 等待并点击设置按钮 (GLUXZipUpdate)
-                try:
-                    # 使用更长的超时时间确保按钮可点击
-                    update_button = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                        EC.element_to_be_clickable((By.ID, "GLUXZipUpdate"))
-                    )
-                    update_button.click()
-                    print("点击了设置按钮 (GLUXZipUpdate)")
-                except Exception as e:
-                    print(f"通过ID查找设置按钮失败: {e}")
-                    # 备用方案：尝试通过XPath查找设置按钮
-                    try:
-                        xpath_selector = "//span[@id='GLUXZipUpdate-announce'][contains(text(), '设置')]/ancestor::span[@id='GLUXZipUpdate']"
-                        update_button = WebDriverWait(driver, config_dict["ELEMENT_WAIT_TIMEOUT"]).until(
-                            EC.element_to_be_clickable((By.XPATH, xpath_selector))
-                        )
-                        update_button.click()
-                        print("通过XPath点击了设置按钮")
-                    except Exception as e2:
-                        print(f"通过XPath查找设置按钮失败: {e2}")
-                        # 最后尝试使用JavaScript点击
-                        try:
-                            driver.execute_script("document.getElementById('GLUXZipUpdate').getElementsByTagName('input')[0].click();")
-                            print("通过JavaScript点击了设置按钮")
-                        except Exception as e3:
-                            print(f"所有尝试点击设置按钮都失败: {e3}")
-                            print("将继续尝试其他操作")
-                
-                # 减少等待对话框的时间
-                time.sleep(config_dict["QUICK_WAIT_TIMEOUT"])  # 给一点时间让对话框显示
-                
-                # 尝试更快地找到并点击完成按钮
-                try:
-                    # 尝试通过多种选择器快速找到完成按钮
-                    selectors = [
-                        (By.NAME, "glowDoneButton"),
-                        (By.ID, "GLUXConfirmClose"),
-                        (By.XPATH, "//div[contains(@class, 'a-popover-footer')]//input"),
-                        (By.XPATH, "//div[contains(@class, 'a-popover-footer')]//button"),
-                        (By.XPATH, "//span[contains(text(), 'Done')]//parent::*")
-                    ]
-                    
-                    for selector in selectors:
-                        try:
-                            elements = WebDriverWait(driver, config_dict["QUICK_WAIT_TIMEOUT"]).until(
-                                EC.element_to_be_clickable(selector)
-                            )
-                            elements.click()
-                            print(f"点击了完成按钮，使用选择器: {selector}")
-                            break
-                        except:
-                            continue
-                except:
-                    print("无法找到完成按钮，尝试继续操作")
-                
-                # 减少等待页面刷新的时间
-                time.sleep(config_dict["QUICK_WAIT_TIMEOUT"])
-                
-                return True
-            except TimeoutException:
-                print("邮政编码输入框加载超时，继续下一步")
-                return True
-                
-        except Exception as e:
-            print(f"设置配送地址时出现错误: {e}")
-            return True  # 更改为True以不中断主流程
-    
-    def extract_keyword_data(self, driver, config_dict):
-        """从插件数据面板中提取关键词数据
-        返回一个字典，包含搜索转化率和点击转化率"""
-        print("等待插件数据加载...")
-        
-        start_time = time.time()
-        search_conversion_rate = "无"
-        click_conversion_rate = "无"
-        
-        # 等待插件加载数据
-        while time.time() - start_time < config_dict["PLUGIN_DATA_WAIT_TIME"]:
-            try:
-                # 首先检查是否有表格存在
-                tables = driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-table-content')]")
-                if not tables:
-                    print("未找到数据表格，继续等待...")
-                    time.sleep(1)
-                    continue
-                    
-                # 检查是否有"暂无数据"提示
-                if len(driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-empty-description') and contains(text(), '暂无数据')]")) > 0:
-                    print("插件提示暂无数据")
-                    return {"搜索转化率": "无", "点击转化率": "无"}
-                
-                # 多种方式尝试定位搜索转化率和点击转化率数据
-                # 方法1: 通过表格标题行
-                try:
-                    # 查找表格标题行中"搜索转化率"和"点击转化率"的位置
-                    headers = driver.find_elements(By.XPATH, "//th[contains(@class, 'ant-table-cell')]//div[contains(@class, 'ant-flex')]//div[not(contains(@class, 'sc-feUYzb'))]")
-                    
-                    search_conv_index = -1
-                    click_conv_index = -1
-                    
-                    for i, header in enumerate(headers):
-                        header_text = header.text.strip()
-                        if "搜索转化率" in header_text:
-                            search_conv_index = i
-                        elif "点击转化率" in header_text:
-                            click_conv_index = i
-                    
-                    # 如果找到了列索引，则尝试获取数据
-                    if search_conv_index >= 0 and click_conv_index >= 0:
-                        # 获取所有数据行
-                        rows = driver.find_elements(By.XPATH, "//tr[contains(@class, 'ant-table-row')]")
-                        
-                        if rows:
-                            # 获取第一行的单元格
-                            cells = rows[0].find_elements(By.XPATH, ".//td")
-                            
-                            if len(cells) > search_conv_index:
-                                search_conversion_rate = cells[search_conv_index].text.strip()
-                                if search_conversion_rate:
-                                    print(f"获取到搜索转化率: {search_conversion_rate}")
-                                else:
-                                    search_conversion_rate = "无"
-                            
-                            if len(cells) > click_conv_index:
-                                click_conversion_rate = cells[click_conv_index].text.strip()
-                                if click_conversion_rate:
-                                    print(f"获取到点击转化率: {click_conversion_rate}")
-                                else:
-                                    click_conversion_rate = "无"
-                except Exception as e:
-                    print(f"通过表格标题尝试获取数据失败: {e}")
-                
-                # 方法2: 直接通过固定位置尝试
-                if search_conversion_rate == "无" or click_conversion_rate == "无":
-                    try:
-                        # 假设搜索转化率在第5列，点击转化率在第6列（根据示例判断）
-                        rows = driver.find_elements(By.XPATH, "//tr[contains(@class, 'ant-table-row')]")
-                        if rows:
-                            cells = rows[0].find_elements(By.XPATH, ".//td")
-                            if len(cells) > 4:  # 第5列（索引为4）
-                                search_conversion_rate = cells[4].text.strip()
-                                if search_conversion_rate:
-                                    print(f"通过固定位置获取到搜索转化率: {search_conversion_rate}")
-                            
-                            if len(cells) > 5:  # 第6列（索引为5）
-                                click_conversion_rate = cells[5].text.strip()
-                                if click_conversion_rate:
-                                    print(f"通过固定位置获取到点击转化率: {click_conversion_rate}")
-                    except Exception as e:
-                        print(f"通过固定位置尝试获取数据失败: {e}")
-                
-                # 方法3: 尝试通过页面源码查找
-                if search_conversion_rate == "无" or click_conversion_rate == "无":
-                    try:
-                        # 获取页面源码
-                        page_source = driver.page_source
-                        
-                        # 使用正则表达式查找搜索转化率和点击转化率
-                        search_pattern = r'搜索转化率.*?>([\d.]+%)<'
-                        click_pattern = r'点击转化率.*?>([\d.]+%)<'
-                        
-                        search_match = re.search(search_pattern, page_source)
-                        click_match = re.search(click_pattern, page_source)
-                        
-                        if search_match:
-                            search_conversion_rate = search_match.group(1)
-                            print(f"通过源码获取到搜索转化率: {search_conversion_rate}")
-                        
-                        if click_match:
-                            click_conversion_rate = click_match.group(1)
-                            print(f"通过源码获取到点击转化率: {click_conversion_rate}")
-                    except Exception as e:
-                        print(f"通过页面源码尝试获取数据失败: {e}")
-                
-                # 如果两个数据都获取到了，就可以返回结果了
-                if search_conversion_rate != "无" and click_conversion_rate != "无":
-                    return {
-                        "搜索转化率": search_conversion_rate,
-                        "点击转化率": click_conversion_rate
-                    }
-                
-                # 如果已经有部分数据，就直接返回
-                if search_conversion_rate != "无" or click_conversion_rate != "无":
-                    print("只获取到部分数据，将继续使用")
-                    return {
-                        "搜索转化率": search_conversion_rate,
-                        "点击转化率": click_conversion_rate
-                    }
-                    
-            except Exception as e:
-                print(f"提取数据时出现错误: {e}")
-            
-            # 短暂等待后再次尝试
-            time.sleep(1)
-            print(f"已等待 {int(time.time() - start_time)} 秒，继续尝试获取数据...")
-        
-        print(f"等待超时({config_dict['PLUGIN_DATA_WAIT_TIME']}秒)，无法获取完整数据")
-        return {
-            "搜索转化率": search_conversion_rate,
-            "点击转化率": click_conversion_rate
-        }
-    
-    def read_product_names_from_excel(self, excel_path, max_products):
-        """从Excel文件中读取产品名"""
-        try:
-            # 检查文件是否存在
-            if not os.path.exists(excel_path):
-                print(f"错误: 找不到Excel文件: {excel_path}")
-                return [], None
-            
-            # 读取Excel文件
-            print(f"正在读取Excel文件: {excel_path}")
-            df = pd.read_excel(excel_path)
-            
-            # 检查是否有"流量词"列
-            if "流量词" not in df.columns:
-                print(f"错误: Excel文件中没有'流量词'列")
-                # 打印所有列名以便调试
-                print(f"可用列: {df.columns.tolist()}")
-                return [], None
-            
-            # 获取流量词列的前max_products个值
-            product_names = df["流量词"].head(max_products).tolist()
-            
-            # 过滤掉空值和NaN值
-            product_names = [name for name in product_names if pd.notna(name) and name.strip()]
-            
-            print(f"成功读取{len(product_names)}个产品名")
-            return product_names, df
-        
-        except Exception as e:
-            print(f"读取Excel文件时出现错误: {e}")
-            return [], None
-    
-    def start_scraping(self):
-        """开始数据爬取"""
+    def start_scraping(self, resume=False):
+        """开始数据爬取，resume为True时跳过结果日志中已完成的关键词"""
         if self.running:
             print("爬取任务已在运行中...")
             return
         
         # 获取当前配置
-        config_dict = self.get_current_config()
+        try:
+            config_dict = self.get_current_config()
+        except ValueError as e:
+            print(f"错误: {e}")
+            return
         
-        # 检查Excel文件是否存在
-        if not os.path.exists(config_dict["EXCEL_PATH"]):
+        # 检查Excel文件是否存在（批量模式在运行时查找工作簿）
+        if not config_dict["EXCEL_BATCH_INPUT"] and not os.path.exists(config_dict["EXCEL_PATH"]):
             print(f"错误: 找不到Excel文件: {config_dict['EXCEL_PATH']}")
             return
         
@@ -872,18 +1043,41 @@ class AmazonScraperGUI:
         
         # 禁用开始按钮，启用停止按钮
         self.start_button.config(state='disabled')
+        self.resume_button.config(state='disabled')
         self.stop_button.config(state='normal')
         
         # 重置进度条
         self.progress_var.set(0)
         self.progress_label.config(text="准备中...")
         
+        # 创建爬取引擎，进度和状态通过回调更新界面
+        self.engine = AmazonScraperEngine(
+            config_dict,
+            on_progress=self.update_progress,
+            on_status=self.set_status,
+            wait_scheduler=self.wait_scheduler
+        )
+        
         # 创建并启动爬取线程
         self.running = True
-        self.scrape_thread = threading.Thread(target=self.scrape_data, args=(config_dict,))
+        self.scrape_thread = threading.Thread(target=self.run_engine, args=(resume,))
         self.scrape_thread.daemon = True
         self.scrape_thread.start()
     
+    def run_engine(self, resume):
+        """在单独的线程中运行爬取引擎，结束后通过界面队列恢复按钮状态"""
+        try:
+            self.engine.run(resume=resume)
+        finally:
+            self.ui_queue.put_nowait(("finished", None))
+    
+    def apply_finished(self):
+        """Restore the buttons once the engine thread has finished (runs on the Tk thread)"""
+        self.start_button.config(state='normal')
+        self.resume_button.config(state='normal')
+        self.stop_button.config(state='disabled')
+        self.running = False
+    
     def stop_scraping(self):
         """停止数据爬取"""
         if not self.running:
@@ -891,221 +1085,27 @@ class AmazonScraperGUI:
             return
         
         print("正在停止爬取任务...")
-        self.running = False
+        
+        # 停止引擎并关闭浏览器
+        self.engine.stop()
         
         # 等待线程结束
         if hasattr(self, 'scrape_thread') and self.scrape_thread.is_alive():
             self.scrape_thread.join(2)  # 最多等待2秒
         
-        # 关闭浏览器
-        if self.driver:
-            try:
-                self.driver.quit()
-                self.driver = None
-                print("已关闭浏览器")
-            except:
-                print("关闭浏览器时出错")
-        
-        # 启用开始按钮，禁用停止按钮
-        self.start_button.config(state='normal')
+        # 引擎线程可能还在写结果日志和Excel，开始和继续按钮等run_engine真正结束后再启用，
+        # 避免新任务重置同一个结果日志
         self.stop_button.config(state='disabled')
-        self.progress_label.config(text="已停止")
-    
-    def scrape_data(self, config_dict):
-        """在单独的线程中运行爬取任务"""
-        try:
-            # 读取产品名
-            product_names, df = self.read_product_names_from_excel(
-                config_dict["EXCEL_PATH"], 
-                config_dict["MAX_PRODUCTS"]
-            )
-            
-            if not product_names:
-                print("没有找到任何产品名，任务将退出")
-                self.stop_scraping()
-                return
-            
-            print(f"将搜索以下{len(product_names)}个产品")
-            
-            # 启动浏览器
-            self.driver = self.setup_browser_with_specific_extension(config_dict)
-            
-            # 减少插件加载等待时间
-            print("等待插件加载...")
-            time.sleep(config_dict["PLUGIN_INITIAL_WAIT"])
-            
-            # 设置页面加载策略，但允许加载图片元素
-            self.driver.execute_script("window.onbeforeunload = function() { return null; };")
-            self.driver.execute_cdp_cmd('Page.setLifecycleEventsEnabled', {'enabled': True})
-            # 只阻止非必要的第三方资源，保留图片加载
-            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": config_dict["BLOCKED_RESOURCES"]})
-            self.driver.execute_cdp_cmd('Network.enable', {})
-            
-            # 直接访问亚马逊主页
-            visit_success = self.visit_amazon_homepage(self.driver, config_dict)
-            
-            # 新增：访问亚马逊主页后等待指定时间
-            homepage_wait = config_dict["AMAZON_HOMEPAGE_WAIT"]
-            print(f"亚马逊主页加载后等待 {homepage_wait} 秒...")
-            for i in range(homepage_wait, 0, -1):
-                if not self.running:
-                    break
-                self.progress_label.config(text=f"亚马逊主页加载后等待 {i} 秒...")
-                time.sleep(1)
-            
-            # 设置配送地址
-            self.set_delivery_location(self.driver, config_dict)
-            
-            # 新增：设置配送地址后等待指定时间
-            location_wait = config_dict["DELIVERY_LOCATION_WAIT"]
-            print(f"设置配送地址后等待 {location_wait} 秒...")
-            for i in range(location_wait, 0, -1):
-                if not self.running:
-                    break
-                self.progress_label.config(text=f"设置配送地址后等待 {i} 秒...")
-                time.sleep(1)
-            
-            # 收集每个关键词的数据
-            results = {}
-            
-            print(f"开始依次搜索产品，每次搜索后将等待插件数据加载并提取数据")
-            for i, product_name in enumerate(product_names, 1):
-                # 检查是否停止运行
-                if not self.running:
-                    print("爬取任务被中断")
-                    break
-                
-                # 更新进度条
-                self.update_progress(i-1, len(product_names), f"正在搜索: {product_name} ({i}/{len(product_names)})")
-                
-                print(f"\n--- 第{i}/{len(product_names)}个搜索: {product_name} ---")
-                
-                # 设置每个操作的超时时间
-                start_time = time.time()
-                
-                # 尝试搜索产品
-                search_success = self.search_product(self.driver, product_name, config_dict)
-                
-                # 等待页面加载一些基本内容，然后尝试提取数据
-                time.sleep(config_dict["SEARCH_RESULT_INITIAL_WAIT"])
-                
-                # 提取数据前等待插件完全加载
-                print("等待插件加载和处理数据...")
-                time.sleep(config_dict["PLUGIN_DATA_PROCESSING_WAIT"])
-                
-                # 尝试提取数据
-                keyword_data = self.extract_keyword_data(self.driver, config_dict)
-                results[product_name] = keyword_data
-                
-                # 截图保存当前页面状态（用于调试）
-                try:
-                    screenshot_dir = config_dict["SCREENSHOTS_DIR"]
-                    if not os.path.exists(screenshot_dir):
-                        os.makedirs(screenshot_dir)
-                    screenshot_path = f"{screenshot_dir}/{product_name}_{time.strftime('%Y%m%d_%H%M%S')}.png"
-                    self.driver.save_screenshot(screenshot_path)
-                    print(f"页面截图已保存到: {screenshot_path}")
-                except Exception as e:
-                    print(f"保存截图时出现错误: {e}")
-                
-                # 计算实际搜索用时
-                elapsed_time = time.time() - start_time
-                print(f"本次搜索和数据收集用时: {elapsed_time:.2f}秒")
-                
-                if i < len(product_names) and self.running:
-                    # 实际等待时间为设定间隔减去已花费的时间，但最少等待3秒
-                    remaining_wait = max(config_dict["MIN_PRODUCT_SEARCH_INTERVAL"], 
-                                        config_dict["PRODUCT_SEARCH_INTERVAL"] - int(elapsed_time))
-                    print(f"等待{remaining_wait}秒后搜索下一个产品...")
-                    
-                    # 创建计数器进行倒计时
-                    for j in range(remaining_wait, 0, -1):
-                        if not self.running:
-                            break
-                        self.progress_label.config(text=f"等待 {j} 秒后继续...")
-                        time.sleep(1)
-            
-            # 更新进度条到完成
-            self.update_progress(len(product_names), len(product_names), "数据收集完成")
-            
-            # 将收集到的数据更新到Excel文件
-            if df is not None and results and self.running:
-                print("\n所有产品搜索和数据收集完成，正在更新Excel文件...")
-                update_success = self.update_excel_with_data(df, results, config_dict["EXCEL_PATH"])
-                if update_success:
-                    self.progress_label.config(text="全部完成")
-                else:
-                    self.progress_label.config(text="数据收集完成，但Excel更新失败")
-            
-            # 完成所有搜索后，等待设定的时间再关闭浏览器
-            close_wait = config_dict["DEFAULT_BROWSER_CLOSE_WAIT"]
-            print(f"\n爬取任务结束。浏览器将在{close_wait}秒后自动关闭...")
-            
-            # 创建计数器进行倒计时
-            for i in range(close_wait, 0, -1):
-                if not self.running:
-                    break
-                self.progress_label.config(text=f"浏览器将在 {i} 秒后关闭...")
-                time.sleep(1)
-                
-        except Exception as e:
-            print(f"执行过程中遇到错误: {e}")
-            import traceback
-            traceback.print_exc()
-            self.progress_label.config(text="发生错误")
-        
-        finally:
-            # 程序结束前关闭浏览器
-            if self.driver and self.running:
-                print("即将关闭浏览器...")
-                try:
-                    self.driver.quit()
-                    self.driver = None
-                except:
-                    print("关闭浏览器时出错")
-            
-            # 恢复按钮状态
-            self.start_button.config(state='normal')
-            self.stop_button.config(state='disabled')
-            self.running = False
-    
-    def update_excel_with_data(self, df, results, excel_path):
-        """将收集到的数据更新到Excel文件中"""
-        try:
-            print("正在更新Excel文件...")
-            
-            # 更新数据框
-            for keyword, data in results.items():
-                # 找到关键词所在的行
-                mask = df["流量词"] == keyword
-                if mask.any():
-                    if "搜索转化率" in df.columns:
-                        df.loc[mask, "搜索转化率"] = data["搜索转化率"]
-                    else:
-                        print("警告: Excel文件中没有'搜索转化率'列，无法更新")
-                    
-                    if "类目转化率" in df.columns:  # 点击转化率对应的列名是"类目转化率"
-                        df.loc[mask, "类目转化率"] = data["点击转化率"]
-                    else:
-                        print("警告: Excel文件中没有'类目转化率'列，无法更新")
-                else:
-                    print(f"警告: 在Excel文件中找不到关键词: {keyword}")
-            
-            # 生成带时间戳的新文件名
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            output_path = excel_path.replace(".xlsx", f"_更新_{timestamp}.xlsx")
-            
-            # 保存到新文件
-            df.to_excel(output_path, index=False)
-            print(f"已将更新后的数据保存到: {output_path}")
-            return True
-        
-        except Exception as e:
-            print(f"更新Excel文件时出现错误: {e}")
-            return False
+        if self.scrape_thread.is_alive():
+            self.progress_label.config(text="正在停止，等待结果写入完成...")
+        else:
+            self.progress_label.config(text="已停止")
 
 def main():
-    """主函数，启动GUI应用"""
+    """主函数：带命令行参数时以无界面方式运行爬取引擎，否则启动GUI应用"""
+    if len(sys.argv) > 1:
+        sys.exit(amazon_auto.main(sys.argv[1:]))
+    
     root = tk.Tk()
     app = AmazonScraperGUI(root)
     root.protocol("WM_DELETE_WINDOW", lambda: (app.stop_scraping(), root.destroy()))
@@ -0,0 +1,280 @@
+"""不需要浏览器的辅助函数和类的单元测试
+
+用法:
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amazon_auto import (
+    CONFIG_DEFAULTS, AdaptiveRateLimiter, AmazonScraperEngine, KeywordResultCache, ScrapeJournal, WorkbookBatch,
+    classify_result, count_result_fields, format_targets, normalize_keyword, parse_targets, percentile
+)
+
+
+def make_engine(**overrides):
+    return AmazonScraperEngine(dict(CONFIG_DEFAULTS, **overrides))
+
+
+def result(search="无", click="无"):
+    return {"搜索转化率": search, "点击转化率": click}
+
+
+# 关键词标准化
+
+def test_normalize_keyword_folds_width_case_and_whitespace():
+    assert normalize_keyword("  Ｐｈｏｎｅ　 CASE\t") == "phone case"
+    assert normalize_keyword("iPhone  15") == normalize_keyword("iphone 15")
+
+
+def test_normalize_keyword_accepts_numbers():
+    assert normalize_keyword(123) == "123"
+
+
+# 多目标配置
+
+def test_parse_targets_from_text_keeps_spaces_in_zipcode():
+    assert parse_targets("amazon.com 10001; amazon.co.uk SW1A 1AA;") == [
+        ["amazon.com", "10001"], ["amazon.co.uk", "SW1A 1AA"]
+    ]
+
+
+def test_parse_targets_removes_duplicates():
+    assert parse_targets([("amazon.com", "10001"), ["amazon.com", " 10001 "]]) == [["amazon.com", "10001"]]
+
+
+@pytest.mark.parametrize("value", ["amazon.com", [["amazon.com"]], [["", "10001"]]])
+def test_parse_targets_rejects_incomplete_targets(value):
+    with pytest.raises(ValueError):
+        parse_targets(value)
+
+
+def test_format_targets_round_trips():
+    targets = [["amazon.com", "10001"], ["amazon.co.uk", "SW1A 1AA"]]
+    assert parse_targets(format_targets(targets)) == targets
+
+
+# 结果分类
+
+def test_classify_result():
+    assert classify_result(result("5%", "2%")) == "complete"
+    assert classify_result(result("5%")) == "partial"
+    assert classify_result(result(click="2%")) == "partial"
+    assert classify_result(result()) == "timeout"
+    assert classify_result(result(), "empty") == "empty"
+    assert classify_result(None) == "timeout"
+
+
+def test_count_result_fields():
+    assert count_result_fields(None) == 0
+    assert count_result_fields(result("5%", "2%")) == 2
+
+
+# 百分位
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile(values, 0) == 1
+    assert percentile([], 50) == 0.0
+
+
+# 共享速率限制
+
+def test_rate_limiter_spaces_out_reservations():
+    limiter = AdaptiveRateLimiter(1.0, 0.5, 10.0)
+    waits = [limiter.acquire() for _ in range(3)]
+    assert waits[0] == pytest.approx(0, abs=0.05)
+    assert waits[1] == pytest.approx(1.0, abs=0.05)
+    assert waits[2] == pytest.approx(2.0, abs=0.05)
+
+
+def test_rate_limiter_backs_off_on_throttle_and_speeds_up_on_success():
+    limiter = AdaptiveRateLimiter(2.0, 1.0, 5.0)
+    assert limiter.record("throttled")
+    assert limiter.interval == 4.0
+    assert limiter.record("throttled")
+    assert limiter.interval == 5.0
+    assert not limiter.record("ok")
+    assert limiter.interval == pytest.approx(4.5)
+    assert limiter.throttle_count == 2
+
+
+def test_rate_limiter_treats_an_empty_streak_as_throttling():
+    limiter = AdaptiveRateLimiter(1.0, 0.5, 10.0, empty_streak_limit=3)
+    assert not limiter.record("empty")
+    assert not limiter.record("empty")
+    assert limiter.record("empty")
+    assert limiter.interval == 2.0
+
+
+def test_rate_limiter_keeps_interval_when_not_adaptive():
+    limiter = AdaptiveRateLimiter(1.0, 0.5, 10.0, adaptive=False)
+    limiter.record("throttled")
+    limiter.record("ok")
+    assert limiter.interval == 1.0
+
+
+# 结果日志
+
+def test_journal_keeps_last_record_and_skips_torn_lines(tmp_path):
+    journal = ScrapeJournal(str(tmp_path / "kw_journal.jsonl"))
+    assert journal.load() == {}
+    
+    journal.reset()
+    journal.append("a", result("1%"))
+    journal.append("b", result("2%", "3%"))
+    journal.append("a", result("4%", "5%"))
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"keyword": "c", "da')
+    
+    assert journal.load() == {"a": result("4%", "5%"), "b": result("2%", "3%")}
+    
+    journal.reset()
+    assert journal.load() == {}
+
+
+def test_journal_path_keeps_dotted_file_names_apart(tmp_path):
+    """文件名中带点的工作簿各自使用自己的结果日志"""
+    paths = []
+    for name in ("sales.2024.xlsx", "sales.2025.xlsx"):
+        engine = make_engine(EXCEL_PATH=str(tmp_path / name))
+        paths.append(engine.get_journal_path(engine.get_output_base(engine.config_dict)))
+    
+    assert paths == [str(tmp_path / "sales.2024_journal.jsonl"), str(tmp_path / "sales.2025_journal.jsonl")]
+
+
+def test_journal_path_per_target(tmp_path):
+    engine = make_engine(EXCEL_PATH=str(tmp_path / "kw.xlsx"))
+    engine.target_label = "amazon.co.uk SW1A 1AA"
+    assert engine.get_journal_path(engine.get_output_base(engine.config_dict)) == \
+        str(tmp_path / "kw_amazon.co.uk_SW1A_1AA_journal.jsonl")
+
+
+def test_batch_journal_path_is_in_input_directory(tmp_path):
+    engine = make_engine(EXCEL_PATH="")
+    engine.workbook_batch = WorkbookBatch(str(tmp_path))
+    assert engine.get_journal_path(engine.get_output_base(engine.config_dict)) == str(tmp_path / "batch_journal.jsonl")
+
+
+# 结果缓存
+
+def test_cache_round_trip_is_keyed_by_site_and_zipcode(tmp_path):
+    cache = KeywordResultCache(str(tmp_path / "cache" / "keyword_cache.sqlite3"), 168)
+    try:
+        cache.put("amazon.com", "10001", "mouse", result("5%", "2%"))
+        assert cache.get("amazon.com", "10001", "mouse") == result("5%", "2%")
+        assert cache.get("amazon.com", "90210", "mouse") is None
+        assert cache.get("amazon.co.uk", "10001", "mouse") is None
+    finally:
+        cache.close()
+
+
+def test_cache_expires_empty_results_sooner(tmp_path):
+    cache = KeywordResultCache(str(tmp_path / "keyword_cache.sqlite3"), 168, empty_ttl_hours=1)
+    try:
+        cache.put("amazon.com", "10001", "full", result("5%", "2%"))
+        cache.put("amazon.com", "10001", "none", result())
+        assert cache.get("amazon.com", "10001", "none") == result()
+        
+        with cache.lock:
+            cache.conn.execute("UPDATE keyword_results SET updated_at = ?", (time.time() - 2 * 3600,))
+        assert cache.get("amazon.com", "10001", "full") == result("5%", "2%")
+        assert cache.get("amazon.com", "10001", "none") is None
+        
+        with cache.lock:
+            cache.conn.execute("UPDATE keyword_results SET updated_at = ?", (time.time() - 200 * 3600,))
+        assert cache.get("amazon.com", "10001", "full") is None
+    finally:
+        cache.close()
+
+
+def test_record_keyword_result_caches_only_final_results(tmp_path):
+    engine = make_engine(AMAZON_SITE="amazon.com", DELIVERY_ZIPCODE="10001")
+    engine.journal = ScrapeJournal(str(tmp_path / "kw_journal.jsonl"))
+    engine.result_cache = KeywordResultCache(str(tmp_path / "keyword_cache.sqlite3"), 168, empty_ttl_hours=24)
+    config_dict = engine.config_dict
+    results, progress = {}, {"done": 0, "total": 4}
+    lock = threading.Lock()
+    try:
+        for keyword, data, status in [("complete", result("5%", "2%"), "complete"), ("partial", result("5%"), "partial"),
+                                      ("empty", result(), "empty"), ("timeout", result(), "timeout")]:
+            engine.record_keyword_result(config_dict, keyword, data, status, results, progress, lock)
+        
+        cached = {keyword for keyword in results if engine.result_cache.get("amazon.com", "10001", keyword) is not None}
+        assert cached == {"complete", "empty"}
+        assert progress["done"] == 4
+        assert set(engine.journal.load()) == set(results)
+    finally:
+        engine.result_cache.close()
+
+
+# 插件网络响应
+
+def test_plugin_response_without_records_is_empty():
+    engine = make_engine()
+    config_dict = dict(engine.config_dict, NETWORK_CAPTURE_KEYWORD_FIELD="keyword")
+    
+    class FakeDriver:
+        def __init__(self, payload):
+            self.payload = payload
+        
+        def execute_cdp_cmd(self, command, params):
+            return {"body": json.dumps(self.payload)}
+    
+    parse = lambda payload: engine.parse_plugin_response(FakeDriver(payload), config_dict, "1", "Phone  Case")
+    assert parse({"keyword": "phone case", "data": []}) == result()
+    assert parse({"keyword": "other", "data": []}) is None
+    assert parse({"data": []}) is None
+    assert parse({"keyword": "phone case", "data": [{"keyword": "phone case", "searchConversionRate": 12.5}]}) == \
+        result("12.5%")
+
+
+# 批量模式
+
+def test_find_workbooks_skips_generated_and_temporary_files(tmp_path):
+    for name in ("a.xlsx", "b.XLSM", "a_更新_20240101_000000.xlsx", "~$a.xlsx", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    
+    assert WorkbookBatch.find_workbooks(str(tmp_path)) == [str(tmp_path / "a.xlsx"), str(tmp_path / "b.XLSM")]
+    assert WorkbookBatch.find_workbooks(str(tmp_path / "b*")) == [str(tmp_path / "b.XLSM")]
+
+
+def test_workbook_batch_reports_each_workbook_once_when_complete():
+    batch = WorkbookBatch("input")
+    batch.add("a.xlsx", ["x", "y"])
+    batch.add("b.xlsx", ["y", "z"])
+    
+    assert batch.finish("y") == []
+    assert batch.finish("x") == ["a.xlsx"]
+    assert batch.finish("x") == []
+    assert batch.take_unwritten() == ["b.xlsx"]
+    assert batch.finish("z") == []
+    assert batch.take_unwritten() == []
+
+
+def test_workbook_batch_writer_runs_in_background_and_records_failures():
+    batch = WorkbookBatch("input")
+    written = []
+    
+    def write_workbook(excel_path, workbook_results):
+        if excel_path == "bad.xlsx":
+            raise OSError("disk full")
+        written.append((excel_path, workbook_results))
+    
+    batch.start_writer(write_workbook)
+    batch.submit("a.xlsx", {"x": result("1%")})
+    batch.submit("bad.xlsx", {})
+    batch.close_writer()
+    batch.close_writer()
+    
+    assert written == [("a.xlsx", {"x": result("1%")})]
+    assert batch.failed == ["bad.xlsx"]